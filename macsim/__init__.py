@@ -0,0 +1,7 @@
+"""
+Shared simulation core for the MAC protocol simulator pages.
+
+The Streamlit pages under ``pages/`` only handle widgets and rendering;
+the protocol engines and the background job runner live here so they can
+be imported without starting a Streamlit script.
+"""
@@ -0,0 +1,258 @@
+"""
+Analytic models to compare the simulations against.
+
+``slotted_aloha_chain`` solves the finite-population Slotted ALOHA backlog
+Markov chain (Bertsekas & Gallager, Data Networks, sec. 4.2.2): ``m`` nodes,
+each unbacklogged node receives a packet with probability ``q_a`` per slot
+and sends it at once; each backlogged node retransmits with probability
+``q_r``. The state is the number of backlogged nodes. With ``q_a == q_r == p``
+every node transmits with probability ``p`` in every slot, which is exactly
+what ``engines.simulate_slotted_aloha`` does.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Transition probabilities below this are dropped from the sparse matrix.
+PRUNE = 1e-15
+# Largest chain p_persistent_csma will solve: one dense size x size solve per grid point.
+MAX_WAITING = 400
+
+
+def _binomial_pmf(trials, prob):
+    """pmf[n, i] = P(Binomial(n, prob) == i) for n, i in 0..trials (log-space, no overflow for large n)."""
+    n = np.arange(trials + 1)[:, None]
+    i = np.arange(trials + 1)[None, :]
+    valid = i <= n
+    log_fact = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, trials + 1)))])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_pmf = (log_fact[n] - log_fact[i] - log_fact[np.where(valid, n - i, 0)]
+                   + np.where(i > 0, i * np.log(prob), 0.0)
+                   + np.where(n > i, (n - i) * np.log1p(-prob), 0.0))
+    return np.where(valid, np.exp(log_pmf), 0.0)
+
+
+def backlog_transitions(m, q_a, q_r):
+    """
+    Sparse (rows, cols, probs) transition matrix of the backlog chain on
+    states 0..m. From ``n`` backlogged nodes, ``i`` new arrivals among the
+    ``m - n`` others and ``k`` retransmissions: one packet in total succeeds,
+    otherwise the new arrivals join the backlog.
+    """
+    arrivals = _binomial_pmf(m, q_a)        # arrivals[m - n, i]
+    retries = _binomial_pmf(m, q_r)         # retries[n, k]
+    rows, cols, probs = [], [], []
+    for n in range(m + 1):
+        qa = arrivals[m - n, :m - n + 1]
+        qr0, qr1 = retries[n, 0], retries[n, 1] if n >= 1 else 0.0
+        step = qa.copy()                    # i >= 2 new arrivals always collide
+        if len(step) > 1:
+            step[1] = qa[1] * (1 - qr0)     # one arrival collides with a retransmission
+        step[0] = qa[0] * (1 - qr1)         # no arrival: backlog shrinks only on a lone retransmission
+        if len(qa) > 1:
+            step[0] += qa[1] * qr0          # a lone new arrival succeeds
+        keep = np.flatnonzero(step > PRUNE)
+        rows.append(np.full(keep.size, n))
+        cols.append(n + keep)
+        probs.append(step[keep])
+        if n >= 1 and qa[0] * qr1 > PRUNE:
+            rows.append([n])
+            cols.append([n - 1])
+            probs.append([qa[0] * qr1])
+    return np.concatenate(rows).astype(np.int64), np.concatenate(cols).astype(np.int64), np.concatenate(probs)
+
+
+def success_probability(m, q_a, q_r):
+    """P(success | backlog n) for n = 0..m."""
+    n = np.arange(m + 1)
+    unbacklogged = m - n
+    arrive0 = (1 - q_a) ** unbacklogged
+    arrive1 = unbacklogged * q_a * (1 - q_a) ** np.maximum(unbacklogged - 1, 0)
+    retry0 = (1 - q_r) ** n
+    retry1 = n * q_r * (1 - q_r) ** np.maximum(n - 1, 0)
+    return arrive1 * retry0 + arrive0 * retry1
+
+
+@lru_cache(maxsize=256)
+def slotted_aloha_chain(m, q_a, q_r, tol=1e-12, max_iter=200_000):
+    """
+    Stationary behaviour of the finite-N Slotted ALOHA backlog chain.
+
+    The stationary distribution is found by power iteration on the sparse
+    transition matrix (one ``np.bincount`` per step). Results are cached per
+    parameter set.
+
+    Returns a dict with ``distribution`` (P(backlog = n), read-only),
+    ``throughput`` (successes per slot), ``mean_backlog``, ``delay`` (mean
+    slots from arrival to success, by Little's law), ``iterations``,
+    ``residual`` and ``converged``.
+    """
+    m = int(m)
+    rows, cols, probs = backlog_transitions(m, q_a, q_r)
+    pi = np.full(m + 1, 1.0 / (m + 1))
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        nxt = np.bincount(cols, weights=pi[rows] * probs, minlength=m + 1)
+        nxt /= nxt.sum()
+        residual = np.abs(nxt - pi).sum()
+        pi = nxt
+        if residual < tol:
+            break
+    pi.setflags(write=False)
+
+    throughput = float(pi @ success_probability(m, q_a, q_r))
+    mean_backlog = float(pi @ np.arange(m + 1))
+    # Little's law over backlogged packets plus the slot of the successful transmission.
+    delay = 1 + mean_backlog / throughput if throughput > 0 else float("inf")
+    return {
+        "distribution": pi,
+        "throughput": throughput,
+        "mean_backlog": mean_backlog,
+        "delay": delay,
+        "iterations": iterations,
+        "residual": float(residual),
+        "converged": bool(residual < tol),
+    }
+
+
+def finite_slotted_throughput(num_nodes, p):
+    """Throughput N p (1 - p)^(N - 1) of ``num_nodes`` nodes that each transmit with probability ``p``."""
+    p = np.asarray(p, dtype=float)
+    return num_nodes * p * (1 - p) ** (num_nodes - 1)
+
+
+def pure_aloha_throughput(num_nodes, p, packet_duration):
+    """
+    Stationary throughput (successes per time unit) of ``engines.simulate_pure_aloha``.
+
+    Nodes there are independent: a free node starts a ``packet_duration``-unit
+    transmission with probability ``p`` per unit and is busy until it ends, so
+    it is free a fraction 1 / (1 + p (D - 1)) of the time. An attempt succeeds
+    when each other node is free at its start and stays silent for D units.
+    """
+    p = np.asarray(p, dtype=float)
+    free = 1 / (1 + p * (packet_duration - 1))
+    silent = free * (1 - p) ** packet_duration
+    return num_nodes * p * free * silent ** (num_nodes - 1)
+
+
+# --------------------- CSMA (Kleinrock & Tobagi, 1975) ---------------------
+# G is the offered load (attempts per packet transmission time) and a the
+# propagation delay over the transmission time; S is the fraction of time
+# carrying successful packets. Every function broadcasts over G and a, so a
+# whole curve is a single call.
+
+def nonpersistent_csma(G, a):
+    """Unslotted non-persistent CSMA: S = G e^(-aG) / (G(1 + 2a) + e^(-aG))."""
+    G, a = np.broadcast_arrays(np.asarray(G, dtype=float), np.asarray(a, dtype=float))
+    return G * np.exp(-a * G) / (G * (1 + 2 * a) + np.exp(-a * G))
+
+
+def one_persistent_csma(G, a):
+    """Unslotted 1-persistent CSMA."""
+    G, a = np.broadcast_arrays(np.asarray(G, dtype=float), np.asarray(a, dtype=float))
+    numerator = G * (1 + G + a * G * (1 + G + a * G / 2)) * np.exp(-G * (1 + 2 * a))
+    denominator = G * (1 + 2 * a) - (1 - np.exp(-a * G)) + (1 + a * G) * np.exp(-G * (1 + a))
+    return numerator / denominator
+
+
+def slotted_nonpersistent_csma(G, a):
+    """Slotted non-persistent CSMA: S = aG e^(-aG) / (1 - e^(-aG) + a)."""
+    G, a = np.broadcast_arrays(np.asarray(G, dtype=float), np.asarray(a, dtype=float))
+    return a * G * np.exp(-a * G) / (1 - np.exp(-a * G) + a)
+
+
+def slotted_one_persistent_csma(G, a):
+    """Slotted 1-persistent CSMA."""
+    G, a = np.broadcast_arrays(np.asarray(G, dtype=float), np.asarray(a, dtype=float))
+    numerator = G * np.exp(-G * (1 + a)) * (1 + a - np.exp(-a * G))
+    denominator = (1 + a) * (1 - np.exp(-a * G)) + a * np.exp(-G * (1 + a))
+    return numerator / denominator
+
+
+def _poisson_pmf(mean, size):
+    """pmf[..., k] = P(Poisson(mean) == k) for k < size, broadcasting over ``mean``."""
+    k = np.arange(size)
+    log_fact = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, size)))])
+    mean = np.asarray(mean, dtype=float)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pmf = np.exp(np.where(k > 0, k * np.log(mean), 0.0) - mean - log_fact)
+    return np.nan_to_num(pmf)
+
+
+def p_persistent_waiting(G, a, p):
+    """
+    Number of waiting-packet states ``p_persistent_csma`` keeps at each
+    offered load ``G``: comfortably above the arrivals of one busy period
+    plus the carry-over, which grows as (1 + a) / p.
+    """
+    return np.ceil(np.asarray(G, dtype=float) * (1 + a) * (1 + 1.5 / p) + 40).astype(int)
+
+
+def p_persistent_csma(G, a, p, max_waiting=None):
+    """
+    Slotted p-persistent CSMA (mini-slots of length ``a``; Poisson offered
+    load ``G``), solved numerically for each point of a 1-D grid of ``G``.
+
+    Deferred packets wait for the channel to go idle, then each transmits in
+    every idle mini-slot with probability ``p``; packets arriving meanwhile
+    join them. One packet alone succeeds, several collide (colliding packets
+    are rescheduled, i.e. leave), and those that held back carry over to the
+    next idle period. The number waiting at each idle mini-slot is a Markov
+    chain: nobody sends and aG more arrive, or someone sends and the busy
+    period (1 + a) brings G(1 + a) more. Its stationary distribution gives S
+    by renewal-reward. ``p = 1`` reproduces the slotted 1-persistent formula
+    exactly.
+
+    The chain keeps ``max_waiting`` states, by default
+    ``p_persistent_waiting`` of each grid point; ValueError if that exceeds
+    ``MAX_WAITING``.
+    """
+    G = np.atleast_1d(np.asarray(G, dtype=float))
+    a = float(a)
+    sizes = p_persistent_waiting(G, a, p) if max_waiting is None else np.full(len(G), int(max_waiting))
+    if sizes.max() > MAX_WAITING:
+        raise ValueError(f"p-persistent model needs {sizes.max()} states at G={G[sizes.argmax()]:g} "
+                         f"(a={a:g}, p={p:g}); the limit is {MAX_WAITING}")
+    # Leaving an idle mini-slot: X ~ Bin(j, p) send; j - X stay deferred.
+    sends = _binomial_pmf(sizes.max() - 1, p)                          # sends[j, x]
+    S = np.empty(len(G))
+    for i, (g, size) in enumerate(zip(G, sizes)):
+        j = np.arange(size)
+        shift = j[None, :] - j[:, None]                                # j' - j
+        hold = (1 - p) ** j
+        # Idle: nobody sends and aG arrive during the mini-slot.
+        arrivals = _poisson_pmf(a * g, size)
+        P = hold[:, None] * np.where(shift >= 0, arrivals[np.clip(shift, 0, None)], 0.0)
+        # Busy: X >= 1 send, the j - X left over are joined by the busy period's arrivals
+        # (row-wise convolution of leftover[j, r] with the arrival pmf, via the FFT).
+        leftover = np.where(shift < 0, sends[j[:, None], np.clip(-shift, 0, None)], 0.0)
+        busy_arrivals = _poisson_pmf(g * (1 + a), size)
+        n = 2 * size
+        P += np.clip(np.fft.irfft(np.fft.rfft(leftover, n) * np.fft.rfft(busy_arrivals, n), n)[:, :size], 0.0, None)
+        P /= P.sum(axis=1, keepdims=True)
+
+        # Stationary distribution: pi (P - I) = 0 with sum(pi) = 1.
+        A = P.T - np.eye(size)
+        A[-1, :] = 1.0
+        rhs = np.zeros(size)
+        rhs[-1] = 1.0
+        pi = np.linalg.solve(A, rhs)
+        S[i] = pi @ sends[:size, 1] / (pi @ (a * hold + (1 + a) * (1 - hold)))
+    return S
+
+
+def csma_cd(G, a):
+    """
+    CSMA/CD approximation (Bertsekas & Gallager, sec. 4.5): with g = aG
+    attempts per mini-slot, each mini-slot is idle (length a), a success
+    (1 + a) or a collision detected and aborted within 2a.
+    """
+    G, a = np.broadcast_arrays(np.asarray(G, dtype=float), np.asarray(a, dtype=float))
+    g = a * G
+    idle = np.exp(-g)
+    success = g * np.exp(-g)
+    collision = 1 - idle - success
+    return success / (a * idle + (1 + a) * success + 2 * a * collision)
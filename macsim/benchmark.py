@@ -0,0 +1,268 @@
+"""
+Benchmarks for the engines, the Gantt renderers and the exports.
+
+    python -m macsim.benchmark [--quick] [--only NAME] [--json results.json]
+    python -m macsim.benchmark --compare baseline.json
+
+Each case scales one workload along nodes, horizon or replicas (checkpoint
+saves along the size of the saved state). Its wall
+time is the median of ``--repeat`` timed runs (``best_time`` the fastest,
+which is what comparisons use: it is the least disturbed by whatever else
+the machine is doing); peak memory comes from one
+extra run under ``tracemalloc`` (kept separate because tracing slows
+allocation-heavy code down); throughput is slots (or time units) processed
+per second. Setup such as building the log to export is not timed.
+
+``--json`` writes the results; a file written that way is a baseline for a
+later ``--compare``, which flags every case whose wall time or peak memory
+grew by more than ``--tolerance`` (relative) and exits with status 1 if
+any did. Baselines are machine-specific, so compare runs from the same
+machine.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from macsim.checkpoint import Checkpointer
+from macsim.engines import (simulate_csma, simulate_csma_ca, simulate_slotted_aloha, simulate_backlogged_aloha,
+                            simulate_pure_aloha, run_compare)
+from macsim.export import export_log
+from macsim.plotting import draw_state_gantt, draw_interval_gantt
+from macsim.render import render_png
+
+SEED = 1
+REPEAT = 5
+TOLERANCE = 0.25
+# Differences below this many seconds are noise whatever the ratio.
+MIN_TIME_DELTA = 0.005
+
+CSMA_PROTOCOLS = ["1-Persistent CSMA", "Non-Persistent CSMA", "p-Persistent CSMA (CSMA/CD)"]
+STATE_COLORS = {0: '#d3d3d3', 1: '#2ecc71', 2: '#e74c3c'}
+SLOT_HEADERS = {"slot": "Slot", "count": "Num Transmissions", "code": "Status", "node": "Successful Node"}
+SLOT_STATES = ["Success", "Collision", "Idle"]
+
+
+# ---- CASES ----
+# A case is (name, params, setup, run): ``setup()`` builds the untimed input,
+# ``run(input)`` does the timed work and the case's slot count is in params.
+
+def _engine_cases(quick):
+    cases = []
+    for nodes in (10, 100) if quick else (10, 100, 1000):
+        for slots in (10_000,) if quick else (10_000, 100_000):
+            cases.append(("simulate_slotted_aloha", {"nodes": nodes, "slots": slots}, None,
+                          lambda _, n=nodes, s=slots: simulate_slotted_aloha(n, 1 / n, s, seed=SEED)))
+    for nodes in (10,) if quick else (10, 50):
+        for slots in (2000,) if quick else (2000, 10_000):
+            cases.append(("simulate_pure_aloha", {"nodes": nodes, "slots": slots}, None,
+                          lambda _, n=nodes, s=slots: simulate_pure_aloha(n, 0.2 / n, s, 3, seed=SEED)))
+    for nodes in (10,) if quick else (10, 100):
+        for slots in (10_000,) if quick else (10_000, 100_000):
+            cases.append(("simulate_backlogged_aloha", {"nodes": nodes, "slots": slots}, None,
+                          lambda _, n=nodes, s=slots: simulate_backlogged_aloha(n, 0.3 / n, 0.1, s, seed=SEED)))
+    for nodes in (5,) if quick else (5, 20):
+        for slots in (400,) if quick else (400, 4000):
+            cases.append(("simulate_csma", {"nodes": nodes, "slots": slots}, None,
+                          lambda _, n=nodes, s=slots: simulate_csma(n, 5, 0.1, 2.0, 0.5 / n, CSMA_PROTOCOLS[0],
+                                                                    seed=SEED, max_time=s)))
+            cases.append(("simulate_csma_ca", {"nodes": nodes, "slots": slots}, None,
+                          lambda _, n=nodes, s=slots: simulate_csma_ca(n, 5, 0.1, 1.5, 0.5 / n, seed=SEED,
+                                                                       max_time=s)))
+    for runs in (2,) if quick else (2, 10):
+        # Every protocol runs ``runs`` replicas of ``max_time`` slots.
+        cases.append(("run_compare", {"nodes": 5, "replicas": runs, "slots": runs * len(CSMA_PROTOCOLS) * 400},
+                      None, lambda _, r=runs: _compare(r)))
+    return cases
+
+
+def _compare(runs):
+    # run_compare seeds each replica from the global generator; fix it so every run does the same work.
+    np.random.seed(SEED)
+    return run_compare(simulate_csma, CSMA_PROTOCOLS, runs, num_nodes=5, num_packets=5, prop_delay=0.1,
+                       tx_time=2.0, gen_prob=0.1, max_time=400)
+
+
+def _gantt(states):
+    fig = Figure(figsize=(12, 6))
+    draw_state_gantt(fig.subplots(), states, STATE_COLORS, height=0.8, edgecolor='white', linewidth=0.5)
+    return render_png(fig)
+
+
+def _interval_gantt(transmissions, slots):
+    fig = Figure(figsize=(12, 6))
+    draw_interval_gantt(fig.subplots(), transmissions["node"], transmissions["start"], transmissions["end"],
+                        transmissions["code"], {1: '#2ecc71', 2: '#e74c3c'}, slots, height=0.8)
+    return render_png(fig)
+
+
+def _render_cases(quick):
+    cases = []
+    for nodes in (10,) if quick else (10, 50):
+        for slots in (100,) if quick else (100, 2000):
+            # Above the vector-run limit the state Gantt switches to a raster.
+            cases.append(("draw_state_gantt", {"nodes": nodes, "slots": slots},
+                          lambda n=nodes, s=slots: simulate_slotted_aloha(n, 1 / n, s, seed=SEED)[1],
+                          _gantt))
+            cases.append(("draw_interval_gantt", {"nodes": nodes, "slots": slots},
+                          lambda n=nodes, s=slots: simulate_pure_aloha(n, 0.2 / n, s, 3, seed=SEED)[1],
+                          lambda transmissions, s=slots: _interval_gantt(transmissions, s)))
+    return cases
+
+
+def _export_cases(quick):
+    cases = []
+    for fmt in ("CSV", "CSV.gz"):
+        for slots in (10_000,) if quick else (10_000, 200_000):
+            cases.append((f"export_log {fmt}", {"nodes": 10, "slots": slots},
+                          lambda s=slots: simulate_slotted_aloha(10, 0.1, s, seed=SEED)[0],
+                          lambda log, f=fmt: export_log(log, SLOT_HEADERS, f, categories=SLOT_STATES).read()))
+    return cases
+
+
+def _finished_state(slots):
+    state = {}
+    simulate_backlogged_aloha(100, 0.3 / 100, 0.1, slots, seed=SEED, state=state)
+    return state
+
+
+def _save_checkpoint(state):
+    with tempfile.TemporaryDirectory() as directory:
+        Checkpointer(os.path.join(directory, "run.ckpt")).save(state, state["time"])
+
+
+def _checkpoint_cases(quick):
+    # Slots per second here compare directly with the engine's own throughput.
+    return [("checkpoint save", {"nodes": 100, "slots": slots}, lambda s=slots: _finished_state(s), _save_checkpoint)
+            for slots in ((10_000,) if quick else (10_000, 100_000))]
+
+
+def cases(quick=False):
+    return _engine_cases(quick) + _render_cases(quick) + _export_cases(quick) + _checkpoint_cases(quick)
+
+
+def case_key(name, params):
+    return name + " " + " ".join(f"{k}={v}" for k, v in sorted(params.items()))
+
+
+# ---- RUN ----
+
+def measure(setup, run, repeat=REPEAT):
+    """(median wall time, all wall times, peak traced bytes) of ``run(setup())``."""
+    data = setup() if setup is not None else None
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(data)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(times), times, peak
+
+
+def run_benchmarks(quick=False, only=None, repeat=REPEAT, progress=None):
+    """
+    Run the cases whose name contains ``only`` (all if None) and return
+    ``{"meta": {...}, "results": [...]}``; ``progress(done, total, case=...)``
+    is called after each case.
+    """
+    selected = [c for c in cases(quick) if only is None or only in c[0]]
+    results = []
+    for done, (name, params, setup, run) in enumerate(selected, start=1):
+        wall, times, peak = measure(setup, run, repeat)
+        results.append({"key": case_key(name, params), "name": name, "params": params, "wall_time": wall,
+                        "best_time": min(times), "wall_times": times, "peak_memory": peak,
+                        "slots_per_second": params["slots"] / wall if wall > 0 else float("inf")})
+        if progress is not None:
+            progress(done, len(selected), case=case_key(name, params))
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                 "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick,
+                 "repeat": repeat},
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """
+    Per-case ratios of ``current`` to ``baseline`` (both ``run_benchmarks``
+    reports), matched by case key; ``regression`` is set when best time or
+    peak memory grew by more than ``tolerance``. Cases missing from the
+    baseline get ratios of None.
+    """
+    before = {r["key"]: r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        old = before.get(r["key"])
+        if old is None:
+            rows.append({"key": r["key"], "time_ratio": None, "memory_ratio": None, "regression": False})
+            continue
+        time_ratio = r["best_time"] / old["best_time"] if old["best_time"] else None
+        memory_ratio = r["peak_memory"] / old["peak_memory"] if old["peak_memory"] else None
+        slower = (time_ratio is not None and time_ratio > 1 + tolerance
+                  and r["best_time"] - old["best_time"] > MIN_TIME_DELTA)
+        bigger = memory_ratio is not None and memory_ratio > 1 + tolerance
+        rows.append({"key": r["key"], "time_ratio": time_ratio, "memory_ratio": memory_ratio,
+                     "regression": bool(slower or bigger), "slower": bool(slower), "bigger": bool(bigger)})
+    return rows
+
+
+def format_results(report, comparison=None):
+    """Plain-text table of a ``run_benchmarks`` report, with baseline ratios when given."""
+    ratios = {row["key"]: row for row in comparison or []}
+    lines = []
+    for r in report["results"]:
+        line = (f"{r['key']:<60} {r['wall_time'] * 1000:10.1f} ms {r['peak_memory'] / 2**20:9.2f} MiB"
+                f" {r['slots_per_second']:14,.0f} slots/s")
+        row = ratios.get(r["key"])
+        if row is not None:
+            if row["time_ratio"] is None:
+                line += "  (new)"
+            else:
+                memory = f"{row['memory_ratio']:.2f}" if row["memory_ratio"] is not None else "-"
+                line += f"  time x{row['time_ratio']:.2f} mem x{memory}"
+                if row["regression"]:
+                    line += "  REGRESSION"
+        lines.append(line)
+    if comparison is not None:
+        lines.append(f"{sum(row['regression'] for row in comparison)} regression(s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MAC protocol engines, renderers and exports")
+    parser.add_argument("--quick", action="store_true", help="a smaller grid")
+    parser.add_argument("--only", metavar="NAME", help="run only cases whose name contains NAME")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON (usable as a baseline)")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.quick, args.only, args.repeat,
+                            progress=lambda done, total, case: print(f"[{done}/{total}] {case}", flush=True))
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(report, json.load(f), args.tolerance)
+        report["comparison"] = comparison
+    print(format_results(report, comparison))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if comparison and any(row["regression"] for row in comparison) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""
+Results bundles: one zip per download holding, for each recorded run, the
+event log (Parquet), statistics and parameters (JSON, including the seed)
+and the figures shown on the page.
+"""
+import json
+import tempfile
+import time
+import zipfile
+
+from macsim.export import export_log
+from macsim.jsonable import to_jsonable
+
+
+class RunRecord:
+    """
+    Everything needed to reproduce and document one finished run: the
+    protocol name, its parameters (with ``seed``), the event log with its
+    column headers/status categories, the summary statistics and the figures
+    shown for it (file name -> PNG bytes or Vega-Lite JSON).
+    """
+
+    def __init__(self, protocol, params, log, headers, categories, stats):
+        self.protocol = protocol
+        self.params = dict(params)
+        self.log = log
+        self.headers = headers
+        self.categories = categories
+        self.stats = stats
+        self.figures = {}
+        self.created_at = time.time()
+
+    @property
+    def seed(self):
+        return self.params.get("seed")
+
+    @property
+    def slug(self):
+        return "".join(c if c.isalnum() else "_" for c in self.protocol.lower()).strip("_")
+
+    def add_figure(self, name, figure):
+        """
+        Keep a figure shown on the page for the bundle and return it unchanged:
+        PNG bytes are stored as ``name.png``, Altair charts as their Vega-Lite
+        spec in ``name.vl.json``.
+        """
+        if isinstance(figure, bytes):
+            self.figures[f"{name}.png"] = figure
+        else:
+            self.figures[f"{name}.vl.json"] = figure.to_json()
+        return figure
+
+    def summary(self):
+        return {
+            "protocol": self.protocol,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created_at)),
+            "seed": self.seed,
+            "events": len(self.log),
+            "figures": sorted(self.figures),
+        }
+
+
+def _files(record):
+    """(name, producer) pairs for one run; producers run lazily, one file at a time."""
+    folder = record.slug
+    yield f"{folder}/events.parquet", lambda: export_log(record.log, record.headers, "Parquet",
+                                                         categories=record.categories).read()
+    yield f"{folder}/stats.json", lambda: json.dumps(to_jsonable(record.stats), indent=2)
+    yield f"{folder}/params.json", lambda: json.dumps(to_jsonable(record.params), indent=2)
+    for name, data in sorted(record.figures.items()):
+        yield f"{folder}/figures/{name}", lambda data=data: data
+
+
+def build_bundle(records, progress=None):
+    """
+    Zip ``records`` (RunRecords) file by file into a spooled temporary file
+    and return the archive bytes. ``progress(done, total, file=...)`` is
+    called before each file, so the build can run (and be cancelled) as a
+    background job.
+    """
+    files = [item for record in records for item in _files(record)]
+    manifest = json.dumps({"runs": [record.summary() for record in records]}, indent=2)
+    with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as out:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("manifest.json", manifest)
+            for done, (name, produce) in enumerate(files):
+                if progress is not None:
+                    progress(done, len(files), file=name)
+                # Parquet and PNG are already compressed.
+                compress = zipfile.ZIP_DEFLATED if name.endswith(".json") else zipfile.ZIP_STORED
+                archive.writestr(name, produce(), compress_type=compress)
+        if progress is not None:
+            progress(len(files), len(files))
+        out.seek(0)
+        return out.read()
@@ -0,0 +1,181 @@
+"""
+Client-side (Vega-Lite via Altair) versions of the summary charts.
+
+Each builder takes a handful of pre-aggregated numbers or a short column
+table and returns an ``alt.Chart``; hover tooltips, zoom/pan and legend
+toggles then run in the browser without a Streamlit rerun.
+"""
+import altair as alt
+import numpy as np
+import pandas as pd
+
+
+def _legend_toggle(field):
+    return alt.selection_point(fields=[field], bind='legend')
+
+
+def outcome_donut(counts, colors, title):
+    """Share of each outcome, e.g. ``{"Successful": 190, "Collisions": 131, "Idle": 179}``."""
+    data = pd.DataFrame({"Outcome": list(counts), "Count": [int(v) for v in counts.values()]})
+    data["Share"] = data["Count"] / max(1, data["Count"].sum())
+    toggle = _legend_toggle("Outcome")
+    return alt.Chart(data, title=title).mark_arc(innerRadius=50, stroke="white").encode(
+        theta=alt.Theta("Count:Q"),
+        color=alt.Color("Outcome:N", scale=alt.Scale(domain=list(colors), range=list(colors.values()))),
+        opacity=alt.condition(toggle, alt.value(1.0), alt.value(0.2)),
+        tooltip=["Outcome:N", "Count:Q", alt.Tooltip("Share:Q", format=".1%")],
+    ).add_params(toggle)
+
+
+def activity_bars(slots, counts, statuses, colors, x_title, y_title, title):
+    """Per-slot transmission counts coloured by status; drag to pan, scroll to zoom."""
+    data = pd.DataFrame({x_title: np.asarray(slots), y_title: np.asarray(counts), "Status": list(statuses)})
+    toggle = _legend_toggle("Status")
+    zoom = alt.selection_interval(bind='scales', encodings=['x'])
+    return alt.Chart(data, title=title).mark_bar(opacity=0.8).encode(
+        x=alt.X(f"{x_title}:Q"),
+        y=alt.Y(f"{y_title}:Q"),
+        color=alt.Color("Status:N", scale=alt.Scale(domain=list(colors), range=list(colors.values()))),
+        opacity=alt.condition(toggle, alt.value(0.8), alt.value(0.1)),
+        tooltip=[f"{x_title}:Q", f"{y_title}:Q", "Status:N"],
+    ).add_params(toggle, zoom)
+
+
+def throughput_curves(g_values, curves, points, x_title="Offered Load (G)", title="Throughput vs Offered Load"):
+    """
+    Theory curves plus simulated/marked points.
+
+    ``curves`` maps a series name to S(G) over ``g_values``; ``points`` is a
+    list of ``(label, G, S)``. A vertical rule follows the pointer and the
+    tooltip shows every curve's value at that G.
+    """
+    g_values = np.asarray(g_values)
+    wide = pd.DataFrame({"G": g_values, **{name: np.asarray(s) for name, s in curves.items()}})
+    long = wide.melt("G", var_name="Series", value_name="S")
+    toggle = _legend_toggle("Series")
+    hover = alt.selection_point(fields=["G"], nearest=True, on="pointerover", empty=False)
+    zoom = alt.selection_interval(bind='scales')
+
+    lines = alt.Chart(long).mark_line(strokeWidth=2).encode(
+        x=alt.X("G:Q", title=x_title),
+        y=alt.Y("S:Q", title="Throughput (S)"),
+        color=alt.Color("Series:N"),
+        opacity=alt.condition(toggle, alt.value(1.0), alt.value(0.15)),
+    ).add_params(toggle, zoom)
+    rule = alt.Chart(wide).mark_rule(color="gray").encode(
+        x="G:Q",
+        opacity=alt.condition(hover, alt.value(0.6), alt.value(0)),
+        tooltip=[alt.Tooltip("G:Q", format=".3f")] + [alt.Tooltip(f"{name}:Q", format=".4f") for name in curves],
+    ).add_params(hover)
+
+    layers = [lines, rule]
+    if points:
+        marks = pd.DataFrame(points, columns=["Point", "G", "S"])
+        layers.append(alt.Chart(marks).mark_point(size=160, filled=True).encode(
+            x="G:Q", y="S:Q",
+            shape=alt.Shape("Point:N"),
+            color=alt.value("#e74c3c"),
+            tooltip=["Point:N", alt.Tooltip("G:Q", format=".3f"), alt.Tooltip("S:Q", format=".4f")],
+        ))
+    return alt.layer(*layers, title=title)
+
+
+def rate_series(ends, means, x_title, title, y_title="Rate", domain=(0, 1)):
+    """
+    Windowed rates over a run, one line per metric (``means`` maps a name to
+    values at the window ends ``ends``); drag to pan, scroll to zoom. Pass
+    ``domain=None`` for quantities that aren't rates (e.g. a backlog).
+    """
+    wide = pd.DataFrame({x_title: np.asarray(ends), **{name: np.asarray(v) for name, v in means.items()}})
+    long = wide.melt(x_title, var_name="Metric", value_name=y_title)
+    toggle = _legend_toggle("Metric")
+    zoom = alt.selection_interval(bind='scales', encodings=['x'])
+    return alt.Chart(long, title=title).mark_line(strokeWidth=1.5).encode(
+        x=alt.X(f"{x_title}:Q"),
+        y=alt.Y(f"{y_title}:Q", scale=alt.Scale(domain=list(domain)) if domain else alt.Undefined),
+        color=alt.Color("Metric:N", sort=list(means)),
+        opacity=alt.condition(toggle, alt.value(1.0), alt.value(0.15)),
+        tooltip=[f"{x_title}:Q", "Metric:N", alt.Tooltip(f"{y_title}:Q", format=".3f")],
+    ).add_params(toggle, zoom)
+
+
+def node_share_bars(successes, collisions, title="Per-Node Outcomes"):
+    """Successes and collisions per node as stacked bars, with each node's share of all successes."""
+    successes = np.asarray(successes)
+    collisions = np.asarray(collisions)
+    share = successes / max(1, successes.sum())
+    data = pd.DataFrame({
+        "Node": np.arange(len(successes)).repeat(2),
+        "Outcome": ["Success", "Collision"] * len(successes),
+        "Count": np.column_stack([successes, collisions]).ravel(),
+        "Success Share": share.repeat(2),
+    })
+    toggle = _legend_toggle("Outcome")
+    return alt.Chart(data, title=title).mark_bar().encode(
+        x=alt.X("Node:O"),
+        y=alt.Y("Count:Q", stack=True),
+        color=alt.Color("Outcome:N", scale=alt.Scale(domain=["Success", "Collision"],
+                                                     range=["#2ecc71", "#e74c3c"])),
+        opacity=alt.condition(toggle, alt.value(1.0), alt.value(0.2)),
+        tooltip=["Node:O", "Outcome:N", "Count:Q", alt.Tooltip("Success Share:Q", format=".1%")],
+    ).add_params(toggle)
+
+
+def distribution_bars(probabilities, x_title, title):
+    """Probability mass over states 0..n (e.g. a stationary backlog distribution)."""
+    data = pd.DataFrame({x_title: np.arange(len(probabilities)), "Probability": np.asarray(probabilities)})
+    return alt.Chart(data, title=title).mark_bar(color="#3498DB").encode(
+        x=alt.X(f"{x_title}:Q"),
+        y=alt.Y("Probability:Q"),
+        tooltip=[f"{x_title}:Q", alt.Tooltip("Probability:Q", format=".4f")],
+    ).add_params(alt.selection_interval(bind='scales', encodings=['x']))
+
+
+def quantile_histogram(edges, counts, quantiles, x_title, title):
+    """
+    Histogram from precomputed bin ``edges``/``counts`` (e.g. a
+    ``QuantileSketch.histogram``) with a dashed rule per quantile
+    (``quantiles`` maps a label such as "p95" to its value).
+    """
+    edges = np.asarray(edges, dtype=float)
+    bars = pd.DataFrame({"start": edges[:-1], "end": edges[1:], "Count": np.asarray(counts)})
+    marks = pd.DataFrame({"Quantile": list(quantiles), x_title: [float(v) for v in quantiles.values()]})
+    histogram = alt.Chart(bars).mark_bar(color="#3498DB", opacity=0.8).encode(
+        x=alt.X("start:Q", title=x_title),
+        x2="end:Q",
+        y=alt.Y("Count:Q", title="Packets (approx.)"),
+        tooltip=[alt.Tooltip("start:Q", title="From", format=".1f"), alt.Tooltip("end:Q", title="To", format=".1f"),
+                 alt.Tooltip("Count:Q", format=",.0f")],
+    )
+    rules = alt.Chart(marks).mark_rule(strokeDash=[4, 3], strokeWidth=2).encode(
+        x=f"{x_title}:Q",
+        color=alt.Color("Quantile:N", sort=list(quantiles)),
+        tooltip=["Quantile:N", alt.Tooltip(f"{x_title}:Q", format=".1f")],
+    )
+    return alt.layer(histogram, rules, title=title).add_params(alt.selection_interval(bind='scales', encodings=['x']))
+
+
+def comparison_bars(protocols, metrics, colors=None):
+    """
+    One bar panel per metric, side by side. ``metrics`` maps a metric title
+    to a value per protocol; clicking a bar highlights that protocol in
+    every panel.
+    """
+    rows = [(title, proto, float(v)) for title, values in metrics.items() for proto, v in zip(protocols, values)]
+    data = pd.DataFrame(rows, columns=["Metric", "Protocol", "Value"])
+    pick = alt.selection_point(fields=["Protocol"])
+    scale = alt.Scale(domain=list(protocols), range=list(colors)) if colors else alt.Undefined
+
+    base = alt.Chart(data, width=220, height=260).encode(
+        x=alt.X("Protocol:N", sort=list(protocols), axis=alt.Axis(labelAngle=-15, title=None)),
+        y=alt.Y("Value:Q", title=None),
+    )
+    bars = base.mark_bar().encode(
+        color=alt.Color("Protocol:N", legend=None, scale=scale),
+        opacity=alt.condition(pick, alt.value(1.0), alt.value(0.35)),
+        tooltip=["Protocol:N", alt.Tooltip("Value:Q", format=".4f")],
+    ).add_params(pick)
+    labels = base.mark_text(dy=-6, fontWeight="bold").encode(text=alt.Text("Value:Q", format=".3g"))
+    return (bars + labels).facet(
+        column=alt.Column("Metric:N", sort=list(metrics), title=None)
+    ).resolve_scale(y='independent')
@@ -0,0 +1,146 @@
+"""
+Periodic on-disk checkpoints of long engine runs.
+
+A ``Checkpointer`` is handed to an engine as ``checkpoint=``. At each
+progress report the engine asks ``due()`` (a clock comparison) and, when a
+checkpoint is due, passes its state (see ``macsim.engines``: RNG,
+in-flight transmissions, backoffs, logs and partial accumulators) to
+``save``. ``save`` pickles the state through gzip (level 1: fast, and the
+int8/int32 log columns shrink well) into a temporary file next to the
+target, then fsyncs it and renames it over the target. A crash therefore
+leaves either the previous checkpoint or the new one, never a torn file.
+
+Checkpoints are written every ``interval`` seconds, but never more often
+than keeps the measured write time under ``max_overhead`` of the run. The
+state, and with it the cost of a save, grows with the run, so the next
+save is expected to cost what the last one did per second of run time; it
+waits until all saves including that one stay under ``max_overhead`` of
+the time since the checkpointer started. Checkpoints therefore become
+sparser as the run goes on instead of eating into simulation throughput. ``summary()``
+reports the saves, their bytes and seconds, the resulting overhead and the
+slot the run was resumed from (0 for a fresh run).
+
+``run_checkpointed`` runs an engine with checkpoints and continues from the
+checkpoint at its path if there is one; ``resume`` continues whatever run
+a checkpoint holds. Checkpoints are pickles: only load files you wrote.
+"""
+import gzip
+import math
+import os
+import pickle
+import time
+
+from macsim.engines import (simulate_csma, simulate_csma_ca, simulate_slotted_aloha, simulate_backlogged_aloha,
+                            simulate_pure_aloha)
+
+# Engine name (as stored in its state) -> (function, argument that sets the horizon).
+ENGINES = {
+    "csma": (simulate_csma, "max_time"),
+    "csma_ca": (simulate_csma_ca, "max_time"),
+    "slotted_aloha": (simulate_slotted_aloha, "num_slots"),
+    "backlogged_aloha": (simulate_backlogged_aloha, "num_slots"),
+    "pure_aloha": (simulate_pure_aloha, "num_time_units"),
+}
+
+INTERVAL = 60.0
+MAX_OVERHEAD = 0.05
+VERSION = 1
+
+
+class Checkpointer:
+    """Atomic, rate-limited snapshots of one run at ``path`` (see the module docstring)."""
+
+    def __init__(self, path, interval=INTERVAL, max_overhead=MAX_OVERHEAD):
+        self.path = path
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.saves = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.resumed_from = 0
+        self.started = time.perf_counter()
+        self._next = self.started + interval
+
+    def due(self):
+        return time.perf_counter() >= self._next
+
+    def save(self, state, horizon):
+        """Write ``state`` of a run up to ``horizon`` to ``path``, replacing the previous checkpoint atomically."""
+        start = time.perf_counter()
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as f:
+                pickle.dump({"version": VERSION, "horizon": horizon, "time": state["time"], "state": state}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temporary, self.path)
+        end = time.perf_counter()
+        self.saves += 1
+        self.seconds += end - start
+        self.bytes = os.path.getsize(self.path)
+        # A save at x seconds into the run costs about rate * x; the next one may start once
+        # seconds + rate * x <= max_overhead * (x + rate * x).
+        rate = (end - start) / (end - self.started)
+        slack = self.max_overhead * (1 + rate) - rate
+        budget = self.started + self.seconds / slack if slack > 0 else math.inf
+        self._next = max(end + self.interval, budget)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {"path": self.path, "saves": self.saves, "seconds": self.seconds, "bytes": self.bytes,
+                "overhead": self.seconds / elapsed if elapsed > 0 else 0.0, "resumed_from": self.resumed_from}
+
+
+def load(path):
+    """The checkpoint at ``path``: {"horizon", "time", "state"}."""
+    with gzip.open(path, "rb") as f:
+        snapshot = pickle.load(f)
+    if snapshot.get("version") != VERSION:
+        raise ValueError(f"{path} is a version {snapshot.get('version')} checkpoint, expected {VERSION}")
+    return snapshot
+
+
+def _finish(checkpointer, state, horizon, keep):
+    if keep:
+        checkpointer.save(state, horizon)
+    elif os.path.exists(checkpointer.path):
+        os.remove(checkpointer.path)
+
+
+def run_checkpointed(engine, params, path, interval=INTERVAL, max_overhead=MAX_OVERHEAD, keep=False,
+                     progress=None):
+    """
+    Run ``engine`` (a key of ``ENGINES``) with ``params`` (horizon included)
+    and checkpoint it to ``path``. If ``path`` already holds a checkpoint,
+    the run continues from it; the engine raises ValueError if that
+    checkpoint belongs to other parameters. Once the run completes the
+    checkpoint is removed, or with ``keep`` replaced by the final state (a
+    later call with a longer horizon then extends it).
+
+    Returns (engine output, ``Checkpointer``).
+    """
+    fn, horizon_arg = ENGINES[engine]
+    state = load(path)["state"] if os.path.exists(path) else {}
+    checkpointer = Checkpointer(path, interval, max_overhead)
+    checkpointer.resumed_from = state.get("time", 0)
+    output = fn(**params, state=state, checkpoint=checkpointer, progress=progress)
+    _finish(checkpointer, state, params[horizon_arg], keep)
+    return output, checkpointer
+
+
+def resume(path, interval=INTERVAL, max_overhead=MAX_OVERHEAD, keep=False, progress=None):
+    """
+    Continue the run held by the checkpoint at ``path`` to its horizon, with
+    the same parameters and seed, checkpointing as it goes. Returns (engine
+    name, engine output, ``Checkpointer``).
+    """
+    snapshot = load(path)
+    state = snapshot["state"]
+    fn, horizon_arg = ENGINES[state["engine"]]
+    checkpointer = Checkpointer(path, interval, max_overhead)
+    checkpointer.resumed_from = state["time"]
+    output = fn(**state["params"], **{horizon_arg: snapshot["horizon"]}, state=state, checkpoint=checkpointer,
+                progress=progress)
+    _finish(checkpointer, state, snapshot["horizon"], keep)
+    return state["engine"], output, checkpointer
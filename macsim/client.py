@@ -0,0 +1,65 @@
+"""
+Minimal client for ``macsim.service``, for notebooks and scripts::
+
+    from macsim.client import SimulationClient
+    client = SimulationClient()
+    result = client.run("slotted_aloha", num_nodes=20, p=0.05, num_slots=5000, seed=1)
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class SimulationClient:
+    def __init__(self, base_url="http://127.0.0.1:8765", timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            message = json.loads(exc.read() or b"{}").get("error", exc.reason)
+            raise ServiceError(exc.code, message) from None
+
+    def engines(self):
+        return self._call("GET", "/engines")["engines"]
+
+    def submit(self, engine, **params):
+        return self._call("POST", "/jobs", {"engine": engine, "params": params})
+
+    def status(self, job_id):
+        return self._call("GET", f"/jobs/{job_id}")
+
+    def result(self, job_id):
+        return self._call("GET", f"/jobs/{job_id}/result")["result"]
+
+    def cancel(self, job_id):
+        return self._call("DELETE", f"/jobs/{job_id}")
+
+    def wait(self, job_id, poll_interval=0.2):
+        """Poll until the job leaves the queue; returns its final status."""
+        while True:
+            status = self.status(job_id)
+            if status["status"] not in ("queued", "running"):
+                return status
+            time.sleep(poll_interval)
+
+    def run(self, engine, **params):
+        """Submit, wait and fetch the result in one call."""
+        job = self.submit(engine, **params)
+        status = self.wait(job["id"])
+        if status["status"] != "done":
+            raise ServiceError(status["status"], status.get("error") or f"job {job['id']} {status['status']}")
+        return self.result(job["id"])
@@ -0,0 +1,775 @@
+import copy
+
+import numpy as np
+
+from macsim.events import (IDLE, SUCCESS, COLLISION, BUSY, TRANSMITTING, NO_NODE, slot_log, attempt_log,
+                           transmission_log)
+from macsim.stats import ChannelStats, QuantileSketch, RunningStats, batch_size_for
+
+# Every engine accepts an optional ``progress(done, total, **info)`` callback.
+# It is called roughly a hundred times per run; raising from it (the job
+# runner does this on Cancel) aborts the simulation cooperatively.
+#
+# Outcome counts and confidence intervals are accumulated in a ChannelStats
+# as each slot is logged, so no engine rescans its log at the end. Engines
+# with per-packet state also stream access delay, attempts and backoff
+# lengths into QuantileSketches (see ``packet_sketches``).
+#
+# Every engine also takes an optional ``state`` dict. When the run finishes
+# the engine stores its whole state there: RNG, in-flight transmissions,
+# backoffs and queues, logs and accumulators. Calling the engine again with
+# that dict, the same parameters and seed, and a longer horizon continues
+# the run instead of starting over. Only the new slots are simulated and
+# appended, and the result is that of a fresh run of the longer horizon
+# (identical logs and counts; streamed summaries equal up to rounding). The
+# engine resumes from a copy, so whatever the earlier call returned is left
+# as it was. An optional ``checkpoint`` (a ``macsim.checkpoint.Checkpointer``)
+# is offered the state so far at every progress report and writes it to
+# disk when a checkpoint is due.
+
+
+# Per-slot arrays of an engine's state, sized to the horizon.
+PER_SLOT = ("node_states", "backlog")
+
+
+def _progress_every(total):
+    return max(1, int(total) // 100)
+
+
+def _resume(state, engine, params, horizon, fresh):
+    """
+    Starting point of a run up to ``horizon``: ``fresh()`` for a new run, or
+    a copy of the run kept in ``state`` by an earlier call of ``engine``
+    with the same ``params``. Batch sizes and per-slot arrays
+    (``node_states``, ``backlog``) are fitted to the new horizon.
+    """
+    if not state:
+        run = fresh()
+        run.update(engine=engine, params=params)
+    else:
+        if state["engine"] != engine or state["params"] != params:
+            raise ValueError(f"state was saved by another run: {state['engine']} {state['params']}")
+        if state["time"] > horizon:
+            raise ValueError(f"cannot resume a run of {state['time']} slots at a horizon of {horizon}")
+        run = copy.deepcopy(state)
+    batch_size = batch_size_for(horizon)
+    if run["channel"].batch_size != batch_size:
+        # Batches are sized from the horizon: regroup the slots logged so far.
+        run["channel"] = ChannelStats(batch_size)
+        run["channel"].add_many(run["log"]["code"])
+    for name in PER_SLOT:
+        if name in run:
+            kept = run[name]
+            run[name] = np.zeros(kept.shape[:-1] + (horizon,), dtype=kept.dtype)
+            run[name][..., :kept.shape[-1]] = kept
+    return run
+
+
+def _checkpoint(checkpoint, run, horizon, **changed):
+    """Hand ``checkpoint`` the run so far, with the loop variables in ``changed``, if a checkpoint is due."""
+    if checkpoint is not None and checkpoint.due():
+        snapshot = dict(run, **changed)
+        for name in PER_SLOT:
+            if name in snapshot:
+                # Only the slots simulated so far; resuming widens them again.
+                snapshot[name] = snapshot[name][..., :snapshot["time"]]
+        checkpoint.save(snapshot, horizon)
+
+
+def _keep(state, run, **changed):
+    """Store the finished ``run``, updated with the loop variables in ``changed``, in the caller's ``state``."""
+    if state is not None:
+        run.update(changed)
+        state.clear()
+        state.update(run)
+
+
+def packet_sketches():
+    """Per-packet distributions: access delay (slots from arrival to success), attempts per packet, backoff lengths."""
+    return {"delay": QuantileSketch(), "attempts": QuantileSketch(), "backoff": QuantileSketch()}
+
+
+def new_seed():
+    """Fresh seed for a run; pass it explicitly so the run can be recorded and reproduced."""
+    return int(np.random.randint(0, 2**31 - 1))
+
+
+# --------------------- CSMA / CSMA-CD ---------------------
+def simulate_csma(num_nodes, num_packets, prop_delay, tx_time, gen_prob, protocol, seed=None, max_time=400,
+                  progress=None, persistence=0.4, state=None, checkpoint=None):
+    """
+    ``persistence`` is the p of p-persistent CSMA: when the channel is idle,
+    each ready node transmits with probability p and defers to the next slot
+    otherwise. The other variants ignore it.
+
+    Returns:
+        usage_log: EventLog (slot, code, node, count) with code in {IDLE, BUSY, SUCCESS, COLLISION};
+                   node is the successful sender, NO_NODE otherwise
+        success_count, collision_count, efficiency, throughput, utilization,
+        node_states: (num_nodes, max_time) int8 matrix, 0 = idle, 1 = success, 2 = collision
+        channel: ChannelStats over the slot outcomes (batch-means confidence intervals)
+        packets: ``packet_sketches()`` of the delivered packets and of every backoff drawn
+    """
+    params = {"num_nodes": num_nodes, "num_packets": num_packets, "prop_delay": prop_delay, "tx_time": tx_time,
+              "gen_prob": gen_prob, "protocol": protocol, "persistence": persistence, "seed": seed}
+    run = _resume(state, "csma", params, int(max_time), lambda: {
+        "time": 0, "rng": np.random.RandomState(seed), "log": slot_log(max_time),
+        "channel": ChannelStats(batch_size_for(max_time)), "node_states": np.zeros((num_nodes, 0), dtype=np.int8),
+        "busy_until": 0.0, "backoff": np.zeros(num_nodes), "packet_ready": np.zeros(num_nodes),
+        "ready_since": np.zeros(num_nodes, dtype=np.int64), "attempts": np.zeros(num_nodes),
+        "packets": packet_sketches()})
+    rng, usage_log, channel, node_states = run["rng"], run["log"], run["channel"], run["node_states"]
+    report_every = _progress_every(max_time)
+
+    channel_busy_until = run["busy_until"]
+    backoff = run["backoff"]
+    packet_ready = run["packet_ready"]
+    ready_since = run["ready_since"]
+    retransmission_attempts = run["attempts"]
+    packets = run["packets"]
+
+    for t in range(run["time"], int(max_time)):
+        if t % report_every == 0:
+            if progress is not None:
+                progress(t, int(max_time), throughput=channel.rate("throughput"))
+            _checkpoint(checkpoint, run, int(max_time), time=t, busy_until=channel_busy_until, backoff=backoff)
+
+        # Packet generation (nodes get packets to send)
+        for i in range(num_nodes):
+            if rng.rand() < gen_prob:
+                if not packet_ready[i]:
+                    ready_since[i] = t
+                packet_ready[i] = 1
+
+        # Nodes ready to sense and not backing off
+        sensing_nodes = [i for i in range(num_nodes) if packet_ready[i] == 1 and backoff[i] <= 0]
+
+        # If channel is busy (we approximate using channel_busy_until)
+        if t < channel_busy_until:
+            # Behaviors when busy
+            if protocol == "Non-Persistent CSMA":
+                for i in sensing_nodes:
+                    backoff[i] = rng.randint(2, 8)  # wait some slots
+                    packets["backoff"].add(backoff[i])
+            # p-persistent nodes keep sensing and decide once the channel goes idle
+            # nodes stay idle in node_states while the channel is busy (they back off)
+            usage_log.append(t, BUSY, NO_NODE, 0)
+            channel.add(BUSY)
+            backoff = np.maximum(backoff - 1, 0)
+            continue
+
+        # Channel is free -> attempt
+        if protocol == "p-Persistent CSMA (CSMA/CD)":
+            sensing_nodes = [i for i in sensing_nodes if rng.rand() < persistence]
+        if len(sensing_nodes) == 0:
+            usage_log.append(t, IDLE, NO_NODE, 0)
+            channel.add(IDLE)
+        elif len(sensing_nodes) == 1:
+            # Successful transmission
+            node = sensing_nodes[0]
+            usage_log.append(t, SUCCESS, node, 1)
+            channel.add(SUCCESS)
+            packets["delay"].add(t - ready_since[node] + 1)
+            packets["attempts"].add(retransmission_attempts[node] + 1)
+            packet_ready[node] = 0
+            retransmission_attempts[node] = 0
+            node_states[node, t] = 1
+            # channel busy for tx_time slots
+            channel_busy_until = t + max(1.0, tx_time)
+        else:
+            # Collision among sensing_nodes
+            usage_log.append(t, COLLISION, NO_NODE, len(sensing_nodes))
+            channel.add(COLLISION)
+            # exponential backoff based on retransmission attempts
+            for i in sensing_nodes:
+                retransmission_attempts[i] += 1
+                k = int(min(retransmission_attempts[i], 10))
+                backoff[i] = rng.randint(1, 2 ** k)  # integer slots
+                packets["backoff"].add(backoff[i])
+            # mark which nodes collided
+            node_states[sensing_nodes, t] = 2
+            # collisions also occupy the medium (approx 1 slot)
+            channel_busy_until = t + max(1.0, tx_time * 0.5)
+        # decrement backoffs
+        backoff = np.maximum(backoff - 1, 0)
+
+    total_slots = int(max_time)
+    success_count = channel.count(SUCCESS)
+    collision_count = channel.count(COLLISION)
+    # Efficiency defined as successful transmissions / total slots
+    efficiency = channel.rate("throughput")
+    # Throughput as successful packets per time unit (slots)
+    throughput = channel.rate("throughput")
+    # Utilization = fraction of slots where the channel was non-idle (success or collision)
+    utilization = channel.rate("utilization")
+
+    if progress is not None:
+        progress(total_slots, total_slots, throughput=throughput)
+
+    _keep(state, run, time=total_slots, busy_until=channel_busy_until, backoff=backoff)
+    return (usage_log, success_count, collision_count, efficiency, throughput, utilization, node_states, channel,
+            packets)
+
+
+# --------------------- CSMA/CA ---------------------
+def simulate_csma_ca(num_nodes, num_packets, prop_delay, tx_time, gen_prob, variant="Basic CSMA/CA", seed=None,
+                     max_time=400, progress=None, state=None, checkpoint=None):
+    """Same outputs as ``simulate_csma``."""
+    params = {"num_nodes": num_nodes, "num_packets": num_packets, "prop_delay": prop_delay, "tx_time": tx_time,
+              "gen_prob": gen_prob, "variant": variant, "seed": seed}
+    run = _resume(state, "csma_ca", params, int(max_time), lambda: {
+        "time": 0, "rng": np.random.RandomState(seed), "log": slot_log(max_time),
+        "channel": ChannelStats(batch_size_for(max_time)), "node_states": np.zeros((num_nodes, 0), dtype=np.int8),
+        "busy_until": 0.0, "backoff": np.zeros(num_nodes), "packet_ready": np.zeros(num_nodes),
+        "ready_since": np.zeros(num_nodes, dtype=np.int64), "tries": np.zeros(num_nodes, dtype=np.int64),
+        "packets": packet_sketches()})
+    rng, usage_log, channel, node_states = run["rng"], run["log"], run["channel"], run["node_states"]
+    report_every = _progress_every(max_time)
+
+    channel_busy_until = run["busy_until"]
+    backoff = run["backoff"]
+    packet_ready = run["packet_ready"]
+    ready_since = run["ready_since"]
+    tries = run["tries"]
+    packets = run["packets"]
+
+    for t in range(run["time"], int(max_time)):
+        if t % report_every == 0:
+            if progress is not None:
+                progress(t, int(max_time), throughput=channel.rate("throughput"))
+            _checkpoint(checkpoint, run, int(max_time), time=t, busy_until=channel_busy_until, backoff=backoff)
+
+        # Packet generation
+        for i in range(num_nodes):
+            if rng.rand() < gen_prob:
+                if not packet_ready[i]:
+                    ready_since[i] = t
+                packet_ready[i] = 1
+
+        active_nodes = [i for i in range(num_nodes) if packet_ready[i] == 1 and backoff[i] <= 0]
+
+        # Channel busy
+        if t < channel_busy_until:
+            usage_log.append(t, BUSY, NO_NODE, 0)
+            channel.add(BUSY)
+            backoff = np.maximum(backoff - 1, 0)
+            continue
+
+        if len(active_nodes) == 0:
+            usage_log.append(t, IDLE, NO_NODE, 0)
+            channel.add(IDLE)
+        elif len(active_nodes) == 1:
+            node = active_nodes[0]
+            usage_log.append(t, SUCCESS, node, 1)
+            channel.add(SUCCESS)
+
+            # RTS/CTS handshake delay
+            if variant == "CSMA/CA with RTS/CTS":
+                handshake_time = 0.5 * tx_time
+                channel_busy_until = t + tx_time + handshake_time
+            else:
+                channel_busy_until = t + tx_time
+
+            packets["delay"].add(t - ready_since[node] + 1)
+            packets["attempts"].add(tries[node] + 1)
+            packet_ready[node] = 0
+            tries[node] = 0
+            node_states[node, t] = 1
+        else:
+            # Virtual collisions due to RTS overlaps
+            usage_log.append(t, COLLISION, NO_NODE, len(active_nodes))
+            channel.add(COLLISION)
+            for i in active_nodes:
+                backoff[i] = rng.randint(1, 8)
+                packets["backoff"].add(backoff[i])
+                tries[i] += 1
+            node_states[active_nodes, t] = 2
+            channel_busy_until = t + tx_time * 0.5
+
+        backoff = np.maximum(backoff - 1, 0)
+
+    total_slots = int(max_time)
+    success_count = channel.count(SUCCESS)
+    collision_count = channel.count(COLLISION)
+    efficiency = channel.rate("throughput")
+    throughput = channel.rate("throughput")
+    utilization = channel.rate("utilization")
+
+    if progress is not None:
+        progress(total_slots, total_slots, throughput=throughput)
+
+    _keep(state, run, time=total_slots, busy_until=channel_busy_until, backoff=backoff)
+    return (usage_log, success_count, collision_count, efficiency, throughput, utilization, node_states, channel,
+            packets)
+
+
+# --------------------- SLOTTED ALOHA ---------------------
+def simulate_slotted_aloha(num_nodes, p, num_slots, seed=None, progress=None, state=None, checkpoint=None):
+    """
+    Simulate Slotted ALOHA protocol
+
+    Slots are independent, so they are drawn in vectorised chunks (one chunk
+    per progress report); the random stream is the same as drawing one slot
+    at a time.
+
+    Returns:
+    - slots_log: EventLog (slot, code, node, count) - status code, the successful node
+      (NO_NODE otherwise) and number of transmissions per slot
+    - node_states: (num_nodes, num_slots) int8 matrix, 0 = idle, 1 = success, 2 = collision
+    - statistics: Dictionary with overall statistics ("channel" holds the ChannelStats)
+    """
+    run = _resume(state, "slotted_aloha", {"num_nodes": num_nodes, "p": p, "seed": seed}, num_slots, lambda: {
+        "time": 0, "rng": np.random.RandomState(seed), "log": slot_log(num_slots),
+        "channel": ChannelStats(batch_size_for(num_slots)), "node_states": np.zeros((num_nodes, 0), dtype=np.int8)})
+    rng, slots_log, channel, node_states = run["rng"], run["log"], run["channel"], run["node_states"]
+    chunk = _progress_every(num_slots)
+
+    for start in range(run["time"], num_slots, chunk):
+        if progress is not None:
+            progress(start, num_slots, throughput=channel.rate("throughput"))
+        _checkpoint(checkpoint, run, num_slots, time=start)
+        stop = min(start + chunk, num_slots)
+
+        # Each node decides to transmit with probability p, for every slot of the chunk
+        transmitting = rng.random_sample((stop - start, num_nodes)) < p
+        num_transmissions = transmitting.sum(axis=1)
+
+        codes = np.select([num_transmissions == 0, num_transmissions == 1], [IDLE, SUCCESS], COLLISION)
+        winners = np.where(num_transmissions == 1, transmitting.argmax(axis=1), NO_NODE)
+        node_states[:, start:stop] = (transmitting * codes[:, None]).T
+
+        slots_log.extend(slot=np.arange(start, stop), code=codes, node=winners, count=num_transmissions)
+        channel.add_many(codes)
+
+    # Calculate throughput (successful transmissions per slot)
+    throughput = channel.rate("throughput")
+
+    # Theoretical maximum throughput for Slotted ALOHA is 1/e ≈ 0.368
+    theoretical_max = 1 / np.e
+
+    # Calculate offered load (G = N * p)
+    offered_load = num_nodes * p
+
+    statistics = {
+        "successful": channel.count(SUCCESS),
+        "collisions": channel.count(COLLISION),
+        "idle": channel.count(IDLE),
+        "throughput": throughput,
+        "theoretical_max": theoretical_max,
+        "offered_load": offered_load,
+        "efficiency": (throughput / theoretical_max) * 100,
+        "channel": channel
+    }
+
+    if progress is not None:
+        progress(num_slots, num_slots, throughput=throughput)
+
+    _keep(state, run, time=num_slots)
+    return slots_log, node_states, statistics
+
+
+# --------------------- BACKLOGGED SLOTTED ALOHA ---------------------
+CONTROLLERS = ["Fixed q_r", "Pseudo-Bayesian (Rivest)"]
+
+
+def _choose(m, k, rng):
+    """
+    ``k`` distinct random indices below ``m``. A few of many: uniform draws
+    with replacement marked in a mask, topped up until ``k`` are marked.
+    Otherwise the positions of the ``k`` smallest of ``m`` uniform keys.
+    """
+    if k == 1:
+        return np.array([rng.randint(m)])
+    if 16 * k >= m:
+        return rng.random_sample(m).argpartition(k - 1)[:k]
+    mask = np.zeros(m, dtype=bool)
+    marked = 0
+    while marked < k:
+        mask[rng.randint(0, m, k - marked)] = True
+        marked = np.count_nonzero(mask)
+    return np.flatnonzero(mask)
+
+
+def _admit(order, n, picked):
+    """Move the nodes at positions ``picked`` (distinct, all >= ``n``) of ``order`` to ``order[n:n + len(picked)]``."""
+    k = len(picked)
+    if k == 1:
+        i = picked[0]
+        order[n], order[i] = order[i], order[n]
+        return
+    inside = picked < n + k
+    taken = np.zeros(k, dtype=bool)
+    taken[picked[inside] - n] = True
+    vacant, outside = n + np.flatnonzero(~taken), picked[~inside]
+    order[vacant], order[outside] = order[outside], order[vacant]
+
+
+def _packet_counts(nodes, slots, codes, state):
+    """
+    Per-packet counts for the (time-ordered) attempts of one chunk: the
+    transmissions each delivered packet took, and the backoff before each
+    retransmission (idle slots since the node's previous, collided attempt).
+
+    ``state`` holds per-node arrays carried across chunks and updated in
+    place: ``sent`` (attempts so far), ``last_success`` (``sent`` at the last
+    success), ``last_slot`` and ``last_code`` (of the latest attempt).
+    """
+    if not len(nodes):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Sort by node, then by log position; the keys are distinct, so the faster unstable sort keeps log order.
+    order = np.argsort(nodes.astype(np.int64) * len(nodes) + np.arange(len(nodes)))
+    by_node, by_slot, by_code = nodes[order], slots[order], codes[order]
+    first = np.r_[True, by_node[1:] != by_node[:-1]]
+    starts = np.flatnonzero(first)
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    cumulative = state["sent"][by_node] + rank + 1
+
+    won = by_code == SUCCESS
+    won_nodes, won_cumulative = by_node[won], cumulative[won]
+    same = np.r_[False, won_nodes[1:] == won_nodes[:-1]]
+    previous = np.where(same, np.r_[0, won_cumulative[:-1]], state["last_success"][won_nodes])
+
+    previous_slot = np.where(first, state["last_slot"][by_node], np.r_[0, by_slot[:-1]])
+    previous_code = np.where(first, state["last_code"][by_node], np.r_[0, by_code[:-1]])
+    retry = previous_code == COLLISION
+
+    np.maximum.at(state["last_success"], won_nodes, won_cumulative)
+    state["sent"] += np.bincount(nodes, minlength=len(state["sent"]))
+    last = np.r_[starts[1:] - 1, len(order) - 1]
+    state["last_slot"][by_node[last]] = by_slot[last]
+    state["last_code"][by_node[last]] = by_code[last]
+    return won_cumulative - previous, (by_slot - previous_slot - 1)[retry]
+
+
+def simulate_backlogged_aloha(num_nodes, q_a, q_r, num_slots, controller="Fixed q_r", seed=None, progress=None,
+                              state=None, checkpoint=None):
+    """
+    Slotted ALOHA with a backlog (Bertsekas & Gallager, sec. 4.2): a node
+    holds at most one packet. A node without one gets a new packet with
+    probability ``q_a`` per slot; a node whose packet has collided is
+    backlogged and retransmits with probability ``q_r`` until it succeeds.
+
+    With the "Fixed q_r" controller new packets are sent in their arrival
+    slot, exactly as in ``analytic.slotted_aloha_chain``, and the backlog
+    can drift into the unstable high-backlog regime. The pseudo-Bayesian
+    controller (Rivest) treats new packets as backlogged on arrival and sets
+    every transmission probability to min(1, 1/n) from a running estimate
+    n of the backlog: n <- max(lam, n + lam - 1) after an idle or success
+    slot, n + lam + 1/(e - 2) after a collision, lam = q_a (N - n) being the
+    expected arrivals.
+
+    Nodes are interchangeable within the backlogged and free groups, so
+    each slot draws only the binomial counts and then picks that many
+    positions at once (``_choose``) in ``order``, an int array permutation
+    of the nodes that keeps the backlogged ones first. Both counts depend on
+    the backlog left by the previous slot, so the loop over slots stays, but
+    each slot costs a few NumPy calls whatever the number of transmissions.
+    Senders, outcomes and delays go into per-chunk arrays, and the per-node
+    state (arrival slot, attempts sent) into arrays indexed by node.
+
+    Returns:
+    - slots_log: EventLog (slot, code, node, count) as in ``simulate_slotted_aloha``
+    - attempts: EventLog (node, slot, code) - one row per transmission
+    - statistics: Dictionary with overall statistics; "backlog" holds the
+      backlog at the end of every slot, "delay" and "attempts_per_packet"
+      the RunningStats of delivered packets ("delay" counts slots from
+      arrival to success, inclusive), "packets" their ``packet_sketches()``
+      (backoff: idle slots between a collision and the retransmission),
+      "channel" the ChannelStats
+    """
+    if controller not in CONTROLLERS:
+        raise ValueError(f"unknown controller: {controller}")
+    params = {"num_nodes": num_nodes, "q_a": q_a, "q_r": q_r, "controller": controller, "seed": seed}
+    run = _resume(state, "backlogged_aloha", params, num_slots, lambda: {
+        "time": 0, "rng": np.random.RandomState(seed), "log": slot_log(num_slots), "attempts": attempt_log(num_slots),
+        "channel": ChannelStats(batch_size_for(num_slots)), "delay": RunningStats(),
+        "attempts_per_packet": RunningStats(), "backlog": np.zeros(0, dtype=np.int32),
+        # order[:n] are the backlogged nodes.
+        "order": np.arange(num_nodes, dtype=np.int32), "arrived": np.zeros(num_nodes, dtype=np.int64),
+        "packets": packet_sketches(),
+        "per_node": {"sent": np.zeros(num_nodes, dtype=np.int64), "last_success": np.zeros(num_nodes, dtype=np.int64),
+                     "last_slot": np.zeros(num_nodes, dtype=np.int64), "last_code": np.zeros(num_nodes, dtype=np.int8)},
+        "n": 0, "arrivals": 0, "estimate": 1.0})
+    rng, slots_log, attempts, channel = run["rng"], run["log"], run["attempts"], run["channel"]
+    chunk = _progress_every(num_slots)
+    pseudo_bayesian = controller == "Pseudo-Bayesian (Rivest)"
+
+    delay = run["delay"]
+    attempts_per_packet = run["attempts_per_packet"]
+    backlog = run["backlog"]
+
+    order, arrived = run["order"], run["arrived"]
+    packets = run["packets"]
+    per_node = run["per_node"]
+    n = run["n"]
+    arrivals = run["arrivals"]
+    estimate = run["estimate"]
+    collision_step = 1 / (np.e - 2)
+
+    for start in range(run["time"], num_slots, chunk):
+        if progress is not None:
+            progress(start, num_slots, throughput=channel.rate("throughput"), backlog=n)
+        _checkpoint(checkpoint, run, num_slots, time=start, n=n, arrivals=arrivals, estimate=estimate)
+        stop = min(start + chunk, num_slots)
+        counts = np.zeros(stop - start, dtype=np.int64)
+        winners = np.full(stop - start, NO_NODE, dtype=np.int32)
+        delays = np.zeros(stop - start, dtype=np.int64)
+        senders = []
+
+        for t in range(start, stop):
+            new = rng.binomial(num_nodes - n, q_a)
+            if new:
+                _admit(order, n, n + _choose(num_nodes - n, new, rng))
+                arrived[order[n:n + new]] = t
+                arrivals += new
+            if pseudo_bayesian:
+                n += new
+                k = rng.binomial(n, min(1.0, 1 / estimate))
+                sending = _choose(n, k, rng) if k else None
+            else:
+                k = rng.binomial(n, q_r)
+                sending = _choose(n, k, rng) if k else None
+                if new:
+                    block = np.arange(n, n + new)
+                    sending = block if sending is None else np.concatenate([sending, block])
+                n += new
+                k += new
+
+            if k == 1:
+                # The winner leaves the backlog: swap it with the last backlogged node.
+                i = sending[0]
+                winner = order[i]
+                order[i], order[n - 1] = order[n - 1], winner
+                n -= 1
+                winners[t - start] = winner
+                delays[t - start] = t - arrived[winner] + 1
+            if k:
+                senders.append(order[sending] if k > 1 else [winner])
+            counts[t - start] = k
+
+            if pseudo_bayesian:
+                lam = q_a * max(num_nodes - estimate, 0.0)
+                estimate = estimate + lam + collision_step if k > 1 else max(lam, estimate + lam - 1)
+                estimate = max(estimate, 1.0)
+            backlog[t] = n
+
+        codes = np.where(counts == 0, IDLE, np.where(counts == 1, SUCCESS, COLLISION)).astype(np.int8)
+        slots = np.arange(start, stop)
+        slots_log.extend(slot=slots, code=codes, node=winners, count=counts)
+        tx_nodes = np.concatenate(senders).astype(np.int32) if senders else np.zeros(0, dtype=np.int32)
+        tx_slots = np.repeat(slots, counts)
+        tx_codes = np.repeat(codes, counts)
+        attempts.extend(node=tx_nodes, slot=tx_slots, code=tx_codes)
+        channel.add_many(codes)
+        delays = delays[codes == SUCCESS]
+        tried, backoffs = _packet_counts(tx_nodes, tx_slots, tx_codes, per_node)
+        delay.add_many(delays)
+        attempts_per_packet.add_many(tried)
+        packets["delay"].add_many(delays)
+        packets["attempts"].add_many(tried)
+        packets["backoff"].add_many(backoffs)
+
+    throughput = channel.rate("throughput")
+    statistics = {
+        "successful": channel.count(SUCCESS),
+        "collisions": channel.count(COLLISION),
+        "idle": channel.count(IDLE),
+        "throughput": throughput,
+        "theoretical_max": 1 / np.e,
+        "offered_load": len(attempts) / num_slots,
+        "arrivals": arrivals,
+        "arrival_rate": arrivals / num_slots,
+        "backlog": backlog,
+        "mean_backlog": float(backlog.mean()),
+        "delay": delay,
+        "attempts_per_packet": attempts_per_packet,
+        "packets": packets,
+        "controller": controller,
+        "channel": channel
+    }
+
+    if progress is not None:
+        progress(num_slots, num_slots, throughput=throughput, backlog=n)
+
+    _keep(state, run, time=num_slots, n=n, arrivals=arrivals, estimate=estimate)
+    return slots_log, attempts, statistics
+
+
+# --------------------- PURE ALOHA ---------------------
+def simulate_pure_aloha(num_nodes, p, num_time_units, packet_duration, seed=None, progress=None, state=None,
+                        checkpoint=None):
+    """
+    Simulate Pure ALOHA protocol
+
+    In Pure ALOHA, nodes can transmit at any time. A collision occurs if
+    any part of a packet overlaps with another packet.
+
+    Progress is reported over two phases: the time-unit loop, then the
+    pairwise overlap check over all attempts.
+
+    An attempt still on air at the horizon may yet collide with one that
+    starts later, so a resumed run checks those attempts again; attempts
+    that ended by the horizon are settled.
+
+    Returns:
+    - time_units_log: EventLog (slot, code, node, count) - channel status per time unit
+      (IDLE, TRANSMITTING or COLLISION) and number of active transmissions
+    - transmissions: EventLog (node, start, end, code) - one row per attempt, code SUCCESS or COLLISION
+    - statistics: Dictionary with overall statistics ("channel" holds the ChannelStats of the
+      per-time-unit status, "attempt_success" the RunningStats of each attempt's outcome)
+    """
+    params = {"num_nodes": num_nodes, "p": p, "packet_duration": packet_duration, "seed": seed}
+    run = _resume(state, "pure_aloha", params, num_time_units, lambda: {
+        "time": 0, "rng": np.random.RandomState(seed), "log": slot_log(num_time_units),
+        "channel": ChannelStats(batch_size_for(num_time_units)), "active": {}, "transmissions": [],
+        "settled": 0, "successful": 0, "collisions": 0, "attempt_success": RunningStats()})
+    rng, time_units_log, channel = run["rng"], run["log"], run["channel"]
+    report_every = _progress_every(num_time_units)
+    # Totals start from the settled attempts; the overlap check below adds the rest.
+    attempt_success = run["attempt_success"]
+
+    # Track ongoing transmissions: {node_id: end_time}
+    active_transmissions = run["active"]
+
+    # Track all transmission events
+    all_transmissions = run["transmissions"]  # (node_id, start_time, end_time, outcome code)
+
+    successful_transmissions = run["successful"]
+    collisions = run["collisions"]
+
+    for t in range(run["time"], num_time_units):
+        if t % report_every == 0:
+            if progress is not None:
+                progress(t, 2 * num_time_units, attempts=len(all_transmissions))
+            _checkpoint(checkpoint, run, num_time_units, time=t)
+
+        # Clean up completed transmissions
+        completed_nodes = [node for node, end_time in active_transmissions.items() if end_time <= t]
+        for node in completed_nodes:
+            del active_transmissions[node]
+
+        # Each node decides to transmit with probability p (if not already transmitting)
+        for node in range(num_nodes):
+            if node not in active_transmissions and rng.random_sample() < p:
+                # Node attempts to transmit
+                end_time = t + packet_duration
+                active_transmissions[node] = end_time
+                all_transmissions.append([node, t, end_time, None])  # Status to be determined
+
+        # Check current status
+        num_active = len(active_transmissions)
+
+        if num_active == 0:
+            status = IDLE
+        elif num_active == 1:
+            status = TRANSMITTING
+        else:
+            status = COLLISION
+
+        time_units_log.append(t, status, NO_NODE, num_active)
+        channel.add(status)
+
+    # Determine success/collision for each transmission not settled yet. Attempts
+    # are in start order and last equally long, so the settled ones are a prefix.
+    settled = run["settled"]
+    while settled < len(all_transmissions) and all_transmissions[settled][2] <= num_time_units:
+        settled += 1
+    kept = None
+    check_every = _progress_every(len(all_transmissions))
+    for i in range(run["settled"], len(all_transmissions)):
+        if i == settled:
+            kept = (successful_transmissions, collisions, copy.copy(attempt_success))
+        trans_i = all_transmissions[i]
+        if progress is not None and i % check_every == 0:
+            done = num_time_units + num_time_units * i // len(all_transmissions)
+            progress(done, 2 * num_time_units, throughput=successful_transmissions / num_time_units)
+
+        node_i, start_i, end_i, _ = trans_i
+        has_collision = False
+
+        # Check overlap with other transmissions
+        for j, trans_j in enumerate(all_transmissions):
+            if i == j:
+                continue
+            node_j, start_j, end_j, _ = trans_j
+
+            # Check if transmissions overlap
+            if not (end_i <= start_j or end_j <= start_i):
+                has_collision = True
+                break
+
+        if has_collision:
+            all_transmissions[i][3] = COLLISION
+            collisions += 1
+        else:
+            all_transmissions[i][3] = SUCCESS
+            successful_transmissions += 1
+        attempt_success.add(not has_collision)
+
+    transmissions = transmission_log(len(all_transmissions))
+    if all_transmissions:
+        node_col, start_col, end_col, code_col = zip(*all_transmissions)
+        transmissions.extend(node=node_col, start=start_col, end=end_col, code=code_col)
+
+    # Calculate throughput (successful transmissions per time unit)
+    throughput = successful_transmissions / num_time_units
+
+    # Theoretical maximum throughput for Pure ALOHA is 1/(2e) ≈ 0.184
+    theoretical_max = 1 / (2 * np.e)
+
+    # Calculate offered load (G = N * p)
+    offered_load = num_nodes * p
+
+    statistics = {
+        "successful": successful_transmissions,
+        "collisions": collisions,
+        "idle": channel.count(IDLE),
+        "throughput": throughput,
+        "theoretical_max": theoretical_max,
+        "offered_load": offered_load,
+        "efficiency": (throughput / theoretical_max) * 100,
+        "total_transmissions": len(all_transmissions),
+        "channel": channel,
+        "attempt_success": attempt_success
+    }
+
+    if progress is not None:
+        progress(2 * num_time_units, 2 * num_time_units, throughput=throughput)
+
+    if kept is None:
+        kept = (successful_transmissions, collisions, copy.copy(attempt_success))
+    _keep(state, run, time=num_time_units, settled=settled, successful=kept[0], collisions=kept[1],
+          attempt_success=kept[2])
+    return time_units_log, transmissions, statistics
+
+
+# --------------------- COMPARISON (multi-run averaging to stabilize) ---------------------
+def run_compare(simulate, protocols, runs, progress=None, **kwargs):
+    """
+    Average efficiency, throughput and utilization of ``simulate`` (one of the
+    CSMA engines) over ``runs`` randomly seeded runs per protocol variant.
+    A ``persistence`` keyword is passed through to engines that take one.
+    """
+    extra = {"persistence": kwargs["persistence"]} if "persistence" in kwargs else {}
+    effs, thrs, utils = [], [], []
+    for p_idx, proto in enumerate(protocols):
+        proto_effs = []
+        proto_ths = []
+        proto_utils = []
+        for r in range(runs):
+            seed = new_seed()
+            _, s_cnt, c_cnt, eff, thr, util, _, _, _ = simulate(
+                kwargs['num_nodes'], kwargs['num_packets'],
+                kwargs['prop_delay'], kwargs['tx_time'],
+                kwargs['gen_prob'], proto, seed=seed, max_time=kwargs.get('max_time', 400), **extra
+            )
+            proto_effs.append(eff)
+            proto_ths.append(thr)
+            proto_utils.append(util)
+            if progress is not None:
+                progress(p_idx * runs + r + 1, len(protocols) * runs, protocol=proto)
+        # average across runs
+        effs.append(np.mean(proto_effs))
+        thrs.append(np.mean(proto_ths))
+        utils.append(np.mean(proto_utils))
+    return effs, thrs, utils
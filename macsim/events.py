@@ -0,0 +1,161 @@
+"""
+Compact columnar event logs.
+
+Engines record one row per slot (or per transmission) as small integer codes
+in preallocated NumPy columns instead of Python tuples of strings. Labels
+such as "Success" only appear when a log is turned into a DataFrame for
+display, where the status becomes a ``pd.Categorical`` and node ids a
+nullable ``Int32`` column, both of which map directly onto Arrow types.
+"""
+import numpy as np
+import pandas as pd
+
+# Status codes shared by every engine (int8 in the logs).
+IDLE, SUCCESS, COLLISION, BUSY, TRANSMITTING = range(5)
+STATUS_LABELS = ["Idle", "Success", "Collision", "Busy", "Transmitting"]
+STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+
+# Node column value for rows that don't belong to a single node.
+NO_NODE = -1
+
+
+class EventLog:
+    """
+    Growable set of equal-length NumPy columns.
+
+    ``EventLog(capacity, slot=np.int32, code=np.int8, node=np.int32)``
+    declares the columns in order; ``append`` takes one value per column in
+    that order and ``extend`` appends whole arrays at once.
+    """
+
+    def __init__(self, capacity=1024, **columns):
+        self.names = list(columns)
+        self._data = {name: np.empty(max(1, int(capacity)), dtype=dtype) for name, dtype in columns.items()}
+        self._size = 0
+        self._orders = {}
+
+    def __len__(self):
+        return self._size
+
+    def __getstate__(self):
+        # Pickles and copies (checkpoints, resumed runs) keep only the filled rows, not the spare capacity or sort cache.
+        return {"names": self.names, "columns": self.columns()}
+
+    def __setstate__(self, state):
+        self.names = state["names"]
+        self._data = {name: np.require(state["columns"][name], requirements="W") for name in self.names}
+        self._size = len(state["columns"][self.names[0]])
+        self._orders = {}
+
+    def __getitem__(self, name):
+        return self._data[name][:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(next(iter(self._data.values())))
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            for name, column in self._data.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._data[name] = grown
+
+    def append(self, *values):
+        self._reserve(1)
+        i = self._size
+        for name, value in zip(self.names, values):
+            self._data[name][i] = value
+        self._size += 1
+
+    def extend(self, **arrays):
+        n = len(next(iter(arrays.values())))
+        self._reserve(n)
+        for name in self.names:
+            self._data[name][self._size:self._size + n] = arrays[name]
+        self._size += n
+
+    def order(self, name, descending=False):
+        """
+        Stable argsort of column ``name`` (ties stay in log order), computed
+        once per column, direction and log length.
+        """
+        key = (name, descending, self._size)
+        if key not in self._orders:
+            self._orders = {k: v for k, v in self._orders.items() if k[2] == self._size}
+            values = self[name].astype(np.int64)
+            self._orders[key] = np.argsort(-values if descending else values, kind="stable").astype(np.int32)
+        return self._orders[key]
+
+    def select(self, codes=None, nodes=None, sort_by=None, descending=False):
+        """
+        Row indices matching the status ``codes`` and ``nodes`` filters (None
+        means no filter), in log order or ordered by column ``sort_by``.
+        """
+        mask = np.ones(self._size, dtype=bool)
+        if codes is not None:
+            mask &= np.isin(self["code"], codes)
+        if nodes is not None:
+            mask &= np.isin(self["node"], nodes)
+        if sort_by is None:
+            rows = np.flatnonzero(mask)
+            return rows[::-1] if descending else rows
+        order = self.order(sort_by, descending)
+        return order[mask[order]]
+
+    def columns(self):
+        return {name: self[name] for name in self.names}
+
+    @property
+    def nbytes(self):
+        return sum(self[name].nbytes for name in self.names)
+
+    def to_frame(self, headers, categories=None, rows=None):
+        """
+        DataFrame for display/export. ``headers`` maps column name -> column
+        title (and fixes the order); the ``code`` column becomes a categorical
+        over ``categories`` (status labels, default: all) and ``node`` a
+        nullable Int32 with NA where no single node applies. ``rows`` limits
+        the frame to those row indices (indexed by them).
+        """
+        frame = {}
+        for name, title in headers.items():
+            values = self[name] if rows is None else self[name][rows]
+            if name == "code":
+                frame[title] = status_categorical(values, categories)
+            elif name == "node":
+                frame[title] = pd.arrays.IntegerArray(values.astype(np.int32), values == NO_NODE)
+            else:
+                frame[title] = values
+        return pd.DataFrame(frame, index=rows)
+
+
+def status_lookup(categories=None):
+    """
+    ``(categories, lut)``: the status labels to keep (default: all) and the
+    table mapping each status code to its index in them, -1 for the others.
+    """
+    categories = list(categories or STATUS_LABELS)
+    lut = np.full(len(STATUS_LABELS), -1, dtype=np.int8)
+    lut[[STATUS_CODES[label] for label in categories]] = np.arange(len(categories))
+    return categories, lut
+
+
+def status_categorical(codes, categories=None):
+    """``pd.Categorical`` of status labels for int8 ``codes`` without building any strings per row."""
+    categories, lut = status_lookup(categories)
+    return pd.Categorical.from_codes(lut[np.asarray(codes)], categories=categories)
+
+
+def slot_log(capacity):
+    """Per-slot channel log: slot index, status code, node (successful sender) and transmission count."""
+    return EventLog(capacity, slot=np.int32, code=np.int8, node=np.int32, count=np.int16)
+
+
+def attempt_log(capacity=1024):
+    """Per-attempt log for slotted protocols with node identities: node, slot and outcome code."""
+    return EventLog(capacity, node=np.int32, slot=np.int32, code=np.int8)
+
+
+def transmission_log(capacity=1024):
+    """Per-transmission log for unslotted protocols: node, start, end and outcome code."""
+    return EventLog(capacity, node=np.int32, start=np.int32, end=np.int32, code=np.int8)
@@ -0,0 +1,92 @@
+"""
+Lazy exports of columnar event logs.
+
+Nothing here runs until a download is actually requested. CSV is produced
+a chunk of rows at a time into a spooled temporary file (optionally through
+gzip), so the full CSV string never sits in memory next to the log; Parquet
+and Feather are written straight from the NumPy columns through Arrow
+(pyarrow ships with Streamlit) without building a DataFrame first.
+"""
+import gzip
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from macsim.events import NO_NODE, status_lookup
+
+CHUNK_ROWS = 65536
+
+# Spooled files stay in memory up to this size, then move to disk.
+SPOOL_BYTES = 8 * 1024 * 1024
+
+# format -> (MIME type, file extension)
+FORMATS = {
+    "CSV": ("text/csv", ".csv"),
+    "CSV.gz": ("application/gzip", ".csv.gz"),
+    "Parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "Feather": ("application/vnd.apache.arrow.file", ".feather"),
+}
+
+
+def iter_csv(log, headers, categories=None, chunk_rows=CHUNK_ROWS):
+    """CSV text of ``log.to_frame(headers, categories)`` in chunks of ``chunk_rows`` rows."""
+    yield ",".join(headers.values()) + "\n"
+    for start in range(0, len(log), chunk_rows):
+        rows = np.arange(start, min(start + chunk_rows, len(log)))
+        yield log.to_frame(headers, categories=categories, rows=rows).to_csv(index=False, header=False)
+
+
+def to_arrow(log, headers, categories=None):
+    """
+    Arrow table straight from the log's columns: the status code becomes a
+    dictionary-encoded label column and ``NO_NODE`` a null node.
+    """
+    categories, lut = status_lookup(categories)
+    arrays = []
+    for name in headers:
+        values = log[name]
+        if name == "code":
+            indices = lut[values]
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(indices, mask=indices < 0), categories))
+        elif name == "node":
+            arrays.append(pa.array(values, mask=values == NO_NODE))
+        else:
+            arrays.append(pa.array(values))
+    return pa.Table.from_arrays(arrays, names=list(headers.values()))
+
+
+def _spooled():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+
+
+def write_csv(log, headers, categories=None, compress=False):
+    out = _spooled()
+    stream = gzip.GzipFile(fileobj=out, mode="wb", mtime=0) if compress else out
+    for chunk in iter_csv(log, headers, categories):
+        stream.write(chunk.encode("utf-8"))
+    if compress:
+        stream.close()
+    out.seek(0)
+    return out
+
+
+def export_log(log, headers, fmt, categories=None):
+    """Binary file object holding ``log`` in format ``fmt`` (a key of ``FORMATS``), rewound to the start."""
+    if fmt == "CSV":
+        return write_csv(log, headers, categories)
+    if fmt == "CSV.gz":
+        return write_csv(log, headers, categories, compress=True)
+
+    table = to_arrow(log, headers, categories)
+    out = _spooled()
+    if fmt == "Parquet":
+        pq.write_table(table, out, compression="zstd")
+    elif fmt == "Feather":
+        feather.write_feather(table, out, compression="zstd")
+    else:
+        raise ValueError(f"unknown export format: {fmt}")
+    out.seek(0)
+    return out
@@ -0,0 +1,66 @@
+"""
+Per-node channel shares and fairness.
+
+Everything works on flat per-attempt event arrays (node, slot, outcome
+code): the nonzero entries of an engine's ``node_states`` matrix, or the
+rows of a transmission log. Counting is done with ``np.bincount``, so the
+cost is linear in the number of attempts and barely depends on the number
+of nodes.
+"""
+import numpy as np
+
+from macsim.events import SUCCESS, COLLISION
+
+
+def state_events(node_states):
+    """(nodes, slots, codes) of every attempt in a ``node_states`` matrix (values are status codes)."""
+    nodes, slots = np.nonzero(node_states)
+    return nodes, slots, node_states[nodes, slots]
+
+
+def node_counts(nodes, codes, num_nodes):
+    """Successes, collisions and attempts per node."""
+    nodes = np.asarray(nodes)
+    codes = np.asarray(codes)
+    successes = np.bincount(nodes[codes == SUCCESS], minlength=num_nodes)
+    collisions = np.bincount(nodes[codes == COLLISION], minlength=num_nodes)
+    attempts = np.bincount(nodes, minlength=num_nodes)
+    return {"successes": successes, "collisions": collisions, "attempts": attempts}
+
+
+def jain_index(values, axis=-1):
+    """
+    Jain's fairness index (sum x)^2 / (n * sum x^2): 1 when every node gets
+    the same share, 1/n when one node gets everything; NaN when all are zero.
+    """
+    values = np.asarray(values, dtype=float)
+    total = values.sum(axis=axis)
+    squares = (values ** 2).sum(axis=axis)
+    n = values.shape[axis]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(squares > 0, total ** 2 / (n * squares), np.nan)
+
+
+def windowed_jain(nodes, slots, codes, num_nodes, num_slots, window, max_points=200):
+    """
+    Short-term fairness: Jain's index of per-node successes inside windows
+    of ``window`` slots sliding across the run.
+
+    Successes are first counted per (block, node) with one bincount, blocks
+    being ``window / 4`` slots (coarser if that would give more than
+    ``max_points`` blocks); each window then sums consecutive blocks through
+    a cumulative sum. Returns (window end slots, index per window).
+    """
+    window = max(1, min(int(window), num_slots))
+    block = max(1, window // 4, -(-num_slots // max_points))
+    per_window = max(1, window // block)
+    num_blocks = -(-num_slots // block)
+
+    won = np.asarray(codes) == SUCCESS
+    cells = np.asarray(slots)[won] // block * num_nodes + np.asarray(nodes)[won]
+    counts = np.bincount(cells, minlength=num_blocks * num_nodes).reshape(num_blocks, num_nodes)
+
+    totals = np.concatenate([np.zeros((1, num_nodes), dtype=np.int64), np.cumsum(counts, axis=0)])
+    in_window = totals[per_window:] - totals[:-per_window]
+    ends = np.minimum(np.arange(per_window, num_blocks + 1) * block, num_slots)
+    return ends, jain_index(in_window, axis=1)
@@ -0,0 +1,128 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its Cancel flag has been set."""
+
+
+class Job:
+    """
+    Handle for one simulation submitted to the background runner.
+
+    The worker thread writes ``done``/``total``/``info`` through ``report``;
+    the Streamlit script thread only reads them, so no lock is needed for
+    the progress fields.
+    """
+
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = "queued"          # queued, running, done, cancelled, failed
+        self.done = 0
+        self.total = 0
+        self.info = {}
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    # ---- worker side ----
+    def report(self, done, total, **info):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done = done
+        self.total = total
+        self.info = {**self.info, "slot": done, "slots": total, **info}
+
+    # ---- script side ----
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    @property
+    def fraction(self):
+        if self.status == "done":
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+def stage(progress, index, count):
+    """
+    Map a sub-task's ``progress(done, total)`` onto slot ``index`` of ``count``
+    equal stages of a composite job, so several engine calls share one bar.
+    """
+    if progress is None:
+        return None
+
+    def _report(done, total, **info):
+        fraction = done / total if total else 1.0
+        progress(int((index + fraction) * 1000), count * 1000, slot=done, slots=total, **info)
+
+    return _report
+
+
+class JobRunner:
+    """
+    Thread pool that runs simulations off the Streamlit script thread.
+
+    ``submit(fn, *args, **kwargs)`` calls ``fn(*args, progress=job.report, **kwargs)``,
+    so any engine (or composite function) that forwards ``progress`` gets
+    progress reporting and cooperative cancellation for free.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="macsim-job")
+        self._ids = itertools.count(1)
+
+    def submit(self, fn, *args, label="Simulation", **kwargs):
+        job = Job(next(self._ids), label)
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = time.perf_counter()
+        try:
+            if job._cancel.is_set():
+                raise JobCancelled()
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as exc:  # surfaced to the page through job.error
+            job.error = exc
+            job.status = "failed"
+        finally:
+            job.finished_at = time.perf_counter()
+            job._finished.set()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Process-wide runner shared by every Streamlit session."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,27 @@
+"""
+Plain JSON types for engine output.
+
+Shared by the HTTP service (job results and progress) and the results
+bundles (statistics and parameters), so neither depends on the other.
+"""
+import numpy as np
+
+from macsim.events import EventLog
+from macsim.stats import ChannelStats, QuantileSketch, RunningStats
+
+
+def to_jsonable(value):
+    """Convert engine output (event logs, tuples, NumPy arrays and scalars) into plain JSON types."""
+    if isinstance(value, EventLog):
+        return to_jsonable(value.columns())
+    if isinstance(value, (ChannelStats, QuantileSketch, RunningStats)):
+        return to_jsonable(value.to_dict())
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
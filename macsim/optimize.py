@@ -0,0 +1,168 @@
+"""
+Throughput-maximizing transmission probability p.
+
+Where the engine has an exact stationary model the optimum comes straight
+from it: p = 1/N for Slotted ALOHA and a golden-section search of
+``analytic.pure_aloha_throughput`` for Pure ALOHA, no simulation at all.
+p-persistent CSMA has no model that matches the engine, so
+``optimal_csma_p`` runs a noise-aware golden-section search over simulation
+replicas instead:
+
+* every candidate p is simulated with the same seeds (common random
+  numbers), so two candidates are compared through paired differences,
+  which are far less noisy than the throughputs themselves;
+* candidates start with a few replicas; when the two being compared can't
+  be told apart, both get more replicas, up to a cap, and the search stops
+  once even that can't separate them (the bracket is then as narrow as the
+  noise allows);
+* replicas are cached per (parameters, p, seed), so golden-section's reused
+  interior point and repeated searches cost nothing.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from macsim.analytic import finite_slotted_throughput, pure_aloha_throughput
+from macsim.engines import simulate_csma
+
+INV_PHI = (math.sqrt(5) - 1) / 2
+
+
+def golden_section(f, lo, hi, tol=1e-4):
+    """Maximize a unimodal ``f`` on [lo, hi]; returns (x, f(x))."""
+    c, d = hi - INV_PHI * (hi - lo), lo + INV_PHI * (hi - lo)
+    fc, fd = f(c), f(d)
+    while hi - lo > tol:
+        if fc >= fd:
+            hi, d, fd = d, c, fc
+            c = hi - INV_PHI * (hi - lo)
+            fc = f(c)
+        else:
+            lo, c, fc = c, d, fd
+            d = lo + INV_PHI * (hi - lo)
+            fd = f(d)
+    x = (lo + hi) / 2
+    return x, f(x)
+
+
+def optimal_slotted_p(num_nodes):
+    """p = 1/N maximizes N p (1 - p)^(N - 1); returns (p, throughput)."""
+    p = 1 / num_nodes
+    return p, float(finite_slotted_throughput(num_nodes, p))
+
+
+def optimal_pure_p(num_nodes, packet_duration):
+    """(p, throughput) maximizing the engine-exact Pure ALOHA throughput."""
+    return golden_section(lambda p: float(pure_aloha_throughput(num_nodes, p, packet_duration)), 1e-4, 1.0)
+
+
+@lru_cache(maxsize=4096)
+def _csma_replica(num_nodes, num_packets, prop_delay, tx_time, gen_prob, max_time, p, seed):
+    """Throughput of one p-persistent CSMA run (cached)."""
+    return simulate_csma(num_nodes, num_packets, prop_delay, tx_time, gen_prob, "p-Persistent CSMA (CSMA/CD)",
+                         seed=seed, max_time=max_time, persistence=p)[4]
+
+
+def noisy_golden_section(sample, lo, hi, grid=8, replicas=4, max_replicas=32, tol=0.01, z=2.0, progress=None):
+    """
+    Maximize E[sample(x, seed)] on [lo, hi] with common random numbers:
+    seeds 0, 1, ... are shared by every x.
+
+    A coarse scan of ``grid`` log-spaced points first brackets the best one
+    between its neighbours (throughput curves can be flat or bumpy over the
+    full range); golden-section search then narrows that bracket.
+
+    ``progress(done, total, p=..., throughput=...)`` is called after each
+    grid point and each comparison, ``total`` being the grid plus the
+    iterations needed to reach ``tol`` (before the scan, for the widest
+    bracket it could leave).
+
+    Returns a dict with ``p``, ``throughput`` and ``ci_half_width`` (about
+    ``z`` standard errors) at the best point, ``replicas`` used there,
+    ``bracket`` (the final search interval), ``evaluations`` (every
+    (p, mean, replicas) visited), ``samples`` (number of sample calls) and
+    ``resolved``. ``resolved`` is False when the noise hid the difference
+    before the bracket reached ``tol``; throughput is then flat within the
+    noise across the bracket.
+    """
+    values = {}
+    calls = [0]
+
+    def at(x, n):
+        have = values.setdefault(x, [])
+        for seed in range(len(have), n):
+            have.append(sample(x, seed))
+            calls[0] += 1
+        return np.asarray(have[:n])
+
+    def iterations(width):
+        return max(1, math.ceil(math.log(tol / width) / math.log(INV_PHI)))
+
+    done = 0
+    if grid > 2:
+        points = np.geomspace(lo, hi, grid)
+        widest = max(points[min(i + 1, grid - 1)] - points[max(i - 1, 0)] for i in range(grid))
+        total = grid + iterations(widest)
+        means = []
+        for x in points:
+            means.append(at(x, replicas).mean())
+            done += 1
+            if progress is not None:
+                progress(done, total, p=float(x), throughput=float(means[-1]))
+        best = int(np.argmax(means))
+        lo, hi = points[max(best - 1, 0)], points[min(best + 1, grid - 1)]
+
+    total = done + iterations(hi - lo)
+    n = replicas
+    resolved = True
+    c, d = hi - INV_PHI * (hi - lo), lo + INV_PHI * (hi - lo)
+    while hi - lo > tol:
+        # Add replicas to both points until their paired difference is significant.
+        while True:
+            diff = at(c, n) - at(d, n)
+            separated = abs(diff.mean()) > z * diff.std(ddof=1) / math.sqrt(n)
+            if separated or n >= max_replicas:
+                break
+            n = min(2 * n, max_replicas)
+        if not separated:
+            resolved = False
+            break
+        if diff.mean() > 0:
+            hi, d = d, c
+            c = hi - INV_PHI * (hi - lo)
+        else:
+            lo, c = c, d
+            d = lo + INV_PHI * (hi - lo)
+        done += 1
+        if progress is not None:
+            progress(done, total, p=(lo + hi) / 2, throughput=float(at(c, n).mean()))
+
+    best = c if at(c, n).mean() >= at(d, n).mean() else d
+    best_values = at(best, n)
+    half = z * best_values.std(ddof=1) / math.sqrt(n)
+    if progress is not None:
+        progress(total, total, p=best, throughput=float(best_values.mean()))
+    return {
+        "p": float(best),
+        "throughput": float(best_values.mean()),
+        "ci_half_width": float(half),
+        "replicas": n,
+        "bracket": (float(lo), float(hi)),
+        "evaluations": sorted((float(x), float(np.mean(v)), len(v)) for x, v in values.items()),
+        "samples": calls[0],
+        "resolved": resolved,
+    }
+
+
+def optimal_csma_p(num_nodes, num_packets, prop_delay, tx_time, gen_prob, max_time=400, lo=0.01, hi=1.0,
+                   progress=None, **search):
+    """
+    Noise-aware search for the persistence p maximizing simulated
+    p-persistent CSMA throughput; ``search`` goes to ``noisy_golden_section``.
+    """
+    def sample(p, seed):
+        return _csma_replica(num_nodes, num_packets, float(prop_delay), float(tx_time), float(gen_prob),
+                             int(max_time), round(p, 6), seed)
+
+    return noisy_golden_section(sample, lo, hi, progress=progress, **search)
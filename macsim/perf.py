@@ -0,0 +1,149 @@
+"""
+Per-phase timing of a page run.
+
+A ``PhaseTimer`` is created at the top of each run and times named phases
+(simulation, DataFrame construction, matplotlib rendering, ``st.dataframe``
+serialization, exports) with ``with timer.phase("name"):``; calls of the
+same phase add up. ``count`` keeps plain counters (rows, bytes). With
+``trace_memory`` each phase also records, through ``tracemalloc``, the
+bytes it allocated and kept (``allocated``) and its peak above the
+starting point (``peak``); tracing is started for the run and stopped again
+by ``finish`` if this timer started it.
+
+A disabled timer hands out one shared no-op context manager, so an
+instrumented page pays a method call per phase and nothing else.
+
+``finish(log_path)`` appends the run as one JSON line to ``log_path``.
+Phases that end after that (deferred downloads run outside the script) are
+appended as lines of their own. A timer with ``fragment`` set times the
+rerun of that one fragment instead of a whole page run.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Where runs are logged unless MACSIM_PERF_LOG says otherwise.
+LOG_PATH = os.environ.get("MACSIM_PERF_LOG", "perf_runs.jsonl")
+
+NULL_PHASE = contextlib.nullcontext()
+
+_log_lock = threading.Lock()
+
+
+def append_log(path, record):
+    """Append ``record`` as one JSON line (safe across sessions of one process)."""
+    line = json.dumps(record, default=str) + "\n"
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        if self.timer.trace_memory and tracemalloc.is_tracing():
+            self.memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        else:
+            self.memory = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        allocated = peak = None
+        if self.memory is not None and tracemalloc.is_tracing():
+            current, top = tracemalloc.get_traced_memory()
+            allocated, peak = current - self.memory, top - self.memory
+        self.timer.add(self.name, seconds, allocated=allocated, peak=peak)
+        return False
+
+
+class PhaseTimer:
+    """Named phase timings and counters of one page run (see the module docstring)."""
+
+    def __init__(self, page, enabled=False, trace_memory=False, fragment=None):
+        self.page = page
+        self.fragment = fragment
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.phases = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.total = None
+        self.log_path = None
+        self._owns_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    def phase(self, name):
+        """Context manager timing one call of phase ``name``."""
+        if not self.enabled:
+            return NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, seconds, allocated=None, peak=None):
+        """Record a phase timed elsewhere (e.g. a background job's run time)."""
+        if not self.enabled:
+            return
+        entry = {"seconds": seconds, "calls": 1}
+        if allocated is not None:
+            entry["allocated"] = allocated
+            entry["peak"] = peak
+        if self.total is not None:
+            # The run was already logged: this phase gets a line of its own.
+            if self.log_path is not None:
+                append_log(self.log_path, self._record({name: entry}, late=True))
+            return
+        have = self.phases.get(name)
+        if have is None:
+            self.phases[name] = entry
+            return
+        have["seconds"] += seconds
+        have["calls"] += 1
+        if allocated is not None:
+            have["allocated"] = have.get("allocated", 0) + allocated
+            have["peak"] = max(have.get("peak", 0), peak)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _record(self, phases, late=False):
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "page": self.page, "phases": phases}
+        if self.fragment is not None:
+            record["fragment"] = self.fragment
+        if late:
+            record["late"] = True
+        else:
+            record.update(total=self.total, counters=self.counters, trace_memory=self.trace_memory)
+        return record
+
+    def finish(self, log_path=None):
+        """End the run: stop tracing if started here and log it to ``log_path``; returns the total seconds."""
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+            if self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+            if self.enabled and log_path is not None:
+                self.log_path = log_path
+                append_log(log_path, self._record(self.phases))
+        return self.total
+
+    def rows(self):
+        """One dict per phase (slowest first), for display."""
+        rows = []
+        for name, entry in sorted(self.phases.items(), key=lambda item: -item[1]["seconds"]):
+            row = {"Phase": name, "Time (ms)": entry["seconds"] * 1000, "Calls": entry["calls"]}
+            if "allocated" in entry:
+                row["Allocated (KiB)"] = entry["allocated"] / 1024
+                row["Peak (KiB)"] = entry["peak"] / 1024
+            rows.append(row)
+        return rows
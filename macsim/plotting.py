@@ -0,0 +1,84 @@
+import numpy as np
+from matplotlib.colors import ListedColormap
+
+# Above this many runs a vector Gantt stops being readable (and cheap), so
+# the whole state matrix is drawn as one raster instead.
+MAX_VECTOR_RUNS = 4000
+
+
+def run_lengths(row):
+    """Run-length encode a 1-D state array; returns (starts, lengths, values)."""
+    row = np.asarray(row)
+    if row.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, row
+    starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+    lengths = np.diff(np.r_[starts, row.size])
+    return starts, lengths, row[starts]
+
+
+def draw_state_gantt(ax, states, colors, x0=0, height=0.6, max_runs=MAX_VECTOR_RUNS, **bar_kwargs):
+    """
+    Draw a ``(nodes, slots)`` state matrix as a Gantt chart on ``ax``, row ``i``
+    at y = i and slot ``j`` spanning [x0 + j, x0 + j + 1).
+
+    Each row is run-length encoded and drawn with one ``broken_barh`` per
+    (node, state), so the artist count depends on how often states change,
+    not on the horizon. If the matrix has more than ``max_runs`` runs in total
+    it is drawn as a single ``imshow`` raster instead.
+
+    Returns "vector" or "raster" to say which path was taken.
+    """
+    states = np.asarray(states)
+    num_nodes, num_slots = states.shape
+    codes = sorted(colors)
+
+    changes = int(np.count_nonzero(states[:, 1:] != states[:, :-1])) if num_slots else 0
+    if changes + num_nodes > max_runs:
+        lut = np.zeros(max(codes) + 1, dtype=np.int8)
+        lut[codes] = np.arange(len(codes))
+        ax.imshow(lut[states], aspect='auto', interpolation='nearest', origin='lower',
+                  cmap=ListedColormap([colors[c] for c in codes]), vmin=0, vmax=len(codes) - 1,
+                  extent=(x0, x0 + num_slots, -0.5, num_nodes - 0.5))
+        return "raster"
+
+    for row in range(num_nodes):
+        starts, lengths, values = run_lengths(states[row])
+        for code in codes:
+            mask = values == code
+            if mask.any():
+                spans = np.column_stack((starts[mask] + x0, lengths[mask]))
+                ax.broken_barh(spans, (row - height / 2, height), facecolors=colors[code], **bar_kwargs)
+    return "vector"
+
+
+def draw_interval_gantt(ax, nodes, starts, ends, codes, colors, x_max, height=0.8, **bar_kwargs):
+    """
+    Gantt chart for per-transmission intervals (Pure ALOHA's transmission log),
+    clipped at ``x_max``; one ``broken_barh`` per (node, outcome code).
+    """
+    nodes, starts, ends, codes = map(np.asarray, (nodes, starts, ends, codes))
+    visible = starts < x_max
+    nodes, starts, codes = nodes[visible], starts[visible], codes[visible]
+    widths = np.minimum(ends[visible], x_max) - starts
+    for node in np.unique(nodes):
+        for code in colors:
+            mask = (nodes == node) & (codes == code)
+            if mask.any():
+                ax.broken_barh(np.column_stack((starts[mask], widths[mask])), (node - height / 2, height),
+                               facecolors=colors[code], **bar_kwargs)
+
+
+def draw_bucket_timeline(ax, edges, counts, bucket_size, colors, labels):
+    """
+    Stacked step chart of per-bucket status shares, as returned by
+    ``TimelinePyramid.view``; a constant number of artists however many
+    slots each bucket covers.
+    """
+    totals = counts.sum(axis=1, keepdims=True)
+    shares = counts / np.maximum(totals, 1)
+    x = np.r_[edges, edges[-1] + bucket_size] if len(edges) else np.zeros(1)
+    y = np.vstack([shares, shares[-1:]]).T if len(edges) else np.zeros((len(labels), 1))
+    ax.stackplot(x, y, step='post', colors=[colors[label] for label in labels], labels=labels, linewidth=0)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Share of slots")
@@ -0,0 +1,150 @@
+"""
+Reference engines for validation.
+
+Plain per-slot, per-node loops that spell out what each protocol model
+means, kept deliberately unoptimized so faster engines in
+``macsim.engines`` can be checked against them (``macsim.validate``).
+They return summary numbers and per-slot status codes only, no logs.
+
+``slotted_aloha``, ``pure_aloha``, ``csma`` and ``csma_ca`` draw random
+numbers in the same order as the corresponding engine, so with equal seeds
+the outputs must match exactly. ``backlogged_aloha`` draws per node where
+the engine draws per group, so the two can only be compared statistically.
+"""
+import numpy as np
+
+from macsim.events import IDLE, SUCCESS, COLLISION, BUSY, TRANSMITTING
+
+
+def slotted_aloha(num_nodes, p, num_slots, seed=None):
+    rng = np.random.RandomState(seed)
+    codes = np.empty(num_slots, dtype=np.int8)
+    for t in range(num_slots):
+        sending = int((rng.random_sample(num_nodes) < p).sum())
+        codes[t] = IDLE if sending == 0 else SUCCESS if sending == 1 else COLLISION
+    return {"codes": codes, "throughput": float(np.mean(codes == SUCCESS))}
+
+
+def pure_aloha(num_nodes, p, num_time_units, packet_duration, seed=None):
+    rng = np.random.RandomState(seed)
+    busy_until = [0] * num_nodes
+    starts = []
+    codes = np.empty(num_time_units, dtype=np.int8)
+    for t in range(num_time_units):
+        for node in range(num_nodes):
+            if busy_until[node] <= t and rng.random_sample() < p:
+                busy_until[node] = t + packet_duration
+                starts.append(t)
+        active = sum(end > t for end in busy_until)
+        codes[t] = IDLE if active == 0 else TRANSMITTING if active == 1 else COLLISION
+    # Two transmissions of equal length overlap when their starts are less than a duration apart.
+    starts = np.asarray(starts)
+    successes = sum(int(np.sum(np.abs(starts - s) < packet_duration)) == 1 for s in starts)
+    return {"codes": codes, "throughput": successes / num_time_units, "attempts": len(starts)}
+
+
+def csma(num_nodes, tx_time, gen_prob, protocol, seed=None, max_time=400, persistence=0.4):
+    rng = np.random.RandomState(seed)
+    ready = np.zeros(num_nodes, dtype=bool)
+    backoff = np.zeros(num_nodes)
+    retries = np.zeros(num_nodes, dtype=int)
+    busy_until = 0.0
+    codes = np.empty(int(max_time), dtype=np.int8)
+    for t in range(int(max_time)):
+        for i in range(num_nodes):
+            if rng.rand() < gen_prob:
+                ready[i] = True
+        sensing = [i for i in range(num_nodes) if ready[i] and backoff[i] <= 0]
+        if t < busy_until:
+            if protocol == "Non-Persistent CSMA":
+                for i in sensing:
+                    backoff[i] = rng.randint(2, 8)
+            codes[t] = BUSY
+        else:
+            if protocol == "p-Persistent CSMA (CSMA/CD)":
+                sensing = [i for i in sensing if rng.rand() < persistence]
+            if not sensing:
+                codes[t] = IDLE
+            elif len(sensing) == 1:
+                codes[t] = SUCCESS
+                ready[sensing[0]] = False
+                retries[sensing[0]] = 0
+                busy_until = t + max(1.0, tx_time)
+            else:
+                codes[t] = COLLISION
+                for i in sensing:
+                    retries[i] += 1
+                    backoff[i] = rng.randint(1, 2 ** int(min(retries[i], 10)))
+                busy_until = t + max(1.0, tx_time * 0.5)
+        backoff = np.maximum(backoff - 1, 0)
+    return {"codes": codes, "throughput": float(np.mean(codes == SUCCESS))}
+
+
+def csma_ca(num_nodes, tx_time, gen_prob, variant="Basic CSMA/CA", seed=None, max_time=400):
+    rng = np.random.RandomState(seed)
+    ready = np.zeros(num_nodes, dtype=bool)
+    backoff = np.zeros(num_nodes)
+    busy_until = 0.0
+    codes = np.empty(int(max_time), dtype=np.int8)
+    for t in range(int(max_time)):
+        for i in range(num_nodes):
+            if rng.rand() < gen_prob:
+                ready[i] = True
+        active = [i for i in range(num_nodes) if ready[i] and backoff[i] <= 0]
+        if t < busy_until:
+            codes[t] = BUSY
+        elif not active:
+            codes[t] = IDLE
+        elif len(active) == 1:
+            codes[t] = SUCCESS
+            ready[active[0]] = False
+            handshake = 0.5 * tx_time if variant == "CSMA/CA with RTS/CTS" else 0.0
+            busy_until = t + tx_time + handshake
+        else:
+            codes[t] = COLLISION
+            for i in active:
+                backoff[i] = rng.randint(1, 8)
+            busy_until = t + tx_time * 0.5
+        backoff = np.maximum(backoff - 1, 0)
+    return {"codes": codes, "throughput": float(np.mean(codes == SUCCESS))}
+
+
+def backlogged_aloha(num_nodes, q_a, q_r, num_slots, controller="Fixed q_r", seed=None):
+    """Backlogged Slotted ALOHA (see ``engines.simulate_backlogged_aloha``), one draw per node per slot."""
+    rng = np.random.RandomState(seed)
+    pseudo_bayesian = controller == "Pseudo-Bayesian (Rivest)"
+    backlogged = np.zeros(num_nodes, dtype=bool)
+    arrived = np.zeros(num_nodes, dtype=np.int64)
+    tries = np.zeros(num_nodes, dtype=np.int64)
+    estimate = 1.0
+    successes = 0
+    backlog_total = 0
+    delays, attempts = [], []
+    for t in range(num_slots):
+        new = ~backlogged & (rng.random_sample(num_nodes) < q_a)
+        arrived[new] = t
+        tries[new] = 0
+        if pseudo_bayesian:
+            backlogged |= new
+            sending = backlogged & (rng.random_sample(num_nodes) < min(1.0, 1 / estimate))
+        else:
+            sending = (backlogged & (rng.random_sample(num_nodes) < q_r)) | new
+            backlogged |= new
+        tries[sending] += 1
+        senders = np.flatnonzero(sending)
+        if len(senders) == 1:
+            node = senders[0]
+            backlogged[node] = False
+            successes += 1
+            delays.append(t - arrived[node] + 1)
+            attempts.append(tries[node])
+        if pseudo_bayesian:
+            lam = q_a * max(num_nodes - estimate, 0.0)
+            if len(senders) > 1:
+                estimate = estimate + lam + 1 / (np.e - 2)
+            else:
+                estimate = max(lam, estimate + lam - 1)
+            estimate = max(estimate, 1.0)
+        backlog_total += int(backlogged.sum())
+    return {"throughput": successes / num_slots, "mean_backlog": backlog_total / num_slots,
+            "delays": np.asarray(delays), "attempts": np.asarray(attempts)}
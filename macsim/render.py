@@ -0,0 +1,93 @@
+"""
+Server-side figure rendering outside pyplot's global state.
+
+Figures are plain ``matplotlib.figure.Figure`` objects (never registered with
+pyplot's figure manager, so nothing accumulates on a long-lived server and
+concurrent sessions don't share state). The rendered PNG bytes are cached
+process-wide, keyed by a hash of the plotted data and options, so identical
+charts are served without drawing them again.
+"""
+import hashlib
+import io
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.figure import Figure
+
+DEFAULT_DPI = 100
+
+
+def data_key(*parts):
+    """Content hash of arrays, scalars and plain containers."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f"{part.dtype}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(pickle.dumps(part, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+
+def render_png(fig, dpi=DEFAULT_DPI):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi)
+    return buffer.getvalue()
+
+
+class PNGCache:
+    """Thread-safe LRU of rendered PNG bytes, bounded by total size."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = png
+            self._size += len(png)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+png_cache = PNGCache()
+
+
+def cached_png(draw, *data, figsize=(12, 6), dpi=DEFAULT_DPI, **options):
+    """
+    Return PNG bytes for ``draw(fig, *data, **options)`` on a fresh ``Figure``,
+    reusing the cached bytes when the same drawing function has already been
+    rendered with equal data and options.
+    """
+    key = data_key(draw.__code__.co_filename, draw.__qualname__, figsize, dpi, options, *data)
+    png = png_cache.get(key)
+    if png is None:
+        fig = Figure(figsize=figsize)
+        draw(fig, *data, **options)
+        png = render_png(fig, dpi=dpi)
+        png_cache.put(key, png)
+    return png
@@ -0,0 +1,418 @@
+"""
+Local HTTP/JSON simulation service.
+
+Runs the protocol engines outside Streamlit so notebooks and other tools can
+drive them directly. Requests go into a bounded asyncio queue; a fixed set
+of dispatcher tasks feed them to a process pool, so load from several
+clients is queued and parallelised in one place.
+
+Start it with::
+
+    python -m macsim.service --port 8765 --workers 4
+
+Endpoints (all bodies are JSON):
+
+    GET    /engines                 available engines
+    POST   /jobs                    {"engine": "...", "params": {...}} -> {"id", "status", ...}
+    GET    /jobs/<id>               status and progress
+    GET    /jobs/<id>/result        result once the job is done (409 before that)
+    DELETE /jobs/<id>               cancel a queued or running job
+
+Identical requests (same engine and params) submitted while an earlier one
+is still queued or running get the earlier job's id instead of a new job.
+
+With ``--checkpoint-dir`` every run is checkpointed there (see
+``macsim.checkpoint``) under the hash of its request. If a worker or the
+service dies, or a job is cancelled, submitting the same request again
+continues from the latest checkpoint instead of from slot 0. The result
+then also reports the checkpoint cost.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+
+from macsim.checkpoint import INTERVAL, load, run_checkpointed
+from macsim.engines import (simulate_csma, simulate_csma_ca, simulate_slotted_aloha, simulate_backlogged_aloha,
+                            simulate_pure_aloha)
+from macsim.jobs import JobCancelled
+from macsim.jsonable import to_jsonable
+
+ENGINES = {
+    "csma": simulate_csma,
+    "csma_ca": simulate_csma_ca,
+    "slotted_aloha": simulate_slotted_aloha,
+    "backlogged_aloha": simulate_backlogged_aloha,
+    "pure_aloha": simulate_pure_aloha,
+}
+
+# Names for the positional tuples each engine returns.
+RESULT_FIELDS = {
+    "csma": ["usage_log", "success_count", "collision_count", "efficiency", "throughput", "utilization",
+             "node_states", "channel", "packets"],
+    "csma_ca": ["usage_log", "success_count", "collision_count", "efficiency", "throughput", "utilization",
+                "node_states", "channel", "packets"],
+    "slotted_aloha": ["slots_log", "node_states", "statistics"],
+    "backlogged_aloha": ["slots_log", "attempts", "statistics"],
+    "pure_aloha": ["time_units_log", "transmissions", "statistics"],
+}
+
+IN_FLIGHT = ("queued", "running")
+
+
+def request_key(engine, params):
+    """Stable hash of a request, used to deduplicate identical in-flight submissions."""
+    canonical = json.dumps({"engine": engine, "params": params}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# --------------------- WORKER PROCESS SIDE ---------------------
+def _execute(engine, params, job_id, progress_table, cancel_flags, checkpoint_path=None, checkpoint_interval=INTERVAL):
+    """
+    Run one engine call inside a pool process, publishing progress through
+    the manager proxies; checkpointed to ``checkpoint_path`` if given.
+    """
+
+    def progress(done, total, **info):
+        if cancel_flags.get(job_id):
+            raise JobCancelled()
+        progress_table[job_id] = {"done": done, "total": total, **to_jsonable(info)}
+
+    if checkpoint_path is None:
+        output = ENGINES[engine](**params, progress=progress)
+        return dict(zip(RESULT_FIELDS[engine], to_jsonable(output)))
+    output, checkpointer = run_checkpointed(engine, params, checkpoint_path, checkpoint_interval, progress=progress)
+    return {**dict(zip(RESULT_FIELDS[engine], to_jsonable(output))), "checkpoint": checkpointer.summary()}
+
+
+# --------------------- SERVICE ---------------------
+class ServiceJob:
+    def __init__(self, job_id, engine, params, key):
+        self.id = job_id
+        self.engine = engine
+        self.params = params
+        self.key = key
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def describe(self, progress=None):
+        return {
+            "id": self.id,
+            "engine": self.engine,
+            "params": self.params,
+            "status": self.status,
+            "progress": progress,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SimulationService:
+    """Bounded job queue in front of a process pool; one instance per server."""
+
+    def __init__(self, workers=2, queue_size=64, keep_finished=256, checkpoint_dir=None,
+                 checkpoint_interval=INTERVAL):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_interval = checkpoint_interval
+        if checkpoint_dir is not None:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        self.jobs = {}
+        self._in_flight = {}  # request key -> job id
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._ids = itertools.count(1)
+        self._manager = multiprocessing.Manager()
+        self._progress = self._manager.dict()
+        self._cancel = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._dispatchers = []
+
+    async def start(self):
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+    # ---- API ----
+    def submit(self, engine, params):
+        if engine not in ENGINES:
+            raise KeyError(f"unknown engine {engine!r}")
+        key = request_key(engine, params)
+        existing = self._in_flight.get(key)
+        if existing is not None and self.jobs[existing].status in IN_FLIGHT:
+            return self.jobs[existing], True
+
+        job = ServiceJob(str(next(self._ids)), engine, params, key)
+        self._queue.put_nowait(job)  # raises asyncio.QueueFull when saturated
+        self.jobs[job.id] = job
+        self._in_flight[key] = job.id
+        self._prune()
+        return job, False
+
+    def status(self, job_id):
+        job = self.jobs[job_id]
+        return job.describe(self._progress.get(job_id))
+
+    def cancel(self, job_id):
+        job = self.jobs[job_id]
+        if job.status == "queued":
+            self._finish(job, "cancelled")
+        elif job.status == "running":
+            self._cancel[job_id] = True
+        return job
+
+    # ---- internals ----
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != "queued":  # cancelled while waiting
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                pool = self._pool
+                try:
+                    job.result = await loop.run_in_executor(
+                        pool, _execute, job.engine, job.params, job.id, self._progress, self._cancel,
+                        self._checkpoint_path(job), self.checkpoint_interval
+                    )
+                    self._finish(job, "done")
+                except JobCancelled:
+                    self._finish(job, "cancelled")
+                except BrokenProcessPool:
+                    # A worker died (killed, out of memory, ...). The pool is unusable from then on: replace it
+                    # and fail the jobs that were running in it; resubmitting them resumes their checkpoints.
+                    self._replace_pool(pool)
+                    job.error = "worker process died; submit the job again to resume it"
+                    self._finish(job, "failed")
+                except Exception as exc:
+                    job.error = f"{type(exc).__name__}: {exc}"
+                    self._finish(job, "failed")
+            finally:
+                self._queue.task_done()
+
+    def _replace_pool(self, broken):
+        # Every job that was running in ``broken`` lands here; only the first replaces it.
+        if self._pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _checkpoint_path(self, job):
+        if self.checkpoint_dir is None:
+            return None
+        return os.path.join(self.checkpoint_dir, f"{job.key}.ckpt")
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        if self._in_flight.get(job.key) == job.id:
+            del self._in_flight[job.key]
+        self._cancel.pop(job.id, None)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.status not in IN_FLIGHT]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+            self._progress.pop(job.id, None)
+
+
+# --------------------- HTTP LAYER ---------------------
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _route(service, method, path, body):
+    if method == "GET" and path == "/engines":
+        return HTTPStatus.OK, {"engines": sorted(ENGINES)}
+
+    if method == "POST" and path == "/jobs":
+        try:
+            payload = json.loads(body or b"{}")
+            engine, params = payload["engine"], payload.get("params", {})
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'expected {"engine": ..., "params": {...}}')
+        if not isinstance(engine, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "engine must be a string")
+        if not isinstance(params, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "params must be an object")
+        try:
+            job, deduplicated = service.submit(engine, params)
+        except KeyError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND, exc.args[0])
+        except asyncio.QueueFull:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "job queue is full, retry later")
+        status = HTTPStatus.OK if deduplicated else HTTPStatus.ACCEPTED
+        return status, {**service.status(job.id), "deduplicated": deduplicated}
+
+    match = re.fullmatch(r"/jobs/([^/]+)(/result)?", path)
+    if match is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {method} {path}")
+    job_id, want_result = match.group(1), bool(match.group(2))
+    if job_id not in service.jobs:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown job {job_id}")
+
+    if method == "GET" and want_result:
+        job = service.jobs[job_id]
+        if job.status != "done":
+            raise HTTPError(HTTPStatus.CONFLICT, f"job {job_id} is {job.status}")
+        return HTTPStatus.OK, {"id": job_id, "engine": job.engine, "result": job.result}
+    if method == "GET":
+        return HTTPStatus.OK, service.status(job_id)
+    if method == "DELETE" and not want_result:
+        service.cancel(job_id)
+        return HTTPStatus.OK, service.status(job_id)
+    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+
+
+async def _read_body(reader, headers):
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError as exc:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"body ended after {len(exc.partial)} of {length} bytes")
+
+
+async def _handle(service, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            return
+        method, path = request_line[0].upper(), request_line[1].split("?", 1)[0].rstrip("/") or "/"
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            body = await _read_body(reader, headers)
+            status, payload = _route(service, method, path, body)
+        except HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, workers=2, queue_size=64, checkpoint_dir=None,
+                checkpoint_interval=INTERVAL):
+    service = SimulationService(workers=workers, queue_size=queue_size, checkpoint_dir=checkpoint_dir,
+                                checkpoint_interval=checkpoint_interval)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+    print(f"macsim service listening on http://{host}:{port} ({workers} workers, queue {queue_size})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+# --------------------- RECOVERY CHECK ---------------------
+RECOVERY_REQUEST = ("backlogged_aloha", {"num_nodes": 100, "q_a": 0.002, "q_r": 0.05, "num_slots": 1_000_000,
+                                         "seed": 11})
+
+
+async def _settled(job):
+    while job.status in IN_FLIGHT:
+        await asyncio.sleep(0.05)
+
+
+async def check_recovery(checkpoint_interval=0.5):
+    """
+    Kill the pool worker running a checkpointed job, then submit the same
+    request again. Passes when the killed job fails on its own, the service
+    keeps taking work, the resubmitted job continues from the checkpoint
+    and its result equals an uninterrupted run. Returns [(check, passed, detail)].
+    """
+    engine, params = RECOVERY_REQUEST
+    checks = []
+    with tempfile.TemporaryDirectory() as directory:
+        service = SimulationService(workers=1, checkpoint_dir=directory, checkpoint_interval=checkpoint_interval)
+        await service.start()
+        try:
+            job, _ = service.submit(engine, params)
+            path = service._checkpoint_path(job)
+            while not os.path.exists(path):
+                await asyncio.sleep(0.05)
+            for process in list(service._pool._processes.values()):
+                process.kill()
+            await _settled(job)
+            checks.append(("killed job fails", job.status == "failed", job.error))
+            saved = load(path)["time"]
+
+            again, _ = service.submit(engine, params)
+            await _settled(again)
+            checks.append(("resubmitted job runs", again.status == "done", again.error))
+            if again.status == "done":
+                resumed = again.result["checkpoint"]["resumed_from"]
+                checks.append(("resumes from the checkpoint", resumed == saved > 0,
+                               f"resumed at slot {resumed}, checkpoint at {saved}"))
+                fresh = ENGINES[engine](**params)[0]["code"].tolist()
+                checks.append(("result equals an uninterrupted run", again.result["slots_log"]["code"] == fresh, ""))
+        finally:
+            await service.close()
+    return checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service for the MAC protocol engines")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=max(1, multiprocessing.cpu_count() - 1))
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--checkpoint-dir", help="checkpoint runs here and resume resubmitted ones")
+    parser.add_argument("--checkpoint-interval", type=float, default=INTERVAL, help="seconds between checkpoints")
+    parser.add_argument("--check-recovery", action="store_true",
+                        help="kill a worker mid-run, check that a resubmit resumes from its checkpoint, and exit")
+    args = parser.parse_args(argv)
+    if args.check_recovery:
+        checks = asyncio.run(check_recovery())
+        for name, passed, detail in checks:
+            print(f"{'PASS' if passed else 'FAIL'}  {name}" + (f"  ({detail})" if detail else ""))
+        return 0 if all(passed for _, passed, _ in checks) else 1
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.checkpoint_dir,
+                          args.checkpoint_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,395 @@
+"""
+Streaming statistics shared by the engines.
+
+``RunningStats`` keeps Welford's running mean and variance and merges with
+another instance exactly (Chan et al.), so chunked, resumed or parallel runs
+can be combined without the raw samples. ``ChannelStats`` builds on it to
+count slot outcomes as the engines produce them and to put batch-means
+confidence intervals on throughput, collision rate and utilization,
+``QuantileSketch`` summarizes per-packet distributions (delay, attempts,
+backoff) in constant memory, and ``rolling_means`` turns an encoded status
+array into sliding-window rates.
+"""
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from macsim.events import IDLE, SUCCESS, COLLISION, STATUS_LABELS
+
+# Aim for this many batches when an engine sizes its batches from the run length.
+TARGET_BATCHES = 30
+
+
+def batch_size_for(num_slots, batches=TARGET_BATCHES):
+    return max(1, int(num_slots) // batches)
+
+
+def t_quantile(q, dof):
+    """
+    Student-t quantile from the normal one (Cornish-Fisher expansion, good to
+    about three decimals for ``dof >= 3``), to avoid depending on SciPy.
+    """
+    z = NormalDist().inv_cdf(q)
+    if dof is None or math.isinf(dof):
+        return z
+    v = float(dof)
+    return (z + (z**3 + z) / (4 * v) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3))
+
+
+def _incomplete_beta(x, a, b):
+    """Regularized incomplete beta I_x(a, b) by its continued fraction (modified Lentz)."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _incomplete_beta(1 - x, b, a)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1.0) < 1e-14:
+            break
+    return front * f
+
+
+def t_sf(t, dof):
+    """Upper tail P(T > t) of Student's t with ``dof`` degrees of freedom (normal when ``dof`` is None)."""
+    if dof is None or math.isinf(dof):
+        return 1.0 - NormalDist().cdf(t)
+    tail = 0.5 * _incomplete_beta(dof / (dof + t * t), dof / 2, 0.5)
+    return tail if t >= 0 else 1.0 - tail
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of numbers."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.size:
+            batch = RunningStats()
+            batch.count = values.size
+            batch.mean = float(values.mean())
+            batch.m2 = float(((values - batch.mean) ** 2).sum())
+            batch.min = float(values.min())
+            batch.max = float(values.max())
+            self.merge(batch)
+
+    def merge(self, other):
+        """Fold ``other`` into this accumulator, as if its samples had been added here."""
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta**2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def interval(self, level=0.95):
+        """(mean, half-width) of a Student-t confidence interval for the mean."""
+        if self.count < 2:
+            return self.mean, math.nan
+        half = t_quantile(0.5 + level / 2, self.count - 1) * self.std / math.sqrt(self.count)
+        return self.mean, half
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "std": self.std,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+
+class ChannelStats:
+    """
+    Per-slot channel outcomes, fed one slot (``add``) or one array of slots
+    (``add_many``) at a time as the engine runs.
+
+    Slot status codes are counted directly. Throughput (success share),
+    collision rate and utilization (non-idle share) are also averaged over
+    consecutive batches of ``batch_size`` slots; the spread of those batch
+    means gives confidence intervals that allow for correlation between
+    neighbouring slots (batch means method).
+    """
+
+    METRICS = ("throughput", "collision_rate", "utilization")
+
+    def __init__(self, batch_size):
+        self.batch_size = int(batch_size)
+        self.counts = np.zeros(len(STATUS_LABELS), dtype=np.int64)
+        self.batches = {name: RunningStats() for name in self.METRICS}
+        # Indicator sums of the batch still being filled.
+        self._partial = np.zeros(len(self.METRICS))
+        self._partial_slots = 0
+
+    @property
+    def slots(self):
+        return int(self.counts.sum())
+
+    def count(self, code):
+        return int(self.counts[code])
+
+    def _close_batch(self):
+        for name, total in zip(self.METRICS, self._partial):
+            self.batches[name].add(total / self.batch_size)
+        self._partial[:] = 0
+        self._partial_slots = 0
+
+    def add(self, code):
+        self.counts[code] += 1
+        self._partial += (code == SUCCESS, code == COLLISION, code != IDLE)
+        self._partial_slots += 1
+        if self._partial_slots == self.batch_size:
+            self._close_batch()
+
+    def add_many(self, codes):
+        codes = np.asarray(codes)
+        self.counts += np.bincount(codes, minlength=len(self.counts)).astype(np.int64)
+        indicators = np.stack([channel_indicators(codes)[name] for name in self.METRICS], axis=1)
+
+        # Top up the open batch, then take whole batches at once.
+        fill = min(len(codes), self.batch_size - self._partial_slots)
+        self._partial += indicators[:fill].sum(axis=0)
+        self._partial_slots += fill
+        if self._partial_slots == self.batch_size:
+            self._close_batch()
+        rest = indicators[fill:]
+        whole = len(rest) // self.batch_size * self.batch_size
+        if whole:
+            means = rest[:whole].reshape(-1, self.batch_size, len(self.METRICS)).mean(axis=1)
+            for i, name in enumerate(self.METRICS):
+                self.batches[name].add_many(means[:, i])
+        self._partial += rest[whole:].sum(axis=0)
+        self._partial_slots += len(rest) - whole
+
+    def merge(self, other):
+        """
+        Combine with the stats of another chunk or replica using the same
+        batch size. Complete batches merge exactly; the two open batches are
+        pooled into this one.
+        """
+        if other.batch_size != self.batch_size:
+            raise ValueError(f"batch sizes differ: {self.batch_size} != {other.batch_size}")
+        self.counts += other.counts
+        for name in self.METRICS:
+            self.batches[name].merge(other.batches[name])
+        self._partial += other._partial
+        self._partial_slots += other._partial_slots
+        if self._partial_slots >= self.batch_size:
+            # Pooling two open batches can overfill one; keep the overflow as the open part.
+            overflow = self._partial_slots - self.batch_size
+            carried = self._partial * overflow / self._partial_slots
+            self._partial -= carried
+            self._partial_slots = self.batch_size
+            self._close_batch()
+            self._partial += carried
+            self._partial_slots = overflow
+        return self
+
+    def rate(self, name):
+        """Whole-run value of ``name`` (one of ``METRICS``)."""
+        slots = self.slots
+        if not slots:
+            return 0.0
+        if name == "throughput":
+            return self.count(SUCCESS) / slots
+        if name == "collision_rate":
+            return self.count(COLLISION) / slots
+        return (slots - self.count(IDLE)) / slots
+
+    def interval(self, name, level=0.95):
+        """(whole-run value, half-width) of the batch-means confidence interval for ``name``."""
+        _, half = self.batches[name].interval(level)
+        return self.rate(name), half
+
+    def to_dict(self, level=0.95):
+        summary = {"slots": self.slots, "batch_size": self.batch_size,
+                   "batches": self.batches["throughput"].count,
+                   "counts": {label: int(n) for label, n in zip(STATUS_LABELS, self.counts) if n}}
+        for name in self.METRICS:
+            value, half = self.interval(name, level)
+            summary[name] = {"value": value, "ci_half_width": None if math.isnan(half) else half}
+        return summary
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantiles (a merging t-digest, Dunning & Ertl 2019).
+
+    The distribution is held as at most about ``compression`` weighted
+    centroids, small near both tails and larger in the middle, so extreme
+    quantiles such as p99 stay accurate while memory stays constant.
+    Samples are buffered and folded in with one vectorized pass: all
+    centroids are sorted, each gets a position on the k1 scale
+    k(q) = compression / (2 pi) * asin(2q - 1), and the ones falling in the
+    same unit step of k are merged. Merging two sketches is the same pass
+    over both centroid sets. Min and max are exact.
+
+    While every sample is a whole number (slots, attempts) the centroids are
+    read as point masses, so quantiles are whole numbers and histograms with
+    one bin per value come out exact wherever centroids didn't mix values.
+    """
+
+    def __init__(self, compression=200, buffer_size=2048):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.integer = True
+        self._buffer = []
+
+    def add(self, x):
+        self._buffer.append(float(x))
+        if len(self._buffer) >= self.buffer_size:
+            self._flush()
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size:
+            self.integer = self.integer and bool(np.all(values == np.round(values)))
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(values.size)]))
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch."""
+        other._flush()
+        self._flush()
+        if other.count:
+            self.integer = self.integer and other.integer
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]),
+                           other.min, other.max)
+        return self
+
+    def _flush(self):
+        if self._buffer:
+            values = np.asarray(self._buffer)
+            self._buffer = []
+            self.add_many(values)
+
+    def _compress(self, means, weights, low=None, high=None):
+        self.count = int(round(weights.sum()))
+        self.min = min(self.min, means.min() if low is None else low)
+        self.max = max(self.max, means.max() if high is None else high)
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        groups = np.unique(groups, return_inverse=True)[1]
+        merged = np.bincount(groups, weights=weights)
+        self.means = np.bincount(groups, weights=means * weights) / merged
+        self.weights = merged
+
+    def quantile(self, q):
+        """Value below which a fraction ``q`` (scalar or array) of the samples lie; NaN if empty."""
+        self._flush()
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        if self.integer:
+            index = np.searchsorted(np.cumsum(self.weights), np.asarray(q) * self.count)
+            result = np.round(self.means[np.minimum(index, len(self.means) - 1)])
+        else:
+            mids = (np.cumsum(self.weights) - self.weights / 2) / self.count
+            result = np.interp(q, np.r_[0.0, mids, 1.0], np.r_[self.min, self.means, self.max])
+        result = np.clip(result, self.min, self.max)
+        return result if np.ndim(q) else float(result)
+
+    def cdf(self, x):
+        """Approximate fraction of samples <= ``x`` (inverse of ``quantile``)."""
+        self._flush()
+        if not self.count:
+            return np.zeros(np.shape(x))
+        if self.integer:
+            cumulative = np.r_[0.0, np.cumsum(self.weights)] / self.count
+            return cumulative[np.searchsorted(self.means, x, side="right")]
+        mids = (np.cumsum(self.weights) - self.weights / 2) / self.count
+        return np.interp(x, np.r_[self.min, self.means, self.max], np.r_[0.0, mids, 1.0])
+
+    def histogram(self, bins=30):
+        """(edges, counts) of an approximate histogram over [min, max]; whole-number bin widths for integer data."""
+        self._flush()
+        if not self.count:
+            return np.zeros(1), np.zeros(0)
+        low, high = self.min, self.max
+        if self.integer:
+            width = max(1, math.ceil((high - low + 1) / bins))
+            edges = np.arange(low - 0.5, high + width, width)
+        else:
+            edges = np.linspace(low, high if high > low else low + 1, bins + 1)
+        return edges, np.diff(self.cdf(edges)) * self.count
+
+    def to_dict(self):
+        self._flush()
+        summary = {"count": self.count, "min": float(self.min) if self.count else None,
+                   "max": float(self.max) if self.count else None, "centroids": len(self.means)}
+        for q in (0.5, 0.95, 0.99):
+            summary[f"p{round(q * 100)}"] = self.quantile(q) if self.count else None
+        return summary
+
+
+def channel_indicators(codes):
+    """Per-slot 0/1 series behind ``ChannelStats.METRICS`` for an array of status codes."""
+    codes = np.asarray(codes)
+    return {"throughput": codes == SUCCESS, "collision_rate": codes == COLLISION, "utilization": codes != IDLE}
+
+
+def rolling_means(series, window, max_points=2000):
+    """
+    Sliding-window means of each per-slot array in ``series`` (name -> array)
+    over ``window`` slots, from one cumulative sum per series: O(T) however
+    large the window. At most ``max_points`` evenly spaced windows are
+    returned, so the output size doesn't grow with the run.
+
+    Returns (ends, means): ``ends`` is the slot each window ends at
+    (exclusive) and ``means`` maps each name to its windowed values.
+    """
+    length = len(next(iter(series.values())))
+    window = max(1, min(int(window), length))
+    count = length - window + 1
+    starts = np.unique(np.linspace(0, count - 1, min(count, max_points)).astype(np.int64))
+    means = {}
+    for name, values in series.items():
+        totals = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+        means[name] = (totals[starts + window] - totals[starts]) / window
+    return starts + window, means
@@ -0,0 +1,62 @@
+import numpy as np
+
+from macsim.events import status_categorical
+
+# Each pyramid level aggregates FACTOR buckets of the level below (1x, 8x, 64x, ...).
+FACTOR = 8
+
+
+class TimelinePyramid:
+    """
+    Multi-resolution per-bucket status counts for a whole run, built from an
+    event log's status ``codes``; ``categories`` are the status labels to count.
+
+    Level 0 holds one bucket per slot; level ``k`` buckets cover ``FACTOR**k``
+    slots. ``view`` picks the finest level whose bucket count for the requested
+    window fits the available pixel width, so drawing cost is bounded by the
+    width of the chart rather than the length of the run.
+    """
+
+    def __init__(self, codes, categories, factor=FACTOR):
+        status = status_categorical(codes, categories).codes
+        self.categories = list(categories)
+        self.factor = factor
+        self.num_slots = status.size
+
+        counts = np.zeros((status.size, len(self.categories)), dtype=np.int32)
+        counts[np.arange(status.size), status] = 1
+        self.levels = [counts]
+        while counts.shape[0] > 1:
+            pad = -counts.shape[0] % factor
+            if pad:
+                counts = np.vstack([counts, np.zeros((pad, counts.shape[1]), dtype=counts.dtype)])
+            counts = counts.reshape(-1, factor, counts.shape[1]).sum(axis=1)
+            self.levels.append(counts)
+
+    def bucket_size(self, level):
+        return self.factor ** level
+
+    def level_for(self, start, stop, max_buckets):
+        """Finest level at which ``[start, stop)`` spans at most ``max_buckets`` buckets."""
+        span = max(1, stop - start)
+        for level in range(len(self.levels)):
+            if -(-span // self.bucket_size(level)) <= max_buckets:
+                return level
+        return len(self.levels) - 1
+
+    def view(self, start, stop, max_buckets=1000):
+        """
+        Aggregated counts for slots ``[start, stop)``.
+
+        Returns (edges, counts, bucket_size): ``edges`` are the left slot index of
+        each bucket and ``counts`` is ``(buckets, categories)``. Buckets at the
+        window edges are taken whole, so the view may extend slightly past it.
+        """
+        start = max(0, int(start))
+        stop = min(self.num_slots, int(stop))
+        level = self.level_for(start, stop, max_buckets)
+        size = self.bucket_size(level)
+        first, last = start // size, -(-stop // size)
+        counts = self.levels[level][first:last]
+        edges = np.arange(first, first + counts.shape[0]) * size
+        return edges, counts, size
@@ -0,0 +1,502 @@
+import functools
+
+import pandas as pd
+import streamlit as st
+
+from macsim.bundle import RunRecord
+from macsim.charts import node_share_bars, quantile_histogram, rate_series
+from macsim.engines import new_seed
+from macsim.events import STATUS_CODES
+from macsim.fairness import jain_index, node_counts, windowed_jain
+from macsim.export import FORMATS, export_log
+from macsim.jobs import get_runner
+from macsim.perf import LOG_PATH, NULL_PHASE, PhaseTimer
+from macsim.plotting import draw_bucket_timeline
+from macsim.render import cached_png, data_key
+from macsim.stats import rolling_means
+
+
+# --------------------- BACKGROUND JOBS ---------------------
+def start_job(key, fn, *args, label="Running simulation", params=None, phase="simulation", **kwargs):
+    """
+    Submit ``fn`` to the background runner; any job still running under ``key``
+    is cancelled. ``params`` (the run's inputs, including its seed) are kept
+    for ``record_run``; a ``state`` dict passed on to a resumable engine is
+    stored with the finished result (see ``resume_state``). ``phase`` names
+    the job in the page timer and in the cancelled/failed messages.
+    """
+    previous = st.session_state.get(f"{key}_job")
+    if previous is not None and not previous.finished:
+        previous.cancel()
+    st.session_state[f"{key}_params"] = params or {}
+    st.session_state[f"{key}_phase"] = phase
+    st.session_state[f"{key}_state"] = kwargs.get("state")
+    st.session_state[f"{key}_job"] = get_runner().submit(fn, *args, label=label, **kwargs)
+
+
+def _progress_text(job):
+    parts = [f"{job.label}: {job.fraction * 100:.0f}%"]
+    if "file" in job.info:
+        parts.append(job.info["file"])
+    elif "slot" in job.info:
+        parts.append(f"slot {job.info['slot']}/{job.info['slots']}")
+    if "throughput" in job.info:
+        parts.append(f"throughput so far {job.info['throughput']:.4f}")
+    parts.append(f"{job.elapsed:.1f}s")
+    return " · ".join(parts)
+
+
+def follow_job(key, poll_interval=0.1, store=True):
+    """
+    Stream the progress of the job under ``key`` into an ``st.progress`` bar
+    with a Cancel button, blocking the script until the job finishes.
+
+    Clicking Cancel (or any other widget) reruns the script; the job keeps
+    running in the background and is picked up again here on the next run.
+
+    Returns the job result on the run where it completes (also stored in
+    ``st.session_state[f"{key}_result"]`` and, with ``store``, under the
+    hash of its parameters in the store read by ``shown_result``), otherwise
+    None. Jobs that are not simulation runs (bundles, searches) pass
+    ``store=False`` so only their latest result is kept.
+    """
+    job = st.session_state.get(f"{key}_job")
+    if job is None:
+        return None
+
+    panel = st.empty()
+    with panel.container():
+        bar = st.progress(job.fraction, text=_progress_text(job))
+        if st.button("Cancel", key=f"{key}_cancel"):
+            job.cancel()
+
+    while not job.wait(poll_interval):
+        bar.progress(job.fraction, text=_progress_text(job))
+
+    panel.empty()
+    del st.session_state[f"{key}_job"]
+
+    name = st.session_state.get(f"{key}_phase", "simulation")
+    if job.status == "done":
+        _timer().add(name, job.elapsed)
+        st.session_state[f"{key}_result"] = job.result
+        if store:
+            _store_result(key, st.session_state.get(f"{key}_params", {}), job.result,
+                          st.session_state.pop(f"{key}_state", None))
+        return job.result
+    if job.status == "cancelled":
+        st.warning(f"{name.capitalize()} cancelled.")
+    else:
+        st.error(f"{name.capitalize()} failed: {job.error}")
+    return None
+
+
+# --------------------- STORED RESULTS ---------------------
+# Finished runs stay in st.session_state["results"][key][params_hash], the
+# latest last, so any later rerun (a tab, a download, a changed widget) only
+# re-renders them. A few parameter sets are kept per key, so going back to
+# earlier settings brings their run back without simulating again.
+RESULTS_PER_KEY = 4
+
+
+def params_hash(params):
+    """Hash of a run's parameters, ignoring the seed (a new run of the same settings replaces the old one)."""
+    return data_key(sorted((name, value) for name, value in params.items() if name != "seed"))
+
+
+def _store_result(key, params, result, state=None):
+    entries = st.session_state.setdefault("results", {}).setdefault(key, {})
+    digest = params_hash(params)
+    entries.pop(digest, None)
+    entries[digest] = {"params": dict(params), "result": result, "artifacts": {}, "state": state}
+    while len(entries) > RESULTS_PER_KEY:
+        del entries[next(iter(entries))]
+
+
+def resume_state(key, params, horizon):
+    """
+    ``(state, seed)`` for a new run of ``key`` with ``params``. If a stored
+    run differs from ``params`` only by a shorter ``horizon`` (the name of
+    the horizon parameter), a copy of its engine state and its seed, so the
+    engine only simulates the added slots; otherwise an empty state and a
+    new seed.
+    """
+    base = None
+    for entry in st.session_state.get("results", {}).get(key, {}).values():
+        kept = entry["params"]
+        if (entry.get("state") and kept[horizon] < params[horizon]
+                and all(kept.get(name) == value for name, value in params.items() if name != horizon)
+                and (base is None or kept[horizon] > base["params"][horizon])):
+            base = entry
+    if base is None:
+        return {}, new_seed()
+    return dict(base["state"]), base["params"]["seed"]
+
+
+def _describe_change(old, new):
+    changed = [f"{name}: {old.get(name)} → {new.get(name)}" for name in new
+               if name != "seed" and old.get(name) != new.get(name)]
+    return ", ".join(changed)
+
+
+def shown_result(key, params):
+    """
+    The stored run to display under ``key`` for the current widget
+    ``params`` (without the seed): the run with exactly these parameters,
+    else the latest run, marked stale with a warning naming what changed.
+
+    Returns (result, run parameters), or (None, None) before the first run.
+    The rendering code should take its parameters from the returned dict,
+    not from the widgets.
+    """
+    entries = st.session_state.get("results", {}).get(key)
+    if not entries:
+        return None, None
+    entry = entries.get(params_hash(params))
+    if entry is None:
+        entry = entries[next(reversed(entries))]
+        st.warning(f"Showing results for earlier parameters ({_describe_change(entry['params'], params)}). "
+                   "Run the simulation again to update them.", icon="⚠️")
+    st.session_state[f"{key}_shown"] = entry
+    return entry["result"], entry["params"]
+
+
+def artifact(key, name, build, *args, **kwargs):
+    """
+    ``build(*args, **kwargs)`` computed once per shown run of ``key`` and
+    kept with it (timeline pyramids, per-attempt events, ...).
+    """
+    artifacts = st.session_state[f"{key}_shown"]["artifacts"]
+    if name not in artifacts:
+        artifacts[name] = build(*args, **kwargs)
+    return artifacts[name]
+
+
+# --------------------- CONFIDENCE INTERVALS ---------------------
+METRIC_TITLES = {"throughput": "Throughput", "collision_rate": "Collision rate", "utilization": "Utilization"}
+
+
+def interval_caption(channel, metrics=("throughput", "collision_rate", "utilization"), level=0.95):
+    """One-line summary of the batch-means confidence intervals held by a ``ChannelStats``."""
+    parts = []
+    for name in metrics:
+        value, half = channel.interval(name, level)
+        parts.append(f"{METRIC_TITLES[name]} {value:.4f}" + ("" if half != half else f" ± {half:.4f}"))
+    batches = channel.batches["throughput"].count
+    st.caption(f"{level:.0%} confidence intervals (batch means, {batches} batches of {channel.batch_size} slots): "
+               + " · ".join(parts))
+
+
+# --------------------- FRAGMENTS ---------------------
+def timed_fragment(fn):
+    """
+    ``st.fragment`` for a result view: an interaction inside it reruns only
+    that view. Such a rerun comes after the page's ``PhaseTimer`` finished,
+    so it is timed by a timer of its own and logged as a run of the
+    fragment.
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        timer = st.session_state.get("perf_timer")
+        if timer is None or timer.total is None:
+            # Part of a full page run.
+            return fn(*args, **kwargs)
+        own = PhaseTimer(timer.page, timer.enabled, timer.trace_memory, fragment=fn.__name__)
+        st.session_state["perf_timer"] = own
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            own.finish(LOG_PATH)
+            st.session_state["perf_timer"] = timer
+    return st.fragment(run)
+
+
+# --------------------- ROLLING METRICS ---------------------
+WINDOW_SIZES = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+@timed_fragment
+def rolling_metrics(series, key, unit="Slot"):
+    """
+    Sliding-window rates across the whole run (``series`` maps a metric name
+    to its per-slot values, see ``stats.channel_indicators``). Runs as a
+    fragment, so changing the window only recomputes this chart.
+    """
+    length = len(next(iter(series.values())))
+    options = [w for w in WINDOW_SIZES if w <= length // 2] or [max(1, length)]
+    # Default to roughly 1/20 of the run.
+    default = min(options, key=lambda w: abs(w - length // 20))
+    window = st.select_slider(f"Window ({unit.lower()}s)", options, value=default, key=f"{key}_window_size")
+    ends, means = rolling_means(series, window)
+    st.altair_chart(rate_series(
+        ends, {METRIC_TITLES[name]: values for name, values in means.items()},
+        f"{unit} (window end)", f"Rolling {window}-{unit.lower()} window"
+    ), use_container_width=True)
+
+
+# --------------------- FAIRNESS ---------------------
+@timed_fragment
+def fairness_panel(nodes, slots, codes, num_nodes, num_slots, key, unit="Slot"):
+    """
+    Per-node successes/collisions with Jain's fairness index over the whole
+    run and over a sliding window (see ``macsim.fairness``). ``nodes``,
+    ``slots`` and ``codes`` describe one transmission attempt each.
+    """
+    counts = node_counts(nodes, codes, num_nodes)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Jain index (successes)", f"{jain_index(counts['successes']):.3f}",
+              help="1 = every node got the same number of successes, 1/N = one node got them all")
+    c2.metric("Jain index (attempts)", f"{jain_index(counts['attempts']):.3f}")
+    share = counts["successes"].max() / max(1, counts["successes"].sum())
+    c3.metric("Largest node share", f"{share * 100:.1f}%", help=f"Fair share would be {100 / num_nodes:.1f}%")
+
+    st.altair_chart(node_share_bars(counts["successes"], counts["collisions"]), use_container_width=True)
+
+    options = [w for w in WINDOW_SIZES if w <= num_slots // 2] or [max(1, num_slots)]
+    default = min(options, key=lambda w: abs(w - num_slots // 10))
+    window = st.select_slider(f"Short-term fairness window ({unit.lower()}s)", options, value=default,
+                              key=f"{key}_fair_window")
+    ends, index = windowed_jain(nodes, slots, codes, num_nodes, num_slots, window)
+    st.altair_chart(rate_series(
+        ends, {"Jain index (successes)": index}, f"{unit} (window end)",
+        f"Short-term fairness over {window}-{unit.lower()} windows", y_title="Jain index"
+    ), use_container_width=True)
+
+
+# --------------------- PACKET DISTRIBUTIONS ---------------------
+PACKET_METRICS = {
+    "delay": "Access delay (slots)",
+    "attempts": "Attempts per packet",
+    "backoff": "Backoff length (slots)",
+}
+
+
+@timed_fragment
+def packet_distributions(sketches, key):
+    """
+    p50/p95/p99 and a histogram of one per-packet distribution at a time,
+    read from the engine's ``QuantileSketch``es (``engines.packet_sketches``)
+    rather than from raw samples.
+    """
+    available = [name for name in PACKET_METRICS if name in sketches and sketches[name].count]
+    if not available:
+        st.caption("No packets were delivered in this run.")
+        return
+    name = st.radio("Distribution", available, format_func=PACKET_METRICS.get, horizontal=True, key=f"{key}_metric")
+    sketch = sketches[name]
+    p50, p95, p99 = sketch.quantile([0.5, 0.95, 0.99])
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Median (p50)", f"{p50:g}")
+    c2.metric("p95", f"{p95:g}")
+    c3.metric("p99", f"{p99:g}")
+    c4.metric("Samples", f"{sketch.count:,}", help=f"Summarized by {len(sketch.means)} centroids")
+    edges, counts = sketch.histogram()
+    st.altair_chart(quantile_histogram(edges, counts, {"p50": p50, "p95": p95, "p99": p99}, PACKET_METRICS[name],
+                                       f"Distribution of {PACKET_METRICS[name].split(' (')[0].lower()}"),
+                    use_container_width=True)
+
+
+# --------------------- RECORDED RUNS ---------------------
+def record_run(key, protocol, log, headers, categories, stats):
+    """
+    Keep the finished run under ``key`` as a ``RunRecord`` in
+    ``st.session_state["runs"]`` for the Download page; the page adds its
+    rendered figures to the returned record.
+    """
+    runs = st.session_state.setdefault("runs", {})
+    if key in runs and runs[key].log is log:
+        return runs[key]
+    shown = st.session_state.get(f"{key}_shown")
+    params = shown["params"] if shown is not None else st.session_state.get(f"{key}_params", {})
+    record = RunRecord(protocol, params, log, headers, categories, stats)
+    runs[key] = record
+    return record
+
+
+# --------------------- FULL-RUN TIMELINE ---------------------
+def _shift_window(key, num_slots, direction):
+    start, stop = st.session_state[key]
+    width = stop - start
+    step = max(1, width // 2) * direction
+    start = min(max(0, start + step), num_slots - width)
+    st.session_state[key] = (start, start + width)
+
+
+def _reset_window(key, num_slots):
+    st.session_state[key] = (0, num_slots)
+
+
+def _draw_timeline_window(fig, edges, counts, size, colors, labels, start, stop, unit):
+    ax = fig.subplots()
+    draw_bucket_timeline(ax, edges, counts, size, colors, labels)
+    ax.set_xlim(start, stop)
+    ax.set_xlabel(unit)
+    ax.legend(loc='upper right', fontsize=9, ncols=len(labels))
+    ax.grid(axis='x', alpha=0.25)
+    fig.tight_layout()
+
+
+@timed_fragment
+def timeline_viewer(pyramid, colors, key, unit="Slot", width_px=1200):
+    """
+    Zoomable view of a whole run backed by a ``TimelinePyramid``. Runs as a
+    fragment, so moving the window only re-renders this chart.
+    """
+    num_slots = pyramid.num_slots
+    window_key = f"{key}_window"
+    if window_key not in st.session_state or st.session_state[window_key][1] > num_slots:
+        st.session_state[window_key] = (0, num_slots)
+
+    start, stop = st.slider(f"Visible {unit.lower()}s (drag both ends to zoom)", 0, num_slots, key=window_key)
+    c1, c2, c3 = st.columns(3)
+    c1.button("◀ Pan left", key=f"{key}_left", on_click=_shift_window, args=(window_key, num_slots, -1),
+              use_container_width=True)
+    c2.button("Reset zoom", key=f"{key}_reset", on_click=_reset_window, args=(window_key, num_slots),
+              use_container_width=True)
+    c3.button("Pan right ▶", key=f"{key}_right", on_click=_shift_window, args=(window_key, num_slots, 1),
+              use_container_width=True)
+    stop = max(stop, start + 1)
+
+    # Two pixels per bucket at the chart's rendered width.
+    edges, counts, size = pyramid.view(start, stop, max_buckets=width_px // 2)
+    with phase("matplotlib"):
+        png = cached_png(_draw_timeline_window, edges, counts, size, colors, pyramid.categories,
+                         start, stop, unit, figsize=(width_px / 100, 3.5))
+    st.image(png)
+    st.caption(f"{unit}s {start:,}–{stop:,} of {num_slots:,} · {size}x aggregation · {len(edges)} buckets")
+
+
+# --------------------- EVENT TABLE ---------------------
+PAGE_SIZES = [50, 100, 250, 500]
+
+
+def _first_page(key):
+    st.session_state[f"{key}_page"] = 1
+
+
+@timed_fragment
+def event_table(log, headers, categories, key, height=400):
+    """
+    Paged view of an ``EventLog`` that stays on the server. Filtering by
+    status/node and sorting run over the NumPy columns; only the rows of the
+    current page are turned into a DataFrame and sent to the browser, so the
+    payload does not grow with the length of the run.
+    """
+    titles = {title: name for name, title in headers.items()}
+    c1, c2, c3, c4 = st.columns([3, 3, 2, 1])
+    statuses = c1.multiselect("Status", categories, key=f"{key}_status", on_change=_first_page, args=(key,))
+    num_nodes = int(log["node"].max()) + 1 if len(log) else 0
+    nodes = c2.multiselect("Node", list(range(num_nodes)), key=f"{key}_nodes", on_change=_first_page, args=(key,))
+    sort_title = c3.selectbox("Sort by", ["Log order"] + list(titles), key=f"{key}_sort",
+                              on_change=_first_page, args=(key,))
+    descending = c4.toggle("Desc", key=f"{key}_desc", on_change=_first_page, args=(key,))
+
+    rows = log.select(
+        codes=[STATUS_CODES[label] for label in statuses] or None,
+        nodes=nodes or None,
+        sort_by=titles.get(sort_title),
+        descending=descending,
+    )
+
+    p1, p2 = st.columns([1, 3])
+    page_size = p1.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size",
+                             on_change=_first_page, args=(key,))
+    num_pages = max(1, -(-len(rows) // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > num_pages:
+        st.session_state[page_key] = num_pages
+    page = p2.number_input(f"Page (of {num_pages:,})", 1, num_pages, key=page_key)
+
+    start = (page - 1) * page_size
+    visible = rows[start:start + page_size]
+    with phase("dataframe"):
+        frame = log.to_frame(headers, categories=categories, rows=visible)
+    with phase("st.dataframe"):
+        st.dataframe(frame, use_container_width=True, height=height)
+    count("table rows sent", len(visible))
+    if len(visible):
+        st.caption(f"Rows {start + 1:,}–{start + len(visible):,} of {len(rows):,} matching · {len(log):,} events in total")
+    else:
+        st.caption(f"No matching rows · {len(log):,} events in total")
+
+
+# --------------------- EXPORTS ---------------------
+def _timed_export(timer, log, headers, fmt, categories):
+    # Runs when the download is requested, outside the script run, so the timer is passed in.
+    with timer.phase(f"export {fmt}"):
+        return export_log(log, headers, fmt, categories=categories)
+
+
+@timed_fragment
+def export_button(log, headers, categories, file_stem, key, label="Download Events"):
+    """
+    Format picker plus a download button whose file is only generated when
+    the button is clicked (see ``macsim.export``). Runs as a fragment, so
+    picking a format only redraws these two controls.
+    """
+    c1, c2 = st.columns([1, 2])
+    fmt = c1.selectbox("Format", list(FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    mime, extension = FORMATS[fmt]
+    timer = _timer()
+    c2.download_button(f"{label} ({fmt})", lambda: _timed_export(timer, log, headers, fmt, categories),
+                       file_name=f"{file_stem}{extension}", mime=mime, key=f"{key}_download", on_click="ignore")
+
+
+# --------------------- PERFORMANCE ---------------------
+PERF_SETTINGS = ("perf_enabled", "perf_trace_memory")
+
+
+def _save_setting(key):
+    st.session_state[key] = st.session_state[f"{key}_toggle"]
+
+
+def page_timer(page):
+    """
+    Start this run's ``PhaseTimer`` for ``page``, enabled from the toggles
+    of the Performance panel (off by default). Call ``performance_panel``
+    at the end of the page.
+    """
+    # The settings live in plain keys, which survive pages without the toggles; the toggles mirror them.
+    for key in PERF_SETTINGS:
+        st.session_state[f"{key}_toggle"] = st.session_state.setdefault(key, False)
+    timer = PhaseTimer(page, st.session_state["perf_enabled"], st.session_state["perf_trace_memory"])
+    st.session_state["perf_timer"] = timer
+    return timer
+
+
+def _timer():
+    return st.session_state.get("perf_timer") or PhaseTimer(None)
+
+
+def phase(name):
+    """``with phase("matplotlib"):`` times a phase of the current run (a no-op when timing is off)."""
+    timer = st.session_state.get("perf_timer")
+    return timer.phase(name) if timer is not None else NULL_PHASE
+
+
+def count(name, n=1):
+    timer = st.session_state.get("perf_timer")
+    if timer is not None:
+        timer.count(name, n)
+
+
+def performance_panel(timer):
+    """
+    Collapsible "Performance" sidebar panel: the toggles, and when timing is
+    on this run's phases, which are also appended to the JSONL run log.
+    """
+    total = timer.finish(LOG_PATH)
+    with st.sidebar.expander("Performance"):
+        st.toggle("Time page phases", key="perf_enabled_toggle", on_change=_save_setting, args=("perf_enabled",))
+        st.toggle("Track allocations (tracemalloc)", key="perf_trace_memory_toggle", on_change=_save_setting,
+                  args=("perf_trace_memory",), disabled=not st.session_state["perf_enabled"])
+        if not timer.enabled:
+            st.caption("Off: turn on to time simulation, DataFrame building, rendering, tables and exports.")
+            return
+        if timer.phases:
+            st.dataframe(pd.DataFrame(timer.rows()), hide_index=True, use_container_width=True)
+        timed = sum(entry["seconds"] for entry in timer.phases.values())
+        st.caption(f"Run total {total * 1000:.0f} ms · phases {timed * 1000:.0f} ms · logged to `{LOG_PATH}` "
+                   "(reruns of a single view are logged as runs of their own)")
+        for name, value in timer.counters.items():
+            st.caption(f"{name}: {value:,}")
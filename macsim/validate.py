@@ -0,0 +1,326 @@
+"""
+Statistical validation of the engines.
+
+    python -m macsim.validate [--replicas 20] [--quick] [--json report.json]
+
+Two groups of checks, all at fixed seeds so a run is reproducible:
+
+* ``theory``: each engine over a parameter grid against its analytic
+  reference: the finite-N formulas of ``macsim.analytic`` (exact for the
+  engine's model) and the classical limits S = G e^(-G) and S = G e^(-2G),
+  whose known finite-size gap is added to the tolerance. One-sample t-test
+  of the replica means.
+* ``reference``: each engine against the plain loops of
+  ``macsim.reference``. Engines that draw random numbers in the same order
+  as their reference must reproduce it exactly, slot for slot; the
+  backlogged engine, which draws per group rather than per node, is
+  compared by Welch's t-test on its summary metrics and a two-sample
+  Kolmogorov-Smirnov test (permutation p-value) on the delay distribution.
+
+A statistical check fails only when the difference is both significant
+(p < ``alpha``) and larger than the equivalence ``margin`` (relative, or
+absolute CDF distance for KS), so long runs don't fail on negligible bias.
+Every check reports its effect size: relative error and Cohen's d against
+theory, Hedges' g between samples, the KS distance D between distributions.
+The process exits with status 1 when any check fails.
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+
+from macsim import reference
+from macsim.analytic import finite_slotted_throughput, pure_aloha_throughput, slotted_aloha_chain
+from macsim.engines import (simulate_csma, simulate_csma_ca, simulate_slotted_aloha, simulate_backlogged_aloha,
+                            simulate_pure_aloha, CONTROLLERS)
+from macsim.stats import t_sf
+
+ALPHA = 1e-3
+MARGIN = 0.02
+KS_MARGIN = 0.02
+REPLICAS = 20
+# Reference replicas use their own seeds so the two samples are independent.
+REFERENCE_SEED_OFFSET = 10_000
+EXACT_SEEDS = range(3)
+
+# (num_nodes, p)
+SLOTTED_GRID = [(10, 0.05), (10, 0.1), (10, 0.3), (40, 0.025)]
+SLOTTED_SLOTS = 5000
+# Offered loads G for the Poisson limit, with N nodes at p = G / N.
+POISSON_NODES = 1000
+POISSON_LOADS = [0.5, 1.0, 2.0]
+# (num_nodes, p, packet_duration)
+PURE_GRID = [(10, 0.02, 3), (10, 0.05, 5), (20, 0.01, 1)]
+PURE_LIMIT_NODES, PURE_LIMIT_DURATION = 40, 10
+PURE_LIMIT_LOADS = [0.25, 0.5]
+PURE_TIME_UNITS = 4000
+# (num_nodes, q_a, q_r)
+BACKLOG_GRID = [(10, 0.02, 0.1), (20, 0.01, 0.2), (10, 0.05, 0.3)]
+BACKLOG_SLOTS = 10000
+BACKLOG_REFERENCE = (10, 0.03, 0.15)
+BACKLOG_REFERENCE_SLOTS = 10000
+
+CSMA_PROTOCOLS = ["1-Persistent CSMA", "Non-Persistent CSMA", "p-Persistent CSMA (CSMA/CD)"]
+CSMA_CA_VARIANTS = ["Basic CSMA/CA", "CSMA/CA with RTS/CTS"]
+
+
+# ---- TESTS ----
+
+def _check(name, group, metric, test, observed, expected, statistic, p_value, effect, effect_size, passed, **extra):
+    return {"name": name, "group": group, "metric": metric, "test": test, "observed": float(observed),
+            "expected": float(expected), "statistic": float(statistic), "p_value": float(p_value),
+            "effect": effect, "effect_size": float(effect_size), "passed": bool(passed), **extra}
+
+
+def _relative(observed, expected):
+    return (observed - expected) / expected if expected else observed - expected
+
+
+def one_sample(name, group, metric, values, expected, alpha=ALPHA, margin=MARGIN):
+    """One-sample t-test of the mean of ``values`` against ``expected``."""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    mean, std = values.mean(), values.std(ddof=1)
+    if std == 0:
+        t, p = (0.0, 1.0) if mean == expected else (math.inf, 0.0)
+    else:
+        t = (mean - expected) / (std / math.sqrt(n))
+        p = 2 * t_sf(abs(t), n - 1)
+    relative = _relative(mean, expected)
+    d = (mean - expected) / std if std else 0.0
+    return _check(name, group, metric, "one-sample t", mean, expected, t, p, "relative error", relative,
+                  p >= alpha or abs(relative) <= margin, cohens_d=d, replicas=n, margin=margin)
+
+
+def welch(name, group, metric, values, expected_values, alpha=ALPHA, margin=MARGIN):
+    """Welch's two-sample t-test of ``values`` (engine) against ``expected_values`` (reference)."""
+    a = np.asarray(values, dtype=float)
+    b = np.asarray(expected_values, dtype=float)
+    va, vb = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    se = math.sqrt(va + vb)
+    if se == 0:
+        t, p, dof = (0.0, 1.0, math.inf) if a.mean() == b.mean() else (math.inf, 0.0, math.inf)
+    else:
+        t = (a.mean() - b.mean()) / se
+        dof = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+        p = 2 * t_sf(abs(t), dof)
+    pooled = math.sqrt(((len(a) - 1) * a.var(ddof=1) + (len(b) - 1) * b.var(ddof=1)) / (len(a) + len(b) - 2))
+    # Hedges' g: Cohen's d with the small-sample correction.
+    g = (a.mean() - b.mean()) / pooled * (1 - 3 / (4 * (len(a) + len(b)) - 9)) if pooled else 0.0
+    relative = _relative(a.mean(), b.mean())
+    return _check(name, group, metric, "Welch t", a.mean(), b.mean(), t, p, "Hedges' g", g,
+                  p >= alpha or abs(relative) <= margin, relative_difference=relative, dof=dof,
+                  replicas=len(a), margin=margin)
+
+
+def ks_replicas(name, group, metric, sketches, sample_sets, alpha=ALPHA, margin=KS_MARGIN, permutations=4999,
+                seed=0):
+    """
+    Two-sample Kolmogorov-Smirnov distance between the pooled distributions
+    of integer-valued engine ``sketches`` and reference ``sample_sets`` (one
+    per replica), with a replica-level permutation p-value: values within a
+    run are correlated, so the classical KS p-value (independent draws)
+    would be far too small. Under the null hypothesis the replicas are
+    exchangeable, so D is recomputed for random splits of all replicas.
+    """
+    sample_sets = [np.sort(np.asarray(s)) for s in sample_sets]
+    low = min([s.min for s in sketches] + [s[0] for s in sample_sets if len(s)])
+    high = max([s.max for s in sketches] + [s[-1] for s in sample_sets if len(s)])
+    grid = np.arange(low, high + 1)
+    # Cumulative counts per replica on the common grid.
+    rows = np.array([s.cdf(grid) * s.count for s in sketches]
+                    + [np.searchsorted(s, grid, side="right") for s in sample_sets], dtype=float)
+    totals = rows[:, -1]
+
+    def distance(in_a):
+        return float(np.max(np.abs(rows[in_a].sum(axis=0) / totals[in_a].sum()
+                                   - rows[~in_a].sum(axis=0) / totals[~in_a].sum())))
+
+    labels = np.arange(len(rows)) < len(sketches)
+    d = distance(labels)
+    rng = np.random.RandomState(seed)
+    extreme = sum(distance(rng.permutation(labels)) >= d for _ in range(permutations))
+    p = (1 + extreme) / (1 + permutations)
+    observed = np.interp(0.5, rows[labels].sum(axis=0) / totals[labels].sum(), grid)
+    expected = np.interp(0.5, rows[~labels].sum(axis=0) / totals[~labels].sum(), grid)
+    return _check(name, group, metric, "permutation KS", observed, expected, d, p, "KS D", d,
+                  p >= alpha or d <= margin, samples=(int(totals[labels].sum()), int(totals[~labels].sum())),
+                  permutations=permutations, margin=margin)
+
+
+def exact(name, group, metric, codes, expected_codes, seed):
+    """Slot-for-slot equality; the statistic is the number of slots that differ."""
+    codes, expected_codes = np.asarray(codes), np.asarray(expected_codes)
+    same_length = len(codes) == len(expected_codes)
+    mismatches = int(np.sum(codes != expected_codes)) if same_length else max(len(codes), len(expected_codes))
+    return _check(name, group, metric, "exact", np.mean(codes == 1), np.mean(expected_codes == 1), mismatches,
+                  1.0 if mismatches == 0 else 0.0, "mismatched slots", mismatches, mismatches == 0, seed=seed)
+
+
+# ---- THEORY ----
+
+def _slotted_throughputs(num_nodes, p, seeds):
+    return [simulate_slotted_aloha(num_nodes, p, SLOTTED_SLOTS, seed=s)[2]["throughput"] for s in seeds]
+
+
+def _pure_throughputs(num_nodes, p, duration, seeds):
+    return [simulate_pure_aloha(num_nodes, p, PURE_TIME_UNITS, duration, seed=s)[2]["throughput"] for s in seeds]
+
+
+def theory_cases(replicas, quick=False):
+    """(name, thunk) pairs; each thunk returns a list of checks."""
+    seeds = range(replicas)
+    cases = []
+    for n, p in SLOTTED_GRID[:2] if quick else SLOTTED_GRID:
+        cases.append((f"Slotted ALOHA N={n} p={p}", lambda n=n, p=p: [one_sample(
+            f"Slotted ALOHA N={n} p={p} vs N p (1-p)^(N-1)", "theory", "throughput",
+            _slotted_throughputs(n, p, seeds), finite_slotted_throughput(n, p))]))
+    for G in POISSON_LOADS[:1] if quick else POISSON_LOADS:
+        def limit(G=G):
+            exact_value = float(finite_slotted_throughput(POISSON_NODES, G / POISSON_NODES))
+            limit_value = G * math.exp(-G)
+            return [one_sample(f"Slotted ALOHA G={G} vs G e^-G", "theory", "throughput",
+                               _slotted_throughputs(POISSON_NODES, G / POISSON_NODES, seeds), limit_value,
+                               margin=MARGIN + abs(_relative(exact_value, limit_value)))]
+        cases.append((f"Slotted ALOHA G={G}", limit))
+
+    for n, p, duration in PURE_GRID[:1] if quick else PURE_GRID:
+        cases.append((f"Pure ALOHA N={n} p={p} D={duration}", lambda n=n, p=p, duration=duration: [one_sample(
+            f"Pure ALOHA N={n} p={p} D={duration} vs finite-N model", "theory", "throughput",
+            _pure_throughputs(n, p, duration, seeds), pure_aloha_throughput(n, p, duration))]))
+    for G in PURE_LIMIT_LOADS[:1] if quick else PURE_LIMIT_LOADS:
+        def pure_limit(G=G):
+            n, duration = PURE_LIMIT_NODES, PURE_LIMIT_DURATION
+            p = G / (n * duration)
+            exact_value = float(pure_aloha_throughput(n, p, duration)) * duration
+            limit_value = G * math.exp(-2 * G)
+            # Throughput per packet time, to match the classical formula.
+            values = np.asarray(_pure_throughputs(n, p, duration, seeds)) * duration
+            return [one_sample(f"Pure ALOHA G={G} vs G e^-2G", "theory", "throughput per packet time", values,
+                               limit_value, margin=MARGIN + abs(_relative(exact_value, limit_value)))]
+        cases.append((f"Pure ALOHA G={G}", pure_limit))
+
+    for m, q_a, q_r in BACKLOG_GRID[:1] if quick else BACKLOG_GRID:
+        def chain(m=m, q_a=q_a, q_r=q_r):
+            model = slotted_aloha_chain(m, q_a, q_r)
+            stats = [simulate_backlogged_aloha(m, q_a, q_r, BACKLOG_SLOTS, seed=s)[2] for s in seeds]
+            label = f"Backlogged ALOHA m={m} q_a={q_a} q_r={q_r} vs backlog chain"
+            return [one_sample(label, "theory", "throughput", [s["throughput"] for s in stats], model["throughput"]),
+                    one_sample(label, "theory", "mean backlog", [s["mean_backlog"] for s in stats],
+                               model["mean_backlog"], margin=2 * MARGIN)]
+        cases.append((f"Backlogged ALOHA m={m}", chain))
+    return cases
+
+
+# ---- REFERENCE ----
+
+def reference_cases(replicas, quick=False):
+    """(name, thunk) pairs comparing the engines with ``macsim.reference``."""
+    def slotted():
+        return [exact("Slotted ALOHA vs reference loop", "reference", "slot codes",
+                      simulate_slotted_aloha(10, 0.1, 2000, seed=s)[0]["code"],
+                      reference.slotted_aloha(10, 0.1, 2000, seed=s)["codes"], s) for s in EXACT_SEEDS]
+
+    def pure():
+        return [exact("Pure ALOHA vs reference loop", "reference", "time-unit codes",
+                      simulate_pure_aloha(8, 0.05, 2000, 3, seed=s)[0]["code"],
+                      reference.pure_aloha(8, 0.05, 2000, 3, seed=s)["codes"], s) for s in EXACT_SEEDS]
+
+    def csma(protocol):
+        return [exact(f"{protocol} vs reference loop", "reference", "slot codes",
+                      simulate_csma(6, 5, 0.0, 2.0, 0.12, protocol, seed=s)[0]["code"],
+                      reference.csma(6, 2.0, 0.12, protocol, seed=s)["codes"], s) for s in EXACT_SEEDS]
+
+    def csma_ca(variant):
+        return [exact(f"{variant} vs reference loop", "reference", "slot codes",
+                      simulate_csma_ca(6, 5, 0.0, 1.5, 0.12, variant, seed=s)[0]["code"],
+                      reference.csma_ca(6, 1.5, 0.12, variant, seed=s)["codes"], s) for s in EXACT_SEEDS]
+
+    def backlogged(controller):
+        m, q_a, q_r = BACKLOG_REFERENCE
+        fast = [simulate_backlogged_aloha(m, q_a, q_r, BACKLOG_REFERENCE_SLOTS, controller, seed=s)[2]
+                for s in range(replicas)]
+        slow = [reference.backlogged_aloha(m, q_a, q_r, BACKLOG_REFERENCE_SLOTS, controller,
+                                           seed=REFERENCE_SEED_OFFSET + s) for s in range(replicas)]
+        label = f"Backlogged ALOHA ({controller}) vs per-node reference"
+        return [
+            welch(label, "reference", "throughput", [s["throughput"] for s in fast], [s["throughput"] for s in slow]),
+            welch(label, "reference", "mean backlog", [s["mean_backlog"] for s in fast],
+                  [s["mean_backlog"] for s in slow], margin=2 * MARGIN),
+            welch(label, "reference", "mean delay", [s["delay"].mean for s in fast],
+                  [s["delays"].mean() for s in slow], margin=2 * MARGIN),
+            ks_replicas(label, "reference", "delay distribution", [s["packets"]["delay"] for s in fast],
+                        [s["delays"] for s in slow]),
+        ]
+
+    cases = [("Slotted ALOHA reference", slotted), ("Pure ALOHA reference", pure)]
+    cases += [(f"{p} reference", lambda p=p: csma(p)) for p in CSMA_PROTOCOLS]
+    cases += [(f"{v} reference", lambda v=v: csma_ca(v)) for v in CSMA_CA_VARIANTS]
+    cases += [(f"Backlogged ALOHA {c} reference", lambda c=c: backlogged(c))
+              for c in (CONTROLLERS[:1] if quick else CONTROLLERS)]
+    return cases
+
+
+# ---- RUN ----
+
+def run_validation(replicas=REPLICAS, quick=False, groups=("theory", "reference"), progress=None):
+    """
+    Run the checks and return ``{"checks": [...], "passed": int, "failed": int,
+    "settings": {...}}``. ``progress(done, total, case=...)`` is called after
+    each case.
+    """
+    cases = []
+    if "theory" in groups:
+        cases += theory_cases(replicas, quick)
+    if "reference" in groups:
+        cases += reference_cases(replicas, quick)
+    checks = []
+    for done, (name, run) in enumerate(cases, start=1):
+        checks.extend(run())
+        if progress is not None:
+            progress(done, len(cases), case=name)
+    failed = sum(not c["passed"] for c in checks)
+    return {
+        "checks": checks,
+        "passed": len(checks) - failed,
+        "failed": failed,
+        "settings": {"replicas": replicas, "quick": quick, "alpha": ALPHA, "margin": MARGIN,
+                     "ks_margin": KS_MARGIN, "groups": list(groups)},
+    }
+
+
+def format_report(report):
+    """Plain-text table of a ``run_validation`` report."""
+    lines = []
+    for c in report["checks"]:
+        status = "PASS" if c["passed"] else "FAIL"
+        if c["test"] == "exact":
+            detail = f"seed {c['seed']}: {c['statistic']:.0f} mismatched slots"
+        else:
+            detail = (f"obs {c['observed']:.4f} exp {c['expected']:.4f}  {c['test']} {c['statistic']:+.2f}"
+                      f"  p={c['p_value']:.3g}  {c['effect']} {c['effect_size']:+.3f}")
+        lines.append(f"{status}  {c['name']} [{c['metric']}]  {detail}")
+    lines.append(f"{report['passed']} passed, {report['failed']} failed")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the MAC protocol engines against theory and references")
+    parser.add_argument("--replicas", type=int, default=REPLICAS)
+    parser.add_argument("--quick", action="store_true", help="a smaller grid")
+    parser.add_argument("--group", choices=["theory", "reference"], action="append",
+                        help="run only this group (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    report = run_validation(args.replicas, args.quick, tuple(args.group or ("theory", "reference")),
+                            progress=lambda done, total, case: print(f"[{done}/{total}] {case}", flush=True))
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
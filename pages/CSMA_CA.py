@@ -1,18 +1,31 @@
 #fill code
 
 import streamlit as st
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.patches import Patch
 import os
 
+from macsim.analytic import one_persistent_csma, nonpersistent_csma, csma_cd
+from macsim.charts import comparison_bars, throughput_curves
+from macsim.engines import simulate_csma_ca, run_compare, new_seed
+from macsim.fairness import state_events
+from macsim.jobs import stage
+from macsim.plotting import draw_state_gantt
+from macsim.render import cached_png
+from macsim.stats import channel_indicators
+from macsim.timeline import TimelinePyramid
+from macsim.ui import (start_job, follow_job, record_run, interval_caption, rolling_metrics, fairness_panel,
+                       packet_distributions, timeline_viewer, event_table, export_button, page_timer,
+                       performance_panel, phase, shown_result, artifact)
+
 # --------------------- PAGE CONFIG ---------------------
 st.set_page_config(
     page_title="CSMA/CA Simulator",
     page_icon="📶",
     layout="wide"
 )
+timer = page_timer("CSMA/CA")
 
 st.sidebar.page_link('Home.py', label='Home')
 #st.sidebar.page_link('pages/CSMA_CA.py', label='CSMA/CA')
@@ -69,127 +82,95 @@ compare_protocols = st.sidebar.checkbox("Compare Both Variants (avg)")
 compare_runs = st.sidebar.slider("Comparison: runs per variant", 3, 20, 5)
 run_simulation = st.sidebar.button("Run Simulation", type="primary")
 
-# --------------------- SIMULATOR ---------------------
-def simulate_csma_ca(num_nodes, num_packets, prop_delay, tx_time, gen_prob, variant="Basic CSMA/CA", seed=None, max_time=400):
-    if seed is not None:
-        np.random.seed(seed)
-
-    success_count = 0
-    collision_count = 0
-    usage_log = []
-    node_timelines = {i: [] for i in range(num_nodes)}
-
-    channel_busy_until = 0.0
-    backoff = np.zeros(num_nodes)
-    packet_ready = np.zeros(num_nodes)
-    waiting_ack = np.zeros(num_nodes)
-
-    for t in range(int(max_time)):
-        # Packet generation
-        for i in range(num_nodes):
-            if np.random.rand() < gen_prob:
-                packet_ready[i] = 1
-
-        active_nodes = [i for i in range(num_nodes) if packet_ready[i] == 1 and backoff[i] <= 0]
-
-        # Channel busy
-        if t < channel_busy_until:
-            usage_log.append(("Busy", t))
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 0))
-            backoff = np.maximum(backoff - 1, 0)
-            continue
-
-        if len(active_nodes) == 0:
-            usage_log.append(("Idle", t))
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 0))
-        elif len(active_nodes) == 1:
-            node = active_nodes[0]
-            success_count += 1
-            usage_log.append((f"Success (Node {node})", t))
-
-            # RTS/CTS handshake delay
-            if variant == "CSMA/CA with RTS/CTS":
-                handshake_time = 0.5 * tx_time
-                channel_busy_until = t + tx_time + handshake_time
-            else:
-                channel_busy_until = t + tx_time
-
-            packet_ready[node] = 0
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 1 if n == node else 0))
-        else:
-            # Virtual collisions due to RTS overlaps
-            collision_count += 1
-            usage_log.append(("Collision", t))
-            for i in active_nodes:
-                backoff[i] = np.random.randint(1, 8)
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 2 if n in active_nodes else 0))
-            channel_busy_until = t + tx_time * 0.5
-
-        backoff = np.maximum(backoff - 1, 0)
-
-    total_slots = int(max_time)
-    efficiency = success_count / total_slots if total_slots else 0
-    throughput = success_count / total_slots if total_slots else 0
-    busy_slots = sum(1 for e, _ in usage_log if e != "Idle")
-    utilization = busy_slots / total_slots if total_slots else 0
-
-    return usage_log, success_count, collision_count, efficiency, throughput, utilization, node_timelines
+# Channel states for the full-run timeline viewer
+CHANNEL_STATES = ["Success", "Collision", "Busy", "Idle"]
+CHANNEL_COLORS = {"Success": '#32CD32', "Collision": '#FF6347', "Busy": '#87CEFA', "Idle": '#d3d3d3'}
+EVENT_HEADERS = {"code": "Event", "slot": "Time Slot", "node": "Node"}
 
 # --------------------- PLOT TIMELINE ---------------------
-def plot_node_gantt(node_timelines, max_time):
+def draw_node_gantt(fig, states, max_time):
     colors = {0: '#d3d3d3', 1: '#32CD32', 2: '#FF6347'}
     labels = {0: 'Idle', 1: 'Successful Transmission', 2: 'Collision'}
 
-    fig, ax = plt.subplots(figsize=(12, 0.6 * len(node_timelines) + 1))
-    max_t = 0
-    for i, (node, timeline) in enumerate(sorted(node_timelines.items())):
-        for t, state in timeline:
-            ax.barh(i, 1, left=t, color=colors[state], height=0.6)
-            if t > max_t:
-                max_t = t
+    ax = fig.subplots()
+    draw_state_gantt(ax, states, colors, height=0.6)
+    max_t = states.shape[1] - 1
     ax.set_xlabel("Time Slot")
     ax.set_ylabel("Node")
     ax.set_title("Node-level Activity Timeline (Gantt view)", fontsize=13, pad=8)
     ax.set_xlim(0, max(max_time, max_t + 1))
-    ax.set_yticks(range(len(node_timelines)))
-    ax.set_yticklabels([f"Node {n}" for n in sorted(node_timelines.keys())])
+    ax.set_yticks(range(states.shape[0]))
+    ax.set_yticklabels([f"Node {n}" for n in range(states.shape[0])])
     ax.grid(axis='x', alpha=0.25)
     legend_patches = [Patch(color=colors[k], label=labels[k]) for k in sorted(labels.keys())]
     ax.legend(handles=legend_patches, loc='upper right', frameon=True)
-    st.pyplot(fig)
-
-# --------------------- COMPARISON ---------------------
-def run_compare(protocols, runs, **kwargs):
-    effs, thrs, utils = [], [], []
-    for proto in protocols:
-        e_list, t_list, u_list = [], [], []
-        for _ in range(runs):
-            seed = np.random.randint(0, 2**31 - 1)
-            _, _, _, eff, thr, util, _ = simulate_csma_ca(
-                kwargs['num_nodes'], kwargs['num_packets'],
-                kwargs['prop_delay'], kwargs['tx_time'],
-                kwargs['gen_prob'], proto, seed=seed, max_time=kwargs.get('max_time', 400)
-            )
-            e_list.append(eff)
-            t_list.append(thr)
-            u_list.append(util)
-        effs.append(np.mean(e_list))
-        thrs.append(np.mean(t_list))
-        utils.append(np.mean(u_list))
-    return effs, thrs, utils
 
-# --------------------- MAIN EXECUTION ---------------------
-if run_simulation:
-    st.spinner("Running simulation...")
 
-    seed0 = np.random.randint(0, 2**31 - 1)
-    usage, success, collisions, eff, thr, util, timelines = simulate_csma_ca(
-        num_nodes, num_packets, prop_delay, tx_time, packet_gen_prob, variant=protocol_type, seed=seed0, max_time=400
+def plot_node_gantt(node_states, max_time):
+    with phase("matplotlib"):
+        png = cached_png(draw_node_gantt, node_states, max_time=max_time,
+                         figsize=(12, 0.6 * node_states.shape[0] + 1))
+    st.image(png)
+    return png
+
+# --------------------- BACKGROUND JOB ---------------------
+COMPARE_VARIANTS = ["Basic CSMA/CA", "CSMA/CA with RTS/CTS"]
+
+
+def run_csma_ca_job(params, variant, compare, runs, seed=None, progress=None):
+    """Single timeline run for the selected variant, plus the averaged comparison if requested."""
+    steps = 2 if compare else 1
+    single = simulate_csma_ca(
+        params['num_nodes'], params['num_packets'], params['prop_delay'], params['tx_time'],
+        params['gen_prob'], variant=variant, seed=seed, max_time=params['max_time'],
+        progress=stage(progress, 0, steps)
     )
+    comparison = None
+    if compare:
+        comparison = run_compare(simulate_csma_ca, COMPARE_VARIANTS, runs,
+                                 progress=stage(progress, 1, steps), **params)
+    return single, comparison
+
+# --------------------- ANALYTIC MODELS ---------------------
+G_GRID = np.linspace(0.01, 10, 200)
+
+
+def analytic_curves(a):
+    """Reference CSMA throughput curves over G_GRID; CSMA/CA's random backoff behaves closest to non-persistent."""
+    return {
+        "Non-Persistent CSMA": nonpersistent_csma(G_GRID, a),
+        "1-Persistent CSMA": one_persistent_csma(G_GRID, a),
+        "CSMA/CD (approx.)": csma_cd(G_GRID, a),
+    }
+
+# --------------------- MAIN EXECUTION ---------------------
+sim_params = dict(
+    num_nodes=num_nodes, num_packets=num_packets,
+    prop_delay=prop_delay, tx_time=tx_time,
+    gen_prob=packet_gen_prob, max_time=400
+)
+run_params = {**sim_params, "variant": protocol_type, "compare_runs": compare_runs if compare_protocols else 0}
+if run_simulation:
+    seed = new_seed()
+    start_job("csma_ca", run_csma_ca_job, sim_params, protocol_type, compare_protocols, compare_runs, seed=seed,
+              label="Simulating CSMA/CA",
+              params={**run_params, "seed": seed})
+follow_job("csma_ca")
+# Stored runs are re-rendered on every rerun, never recomputed; shown with the parameters they were run with.
+result, params = shown_result("csma_ca", run_params)
+
+if result is not None:
+    (usage, success, collisions, eff, thr, util, node_states, channel, packets), comparison = result
+    num_nodes, prop_delay, tx_time = params["num_nodes"], params["prop_delay"], params["tx_time"]
+    packet_gen_prob, protocol_type = params["gen_prob"], params["variant"]
+    record = record_run("csma_ca", "CSMA/CA", usage, EVENT_HEADERS, CHANNEL_STATES, {
+        "successful": success, "collisions": collisions, "efficiency": eff,
+        "throughput": thr, "utilization": util, "channel": channel, "packets": packets,
+        "comparison": None if comparison is None else {
+            variant: {"efficiency": e, "throughput": t, "utilization": u}
+            for variant, e, t, u in zip(COMPARE_VARIANTS, *comparison)
+        },
+    })
 
     st.subheader("Simulation Results")
     c1, c2, c3, c4 = st.columns(4)
@@ -197,38 +178,45 @@ if run_simulation:
     c2.metric("Collisions", collisions)
     c3.metric("Efficiency", f"{eff*100:.2f}%")
     c4.metric("Throughput (pkts/slot)", f"{thr:.4f}")
+    interval_caption(channel)
 
     st.divider()
 
     st.subheader("Node Timeline")
-    plot_node_gantt(timelines, max_time=400)
+    record.add_figure("node_gantt", plot_node_gantt(node_states, max_time=400))
 
-    df = pd.DataFrame(usage, columns=["Event", "Time Slot"])
-    st.dataframe(df, use_container_width=True)
-    st.download_button("Download Event Data (CSV)", df.to_csv(index=False), "csma_ca_events.csv", "text/csv")
+    st.subheader("Channel Timeline (full run)")
+    pyramid = artifact("csma_ca", "pyramid", TimelinePyramid, usage["code"], CHANNEL_STATES)
+    timeline_viewer(pyramid, CHANNEL_COLORS, key="csma_ca_timeline")
 
-    if compare_protocols:
+    # Sliding-window rates reveal transients that the whole-run averages hide
+    st.subheader("Rolling-Window Metrics")
+    rolling_metrics(artifact("csma_ca", "indicators", channel_indicators, usage["code"]), key="csma_ca_rolling")
+
+    # How the channel was shared among nodes
+    st.subheader("Per-Node Fairness")
+    fairness_panel(*artifact("csma_ca", "events", state_events, node_states), node_states.shape[0],
+                   node_states.shape[1], key="csma_ca_fairness")
+
+    st.subheader("Packet Delay & Backoff Distributions")
+    packet_distributions(packets, key="csma_ca_packets")
+
+    event_table(usage, EVENT_HEADERS, CHANNEL_STATES, key="csma_ca_events")
+    export_button(usage, EVENT_HEADERS, CHANNEL_STATES, "csma_ca_events", key="csma_ca_export", label="Download Event Data")
+
+    if comparison is not None:
         st.subheader("Comparison of CSMA/CA Variants (avg)")
-        protocols = ["Basic CSMA/CA", "CSMA/CA with RTS/CTS"]
-        effs, thrs, utils = run_compare(
-            protocols, compare_runs,
-            num_nodes=num_nodes, num_packets=num_packets,
-            prop_delay=prop_delay, tx_time=tx_time,
-            gen_prob=packet_gen_prob, max_time=400
-        )
-
-        fig, axes = plt.subplots(1, 3, figsize=(15, 4))
-        labels = ["Efficiency (%)", "Throughput (pkts/slot)", "Utilization (%)"]
-        data = [[e * 100 for e in effs], thrs, [u * 100 for u in utils]]
-
-        for i, ax in enumerate(axes):
-            ax.bar(protocols, data[i])
-            ax.set_title(labels[i])
-            ax.set_xticklabels(protocols, rotation=15, ha='right', fontsize=9)
-            for j, v in enumerate(data[i]):
-                ax.text(j, v + (max(data[i]) * 0.02), f"{v:.2f}", ha='center', fontweight='bold')
-        plt.tight_layout()
-        st.pyplot(fig)
+        protocols = COMPARE_VARIANTS
+        effs, thrs, utils = comparison
+
+        st.altair_chart(record.add_figure("comparison", comparison_bars(
+            protocols,
+            {
+                "Efficiency (%)": [e * 100 for e in effs],
+                "Throughput (pkts/slot)": thrs,
+                "Utilization (%)": [u * 100 for u in utils],
+            }
+        )))
 
         comp_df = pd.DataFrame({
             "Protocol": protocols,
@@ -236,8 +224,26 @@ if run_simulation:
             "Avg Throughput (pkts/slot)": [round(t, 4) for t in thrs],
             "Avg Utilization (%)": [round(u * 100, 2) for u in utils]
         })
-        st.download_button("Download Comparison (CSV)", comp_df.to_csv(index=False),
-                           "csma_ca_comparison.csv", "text/csv")
+        st.download_button("Download Comparison (CSV)", lambda: comp_df.to_csv(index=False),
+                           "csma_ca_comparison.csv", "text/csv", on_click="ignore")
+
+    # Theory curves with the simulated points on top
+    st.subheader("Analytic Throughput Models")
+    # a = propagation delay / transmission time; the mini-slot models need a > 0
+    a = max(prop_delay / tx_time, 0.01)
+    # Offered load in packets per transmission time, if every node is ready with probability gen_prob
+    G_sim = num_nodes * packet_gen_prob * tx_time
+    points = [(f"This run ({protocol_type})", G_sim, thr * tx_time)]
+    if comparison is not None:
+        points += [(f"{variant} (avg)", G_sim, t * tx_time) for variant, t in zip(COMPARE_VARIANTS, comparison[1])]
+    st.altair_chart(record.add_figure("analytic_throughput", throughput_curves(
+        G_GRID, artifact("csma_ca", "analytic", analytic_curves, a), points,
+        x_title="Offered Load (G, packets per transmission time)",
+        title=f"Throughput vs Offered Load (a = {a:.3g})"
+    )), use_container_width=True)
+    st.caption("Curves: Kleinrock-Tobagi CSMA models and the Bertsekas-Gallager CSMA/CD approximation for "
+               "Poisson traffic. Simulated points use G ≈ nodes × generation probability × transmission time "
+               "and S = successes per slot × transmission time.")
 
 else:
     st.info("Adjust the parameters in the sidebar and click **Run Simulation** to start.")
@@ -255,3 +261,5 @@ st.markdown("""
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+performance_panel(timer)
@@ -1,15 +1,30 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 
+from macsim.analytic import (one_persistent_csma, nonpersistent_csma, p_persistent_csma, p_persistent_waiting, csma_cd,
+                             MAX_WAITING)
+from macsim.charts import comparison_bars, throughput_curves
+from macsim.engines import simulate_csma, run_compare, new_seed
+from macsim.fairness import state_events
+from macsim.optimize import optimal_csma_p
+from macsim.jobs import stage
+from macsim.plotting import draw_state_gantt
+from macsim.render import cached_png
+from macsim.stats import channel_indicators
+from macsim.timeline import TimelinePyramid
+from macsim.ui import (start_job, follow_job, record_run, interval_caption, rolling_metrics, fairness_panel,
+                       packet_distributions, timeline_viewer, event_table, export_button, page_timer,
+                       performance_panel, phase, shown_result, artifact)
+
 # --------------------- PAGE CONFIG ---------------------
 st.set_page_config(
     page_title="CSMA & CSMA/CD Simulator",
     page_icon="💻",
     layout="wide"
 )
+timer = page_timer("CSMA/CD")
 st.sidebar.page_link('Home.py', label='Home')
 #st.sidebar.page_link('pages/CSMA_CA.py', label='CSMA/CA')
 st.sidebar.page_link('pages/CSMA_CD.py', label='CSMA/CD')
@@ -64,153 +79,137 @@ protocol_type = st.sidebar.selectbox(
 )
 compare_protocols = st.sidebar.checkbox("Compare All Protocols (Efficiency & Throughput)")
 compare_runs = st.sidebar.slider("Comparison: runs per protocol (avg)", 3, 20, 6)
+st.session_state.setdefault("csma_persistence", 0.4)
+persistence = st.sidebar.slider("Persistence p (p-Persistent CSMA)", 0.01, 1.0, step=0.01, key="csma_persistence",
+                                help="Probability that a ready node transmits in an idle slot")
 run_simulation = st.sidebar.button("Run Simulation", type="primary")
 
-# --------------------- SIMULATOR (no fixed seed inside) ---------------------
-def simulate_csma(num_nodes, num_packets, prop_delay, tx_time, gen_prob, protocol, seed=None, max_time=400):
-    """
-    Returns:
-        usage_log: list of (event, timeslot) where event in {"Idle","Busy","Success (Node i)","Collision"}
-        success_count, collision_count, efficiency, throughput, utilization, node_timelines
-    """
-    if seed is not None:
-        np.random.seed(seed)
-
-    success_count = 0
-    collision_count = 0
-    usage_log = []
-    node_timelines = {i: [] for i in range(num_nodes)}
-
-    channel_busy_until = 0.0
-    backoff = np.zeros(num_nodes)
-    packet_ready = np.zeros(num_nodes)
-    retransmission_attempts = np.zeros(num_nodes)
-
-    for t in range(int(max_time)):
-        # Packet generation (nodes get packets to send)
-        for i in range(num_nodes):
-            if np.random.rand() < gen_prob:
-                packet_ready[i] = 1
-
-        # Nodes ready to sense and not backing off
-        sensing_nodes = [i for i in range(num_nodes) if packet_ready[i] == 1 and backoff[i] <= 0]
-
-        # If channel is busy (we approximate using channel_busy_until)
-        if t < channel_busy_until:
-            # Behaviors when busy
-            if protocol == "Non-Persistent CSMA":
-                for i in sensing_nodes:
-                    backoff[i] = np.random.randint(2, 8)  # wait some slots
-            elif protocol == "p-Persistent CSMA (CSMA/CD)":
-                p = 0.4
-                sensing_nodes = [i for i in sensing_nodes if np.random.rand() < p]
-            # mark busy/idle for each node timeline
-            usage_log.append(("Busy", t))
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 0))  # idle for nodes while channel busy (they back off)
-            backoff = np.maximum(backoff - 1, 0)
-            continue
-
-        # Channel is free -> attempt
-        if len(sensing_nodes) == 0:
-            usage_log.append(("Idle", t))
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 0))
-        elif len(sensing_nodes) == 1:
-            # Successful transmission
-            node = sensing_nodes[0]
-            success_count += 1
-            usage_log.append((f"Success (Node {node})", t))
-            packet_ready[node] = 0
-            retransmission_attempts[node] = 0
-            # mark node timelines
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 1 if n == node else 0))
-            # channel busy for tx_time slots
-            channel_busy_until = t + max(1.0, tx_time)
-        else:
-            # Collision among sensing_nodes
-            collision_count += 1
-            usage_log.append(("Collision", t))
-            # exponential backoff based on retransmission attempts
-            for i in sensing_nodes:
-                retransmission_attempts[i] += 1
-                k = int(min(retransmission_attempts[i], 10))
-                backoff[i] = np.random.randint(1, 2 ** k)  # integer slots
-            # mark which nodes collided in their timelines
-            for n in range(num_nodes):
-                node_timelines[n].append((t, 2 if n in sensing_nodes else 0))
-            # collisions also occupy the medium (approx 1 slot)
-            channel_busy_until = t + max(1.0, tx_time * 0.5)
-        # decrement backoffs
-        backoff = np.maximum(backoff - 1, 0)
-
-    total_slots = int(max_time)
-    # Efficiency defined as successful transmissions / total slots
-    efficiency = success_count / total_slots if total_slots else 0.0
-    # Throughput as successful packets per time unit (slots)
-    throughput = success_count / total_slots if total_slots else 0.0
-    # Utilization = fraction of slots where the channel was non-idle (success or collision)
-    busy_slots = sum(1 for e, _ in usage_log if e != "Idle")
-    utilization = busy_slots / total_slots if total_slots else 0.0
-
-    return usage_log, success_count, collision_count, efficiency, throughput, utilization, node_timelines
+# Throughput-maximizing persistence, searched over cached simulation replicas
+opt_params = dict(num_nodes=num_nodes, num_packets=num_packets, prop_delay=prop_delay, tx_time=tx_time,
+                  gen_prob=packet_gen_prob, max_time=400)
+if st.sidebar.button("Find Optimal p", help="Noise-aware golden-section search over simulation replicas"):
+    start_job("csma_opt", optimal_csma_p, **opt_params, label="Searching for the optimal p", params=opt_params,
+              phase="search")
+with st.sidebar:
+    follow_job("csma_opt", store=False)
+    optimum = st.session_state.get("csma_opt_result")
+    if optimum is not None and st.session_state.get("csma_opt_params") == opt_params:
+        flat = "" if optimum['resolved'] else \
+            f"; throughput is flat within noise for p in {optimum['bracket'][0]:.2f}-{optimum['bracket'][1]:.2f}"
+        st.caption(f"Optimal p ≈ {optimum['p']:.3f}: S = {optimum['throughput']:.4f} ± "
+                   f"{optimum['ci_half_width']:.4f} over {optimum['replicas']} replicas "
+                   f"({optimum['samples']} simulations{flat})")
+        st.button("Use Optimal p", on_click=lambda: st.session_state.update(csma_persistence=round(optimum['p'], 2)))
+
+# Channel states for the full-run timeline viewer
+CHANNEL_STATES = ["Success", "Collision", "Busy", "Idle"]
+CHANNEL_COLORS = {"Success": '#32CD32', "Collision": '#FF6347', "Busy": '#87CEFA', "Idle": '#d3d3d3'}
+EVENT_HEADERS = {"code": "Event", "slot": "Time Slot", "node": "Node"}
 
 # --------------------- PLOTTING: per-node Gantt timeline ---------------------
-def plot_node_gantt(node_timelines, max_time):
+def draw_node_gantt(fig, states, max_time):
     colors = {0: '#d3d3d3', 1: '#32CD32', 2: '#FF6347'}
     labels = {0: 'Idle', 1: 'Successful Transmission', 2: 'Collision'}
 
-    fig, ax = plt.subplots(figsize=(12, 0.6 * len(node_timelines) + 1))
-    max_t = 0
-    for i, (node, timeline) in enumerate(sorted(node_timelines.items())):
-        for t, state in timeline:
-            ax.barh(i, 1, left=t, color=colors[state], height=0.6)
-            if t > max_t:
-                max_t = t
+    ax = fig.subplots()
+    draw_state_gantt(ax, states, colors, height=0.6)
+    max_t = states.shape[1] - 1
     ax.set_xlabel("Time Slot")
     ax.set_ylabel("Node")
     ax.set_title("Node-level Activity Timeline (Gantt view)", fontsize=13, pad=8)
     ax.set_xlim(0, max(max_time, max_t + 1))
-    ax.set_yticks(range(len(node_timelines)))
-    ax.set_yticklabels([f"Node {n}" for n in sorted(node_timelines.keys())])
+    ax.set_yticks(range(states.shape[0]))
+    ax.set_yticklabels([f"Node {n}" for n in range(states.shape[0])])
     ax.grid(axis='x', alpha=0.25)
     legend_patches = [Patch(color=colors[k], label=labels[k]) for k in sorted(labels.keys())]
     ax.legend(handles=legend_patches, loc='upper right', frameon=True)
-    st.pyplot(fig)
-
-# --------------------- COMPARISON (multi-run averaging to stabilize) ---------------------
-def run_compare(protocols, runs, **kwargs):
-    effs, thrs, utils = [], [], []
-    for proto in protocols:
-        proto_effs = []
-        proto_ths = []
-        proto_utils = []
-        for r in range(runs):
-            seed = np.random.randint(0, 2**31 - 1)
-            _, s_cnt, c_cnt, eff, thr, util, _ = simulate_csma(
-                kwargs['num_nodes'], kwargs['num_packets'],
-                kwargs['prop_delay'], kwargs['tx_time'],
-                kwargs['gen_prob'], proto, seed=seed, max_time=kwargs.get('max_time', 400)
-            )
-            proto_effs.append(eff)
-            proto_ths.append(thr)
-            proto_utils.append(util)
-        # average across runs
-        effs.append(np.mean(proto_effs))
-        thrs.append(np.mean(proto_ths))
-        utils.append(np.mean(proto_utils))
-    return effs, thrs, utils
+
+
+def plot_node_gantt(node_states, max_time):
+    with phase("matplotlib"):
+        png = cached_png(draw_node_gantt, node_states, max_time=max_time,
+                         figsize=(12, 0.6 * node_states.shape[0] + 1))
+    st.image(png)
+    return png
+
+# --------------------- BACKGROUND JOB ---------------------
+COMPARE_PROTOCOLS = ["1-Persistent CSMA", "Non-Persistent CSMA", "p-Persistent CSMA (CSMA/CD)"]
+
+
+def run_csma_job(params, protocol, compare, runs, seed=None, progress=None):
+    """Single timeline run for the selected protocol, plus the averaged comparison if requested."""
+    steps = 2 if compare else 1
+    single = simulate_csma(
+        params['num_nodes'], params['num_packets'], params['prop_delay'], params['tx_time'],
+        params['gen_prob'], protocol, seed=seed, max_time=params['max_time'],
+        progress=stage(progress, 0, steps), persistence=params['persistence']
+    )
+    comparison = None
+    if compare:
+        comparison = run_compare(simulate_csma, COMPARE_PROTOCOLS, runs,
+                                 progress=stage(progress, 1, steps), **params)
+    return single, comparison
+
+# --------------------- ANALYTIC MODELS ---------------------
+G_GRID = np.linspace(0.01, 10, 200)
+
+
+def analytic_curves(a, p):
+    """Kleinrock-Tobagi / Bertsekas-Gallager throughput curves over G_GRID, one NumPy call each."""
+    curves = {
+        "1-Persistent CSMA": one_persistent_csma(G_GRID, a),
+        "Non-Persistent CSMA": nonpersistent_csma(G_GRID, a),
+        "CSMA/CD (approx.)": csma_cd(G_GRID, a),
+    }
+    # The p-persistent chain grows as G (1 + a) / p; draw it only where it fits in MAX_WAITING states.
+    fits = p_persistent_fits(a, p)
+    if fits.any():
+        curve = np.full(len(G_GRID), np.nan)
+        curve[fits] = p_persistent_csma(G_GRID[fits], a, p)
+        curves[f"p-Persistent CSMA (p={p:g})"] = curve
+    return curves
+
+
+def p_persistent_fits(a, p):
+    """Mask of the G_GRID points where the p-persistent model stays within MAX_WAITING states."""
+    return p_persistent_waiting(G_GRID, a, p) <= MAX_WAITING
 
 # --------------------- MAIN EXECUTION ---------------------
+sim_params = dict(
+    num_nodes=num_nodes, num_packets=num_packets,
+    prop_delay=prop_delay, tx_time=tx_time,
+    gen_prob=packet_gen_prob, max_time=400, persistence=persistence
+)
+run_params = {**sim_params, "protocol": protocol_type, "compare_runs": compare_runs if compare_protocols else 0}
+# p only matters to p-persistent runs (alone or in the comparison); leaving it out of the others keeps
+# a moved slider from marking them stale.
+if protocol_type != "p-Persistent CSMA (CSMA/CD)" and not compare_protocols:
+    del run_params["persistence"]
 if run_simulation:
-    st.spinner("Running simulation...")
-    # single run for user-selected protocol timeline
-    # use a random seed for variety on each run
-    seed0 = np.random.randint(0, 2**31 - 1)
-    usage, success, collisions, efficiency, throughput, utilization, node_timeline = simulate_csma(
-        num_nodes, num_packets, prop_delay, tx_time, packet_gen_prob, protocol_type, seed=seed0, max_time=400
-    )
+    # use a random seed for variety on each run (recorded for the Download page)
+    seed = new_seed()
+    start_job("csma_cd", run_csma_job, sim_params, protocol_type, compare_protocols, compare_runs, seed=seed,
+              label="Simulating CSMA",
+              params={**run_params, "seed": seed})
+follow_job("csma_cd")
+# Stored runs are re-rendered on every rerun, never recomputed; shown with the parameters they were run with.
+result, params = shown_result("csma_cd", run_params)
+
+if result is not None:
+    (usage, success, collisions, efficiency, throughput, utilization, node_states, channel,
+     packets), comparison = result
+    num_nodes, prop_delay, tx_time = params["num_nodes"], params["prop_delay"], params["tx_time"]
+    packet_gen_prob, protocol_type = params["gen_prob"], params["protocol"]
+    # Runs without p draw the p-persistent model at the slider's p.
+    persistence = params.get("persistence", persistence)
+    record = record_run("csma_cd", "CSMA/CD", usage, EVENT_HEADERS, CHANNEL_STATES, {
+        "successful": success, "collisions": collisions, "efficiency": efficiency,
+        "throughput": throughput, "utilization": utilization, "channel": channel, "packets": packets,
+        "comparison": None if comparison is None else {
+            proto: {"efficiency": e, "throughput": t, "utilization": u}
+            for proto, e, t, u in zip(COMPARE_PROTOCOLS, *comparison)
+        },
+    })
 
     # Metrics
     st.subheader("Simulation Results")
@@ -219,68 +218,53 @@ if run_simulation:
     c2.metric("Collisions", collisions)
     c3.metric("Efficiency", f"{efficiency*100:.2f}%")
     c4.metric("Throughput (pkts/slot)", f"{throughput:.4f}")
+    interval_caption(channel)
 
     st.divider()
 
     # Node-level Gantt timeline (clear)
     st.subheader("Channel Activity Timeline (per node)")
-    plot_node_gantt(node_timeline, max_time=400)
+    record.add_figure("node_gantt", plot_node_gantt(node_states, max_time=400))
+
+    # Whole-run channel view (aggregated, zoomable)
+    st.subheader("Channel Timeline (full run)")
+    pyramid = artifact("csma_cd", "pyramid", TimelinePyramid, usage["code"], CHANNEL_STATES)
+    timeline_viewer(pyramid, CHANNEL_COLORS, key="csma_cd_timeline")
+
+    # Sliding-window rates reveal transients that the whole-run averages hide
+    st.subheader("Rolling-Window Metrics")
+    rolling_metrics(artifact("csma_cd", "indicators", channel_indicators, usage["code"]), key="csma_cd_rolling")
+
+    # How the channel was shared among nodes
+    st.subheader("Per-Node Fairness")
+    fairness_panel(*artifact("csma_cd", "events", state_events, node_states), node_states.shape[0],
+                   node_states.shape[1], key="csma_cd_fairness")
+
+    st.subheader("Packet Delay & Backoff Distributions")
+    packet_distributions(packets, key="csma_cd_packets")
 
     # Event table (aggregate)
     st.subheader("Event Table (aggregate per timeslot)")
-    df = pd.DataFrame(usage, columns=["Event", "Time Slot"])
-    st.dataframe(df, use_container_width=True)
-    st.download_button("Download Event Data (CSV)", df.to_csv(index=False), "csma_event_table.csv", "text/csv")
+    event_table(usage, EVENT_HEADERS, CHANNEL_STATES, key="csma_cd_events")
+    export_button(usage, EVENT_HEADERS, CHANNEL_STATES, "csma_event_table", key="csma_cd_export", label="Download Event Data")
 
     st.divider()
 
     # Comparison across protocols (averaged)
-    if compare_protocols:
+    if comparison is not None:
         st.subheader("Protocol Performance Comparison (averaged)")
-        protocols = ["1-Persistent CSMA", "Non-Persistent CSMA", "p-Persistent CSMA (CSMA/CD)"]
-        effs, thrs, utils = run_compare(
-            protocols, compare_runs,
-            num_nodes=num_nodes, num_packets=num_packets,
-            prop_delay=prop_delay, tx_time=tx_time,
-            gen_prob=packet_gen_prob, max_time=400
-        )
-
-        fig, axes = plt.subplots(1, 3, figsize=(15, 4))
-        # Efficiency %
-        axes[0].bar(protocols, [e * 100 for e in effs], color=["#3498DB", "#E67E22", "#2ECC71"])
-        axes[0].set_ylabel("Efficiency (%)")
-        axes[0].set_title("Efficiency (avg)")
-        axes[0].set_ylim(0, 100)
-        for i, v in enumerate(effs):
-            axes[0].text(i, v * 100 + 1, f"{v*100:.1f}%", ha='center', fontweight='bold')
-
-        # Throughput
-        axes[1].bar(protocols, thrs, color=["#3498DB", "#E67E22", "#2ECC71"])
-        axes[1].set_ylabel("Throughput (pkts/slot)")
-        axes[1].set_title("Throughput (avg)")
-        max_thr = max(thrs) if thrs else 1.0
-        axes[1].set_ylim(0, max_thr * 1.4)
-        for i, v in enumerate(thrs):
-            axes[1].text(i, v + max_thr*0.02, f"{v:.4f}", ha='center', fontweight='bold')
-
-        # Utilization %
-        axes[2].bar(protocols, [u * 100 for u in utils], color=["#3498DB", "#E67E22", "#2ECC71"])
-        axes[2].set_ylabel("Channel Utilization (%)")
-        axes[2].set_title("Channel Utilization (avg)")
-        axes[2].set_ylim(0, 100)
-        for i, v in enumerate(utils):
-            axes[2].text(i, v * 100 + 1, f"{v*100:.1f}%", ha='center', fontweight='bold')
-
-        # Improve readability of x-axis labels and spacing
-        for ax in axes:
-            ax.set_xticklabels(protocols, rotation=15, ha='right', fontsize=9)
-            ax.tick_params(axis='x', labelsize=9)
-            ax.margins(x=0.1)
-            
-        plt.tight_layout(pad=3.0, rect=[0, 0.05, 1, 1])
-        st.pyplot(fig)
-        fig, axes = plt.subplots(1, 3, figsize=(17, 4))
-
+        protocols = COMPARE_PROTOCOLS
+        effs, thrs, utils = comparison
+
+        st.altair_chart(record.add_figure("comparison", comparison_bars(
+            protocols,
+            {
+                "Efficiency (%) (avg)": [e * 100 for e in effs],
+                "Throughput (pkts/slot) (avg)": thrs,
+                "Channel Utilization (%) (avg)": [u * 100 for u in utils],
+            },
+            colors=["#3498DB", "#E67E22", "#2ECC71"]
+        )))
 
         # Download comparison CSV
         comp_df = pd.DataFrame({
@@ -289,8 +273,33 @@ if run_simulation:
             "Avg Throughput (pkts/slot)": [round(t, 6) for t in thrs],
             "Avg Utilization (%)": [round(u * 100, 3) for u in utils]
         })
-        st.download_button("Download Comparison Data (CSV)", comp_df.to_csv(index=False),
-                           "csma_protocol_comparison.csv", "text/csv")
+        st.download_button("Download Comparison Data (CSV)", lambda: comp_df.to_csv(index=False),
+                           "csma_protocol_comparison.csv", "text/csv", on_click="ignore")
+
+    # Theory curves with the simulated points on top
+    st.subheader("Analytic Throughput Models")
+    # a = propagation delay / transmission time; the mini-slot models need a > 0
+    a = max(prop_delay / tx_time, 0.01)
+    # Offered load in packets per transmission time, if every node is ready with probability gen_prob
+    G_sim = num_nodes * packet_gen_prob * tx_time
+    points = [(f"This run ({protocol_type})", G_sim, throughput * tx_time)]
+    if comparison is not None:
+        points += [(f"{proto} (avg)", G_sim, thr * tx_time) for proto, thr in zip(COMPARE_PROTOCOLS, comparison[1])]
+    st.altair_chart(record.add_figure("analytic_throughput", throughput_curves(
+        G_GRID, artifact("csma_cd", f"analytic p={persistence:g}", analytic_curves, a, persistence), points,
+        x_title="Offered Load (G, packets per transmission time)",
+        title=f"Throughput vs Offered Load (a = {a:.3g})"
+    )), use_container_width=True)
+    st.caption("Curves: Kleinrock-Tobagi CSMA models and the Bertsekas-Gallager CSMA/CD approximation for "
+               "Poisson traffic. Simulated points use G ≈ nodes × generation probability × transmission time "
+               "and S = successes per slot × transmission time.")
+    fits = p_persistent_fits(a, persistence)
+    if not fits.any():
+        st.caption(f"The p-persistent model is omitted: at a = {a:.3g}, p = {persistence:g} it needs more than "
+                   f"{MAX_WAITING} waiting-packet states even at G = {G_GRID[0]:g}.")
+    elif not fits.all():
+        st.caption(f"The p-persistent model is drawn up to G = {G_GRID[fits][-1]:.2f} only: beyond that it needs more "
+                   f"than {MAX_WAITING} waiting-packet states at a = {a:.3g}, p = {persistence:g}.")
 
 else:
     st.info("Adjust parameters in the sidebar and click Run Simulation to start.")
@@ -308,4 +317,6 @@ st.markdown("""
         Developed for Computer Networks Project | CSMA & CSMA/CD Simulator<br>
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+performance_panel(timer)
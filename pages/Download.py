@@ -3,6 +3,9 @@ import pandas as pd
 import io
 from datetime import datetime
 
+from macsim.bundle import build_bundle
+from macsim.ui import start_job, follow_job, page_timer, performance_panel
+
 
 # Page configuration
 st.set_page_config(
@@ -10,6 +13,7 @@ st.set_page_config(
     page_icon="📥",
     layout="wide"
 )
+timer = page_timer("Download")
 st.sidebar.page_link('Home.py', label='Home')
 st.sidebar.page_link('pages/CSMA_CD.py', label='CSMA/CD')
 st.sidebar.page_link('pages/Slotted_Aloha.py', label='Slotted_Aloha')
@@ -82,6 +86,43 @@ st.info("""
 """)
 st.divider()
 
+# ---------------- LIVE RESULTS BUNDLE ----------------
+st.markdown("## 📦 Your Simulation Results")
+runs = st.session_state.get("runs", {})
+if not runs:
+    st.info("No results in this session yet. Run a simulation on any protocol page and come back here "
+            "to download everything as one bundle.")
+else:
+    st.dataframe(pd.DataFrame([{
+        "Protocol": record.protocol,
+        "Finished": datetime.fromtimestamp(record.created_at).strftime('%H:%M:%S'),
+        "Seed": record.seed,
+        "Events": len(record.log),
+        "Figures": len(record.figures),
+    } for record in runs.values()]), use_container_width=True, hide_index=True)
+
+    selected = st.multiselect("Runs to include", list(runs), default=list(runs),
+                              format_func=lambda key: runs[key].protocol)
+    # A bundle is only offered for the exact runs it was built from.
+    wanted = [(key, runs[key].created_at) for key in selected]
+    st.caption("Each run contributes its event log (Parquet), statistics and parameters with the seed (JSON) "
+               "and the figures shown on its page (PNG / Vega-Lite JSON).")
+
+    if st.button("Build Results Bundle", type="primary", disabled=not selected):
+        st.session_state["bundle_runs"] = wanted
+        st.session_state.pop("bundle_result", None)
+        start_job("bundle", build_bundle, [runs[key] for key in selected], label="Building results bundle",
+                  phase="bundle")
+    # Only the latest bundle is kept (under "bundle_result"), apart from the stored simulation runs.
+    follow_job("bundle", store=False)
+
+    bundle = st.session_state.get("bundle_result")
+    if bundle is not None and st.session_state.get("bundle_runs") == wanted:
+        st.download_button("⬇️ Download Results Bundle (ZIP)", bundle,
+                           f"mac_sim_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip", "application/zip")
+
+st.divider()
+
 # ---------------- TABS ----------------
 st.markdown("## 📄 Download Simulation Outputs & Documentation")
 tab1, tab2 = st.tabs(["CSMA/CD Example", "Slotted ALOHA Example"])
@@ -293,4 +334,6 @@ st.markdown("""
         Run simulations on CSMA/CD or Slotted ALOHA pages to generate downloadable data!
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+performance_panel(timer)
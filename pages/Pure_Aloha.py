@@ -1,14 +1,27 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
 import pandas as pd
 
+from macsim.charts import throughput_curves, outcome_donut, activity_bars
+from macsim.engines import simulate_pure_aloha
+from macsim.events import SUCCESS, COLLISION, status_categorical
+from macsim.optimize import optimal_pure_p
+from macsim.plotting import draw_interval_gantt
+from macsim.render import cached_png
+from macsim.stats import channel_indicators
+from macsim.timeline import TimelinePyramid
+from macsim.ui import (start_job, follow_job, record_run, interval_caption, rolling_metrics, fairness_panel,
+                       timeline_viewer, event_table, export_button, page_timer,
+                       performance_panel, phase, shown_result, artifact, resume_state)
+
 # Page configuration
 st.set_page_config(
     page_title="Pure ALOHA Simulator",
     page_icon="📡",
     layout="wide"
 )
+timer = page_timer("Pure ALOHA")
 st.sidebar.page_link('Home.py', label='Home')
 #comment out CSMA/CA page like Pure_Aloha.py page for now, we'll display it later
 st.sidebar.page_link('pages/CSMA_CD.py', label='CSMA/CD')
@@ -55,12 +68,13 @@ num_nodes = st.sidebar.slider(
     help="Number of nodes competing for channel access"
 )
 
+st.session_state.setdefault("pure_p", 0.15)
 transmission_prob = st.sidebar.slider(
     "Transmission Probability (p)",
     min_value=0.01,
     max_value=1.0,
-    value=0.15,
     step=0.01,
+    key="pure_p",
     help="Probability that a node will attempt to transmit in a given time unit"
 )
 
@@ -81,132 +95,38 @@ packet_duration = st.sidebar.slider(
     help="Duration (in time units) for transmitting one packet"
 )
 
+# Throughput-maximizing p from the exact stationary model of this simulator
+optimal_p, optimal_throughput = optimal_pure_p(num_nodes, packet_duration)
+st.sidebar.caption(f"Optimal p for N={num_nodes}, duration {packet_duration}: {optimal_p:.4f} "
+                   f"(S = {optimal_throughput:.4f})")
+st.sidebar.button("Use Optimal p", on_click=lambda: st.session_state.update(pure_p=max(0.01, round(optimal_p, 2))),
+                  help="Set p to the throughput-maximizing value (rounded to the slider step)")
+
 # Run simulation button
 run_simulation = st.sidebar.button("Run Simulation", type="primary")
 
-# Pure ALOHA simulation logic
-def simulate_pure_aloha(num_nodes, p, num_time_units, packet_duration):
-    """
-    Simulate Pure ALOHA protocol
-    
-    In Pure ALOHA, nodes can transmit at any time. A collision occurs if
-    any part of a packet overlaps with another packet.
-    
-    Returns:
-    - time_units_data: List of tuples (time_unit, active_transmissions, status)
-    - node_transmissions: Dict tracking transmission periods for each node
-    - statistics: Dictionary with overall statistics
-    """
-    # Track ongoing transmissions: {node_id: end_time}
-    active_transmissions = {}
-    
-    # Track all transmission events
-    all_transmissions = []  # (node_id, start_time, end_time, success/collision)
-    
-    time_units_data = []
-    node_transmissions = {i: [] for i in range(num_nodes)}
-    
-    successful_transmissions = 0
-    collisions = 0
-    idle_time_units = 0
-    
-    for t in range(num_time_units):
-        # Clean up completed transmissions
-        completed_nodes = [node for node, end_time in active_transmissions.items() if end_time <= t]
-        for node in completed_nodes:
-            del active_transmissions[node]
-        
-        # Each node decides to transmit with probability p (if not already transmitting)
-        for node in range(num_nodes):
-            if node not in active_transmissions and np.random.random() < p:
-                # Node attempts to transmit
-                end_time = t + packet_duration
-                active_transmissions[node] = end_time
-                all_transmissions.append([node, t, end_time, None])  # Status to be determined
-        
-        # Check current status
-        num_active = len(active_transmissions)
-        
-        if num_active == 0:
-            status = "Idle"
-            idle_time_units += 1
-        elif num_active == 1:
-            status = "Transmitting"
-        else:
-            status = "Collision"
-        
-        time_units_data.append((t, num_active, status))
-    
-    # Determine success/collision for each transmission
-    for i, trans_i in enumerate(all_transmissions):
-        node_i, start_i, end_i, _ = trans_i
-        has_collision = False
-        
-        # Check overlap with other transmissions
-        for j, trans_j in enumerate(all_transmissions):
-            if i == j:
-                continue
-            node_j, start_j, end_j, _ = trans_j
-            
-            # Check if transmissions overlap
-            if not (end_i <= start_j or end_j <= start_i):
-                has_collision = True
-                break
-        
-        if has_collision:
-            all_transmissions[i][3] = "Collision"
-            collisions += 1
-        else:
-            all_transmissions[i][3] = "Success"
-            successful_transmissions += 1
-        
-        # Record in node_transmissions
-        node_transmissions[node_i].append((start_i, end_i, all_transmissions[i][3]))
-    
-    # Calculate throughput (successful transmissions per time unit)
-    throughput = successful_transmissions / num_time_units
-    
-    # Theoretical maximum throughput for Pure ALOHA is 1/(2e) ≈ 0.184
-    theoretical_max = 1 / (2 * np.e)
-    
-    # Calculate offered load (G = N * p)
-    offered_load = num_nodes * p
-    
-    statistics = {
-        "successful": successful_transmissions,
-        "collisions": collisions,
-        "idle": idle_time_units,
-        "throughput": throughput,
-        "theoretical_max": theoretical_max,
-        "offered_load": offered_load,
-        "efficiency": (throughput / theoretical_max) * 100,
-        "total_transmissions": len(all_transmissions)
-    }
-    
-    return time_units_data, node_transmissions, statistics, all_transmissions
-
 # Theoretical throughput curve
 def get_theoretical_throughput(G_values):
     """Calculate theoretical throughput for Pure ALOHA: S = G * e^(-2G)"""
     return G_values * np.exp(-2 * G_values)
 
-# Plot node-level timeline diagram (Gantt chart)
-def plot_node_timeline(node_transmissions, num_time_units_to_show=100):
+# Channel states for the full-run timeline viewer
+CHANNEL_STATES = ["Transmitting", "Collision", "Idle"]
+CHANNEL_COLORS = {"Transmitting": '#2ecc71', "Collision": '#e74c3c', "Idle": '#95a5a6'}
+TX_STATES = ["Success", "Collision"]
+TX_HEADERS = {"node": "Node", "start": "Start Time", "end": "End Time", "code": "Status"}
+
+# Draw node-level timeline diagram (Gantt chart) onto a figure
+def draw_node_timeline(fig, transmissions, num_nodes, num_time_units_to_show):
     """
-    Create a Gantt-style timeline showing packet transmission attempts per node
+    Draw a Gantt-style timeline showing packet transmission attempts per node
     """
-    colors = {'Success': '#2ecc71', 'Collision': '#e74c3c'}
+    colors = {SUCCESS: '#2ecc71', COLLISION: '#e74c3c'}
     
-    num_nodes = len(node_transmissions)
-    
-    fig, ax = plt.subplots(figsize=(14, max(6, num_nodes * 0.4)))
-    
-    for node_id, transmissions in node_transmissions.items():
-        for start, end, status in transmissions:
-            if start < num_time_units_to_show:
-                width = min(end, num_time_units_to_show) - start
-                ax.barh(node_id, width, left=start, color=colors.get(status, '#95a5a6'), 
-                       height=0.8, edgecolor='white', linewidth=0.5)
+    ax = fig.subplots()
+    draw_interval_gantt(ax, transmissions["node"], transmissions["start"], transmissions["end"],
+                        transmissions["code"], colors, num_time_units_to_show,
+                        height=0.8, edgecolor='white', linewidth=0.5)
     
     ax.set_xlabel('Time Unit', fontsize=12)
     ax.set_ylabel('Node ID', fontsize=12)
@@ -219,22 +139,50 @@ def plot_node_timeline(node_transmissions, num_time_units_to_show=100):
     ax.grid(axis='x', alpha=0.3, linestyle='--')
     
     # Legend
-    from matplotlib.patches import Patch
     legend_elements = [
         Patch(facecolor='#2ecc71', label='Success'),
         Patch(facecolor='#e74c3c', label='Collision')
     ]
     ax.legend(handles=legend_elements, loc='upper right', frameon=True, fontsize=10)
     
-    plt.tight_layout()
-    st.pyplot(fig)
+    fig.tight_layout()
+
+# Plot node-level timeline diagram (Gantt chart)
+def plot_node_timeline(transmissions, num_nodes, num_time_units_to_show=100):
+    # Only the bars that start inside the window affect the picture (and the cache key)
+    visible = transmissions["start"] < num_time_units_to_show
+    columns = {name: transmissions[name][visible] for name in ("node", "start", "end", "code")}
+    with phase("matplotlib"):
+        png = cached_png(draw_node_timeline, columns, num_nodes, num_time_units_to_show,
+                         figsize=(14, max(6, num_nodes * 0.4)))
+    st.image(png)
+    return png
+
+def pure_indicators(codes, transmissions, num_time_units):
+    """Channel indicators with throughput counted by the start time of successful transmissions."""
+    series = channel_indicators(codes)
+    succeeded = transmissions["code"] == SUCCESS
+    series["throughput"] = np.bincount(transmissions["start"][succeeded], minlength=num_time_units)
+    return series
 
 # Main simulation
+run_params = {"num_nodes": num_nodes, "p": transmission_prob, "num_time_units": num_time_units,
+              "packet_duration": packet_duration}
 if run_simulation:
-    with st.spinner("Running simulation..."):
-        time_units_data, node_transmissions, stats, all_transmissions = simulate_pure_aloha(
-            num_nodes, transmission_prob, num_time_units, packet_duration
-        )
+    # A stored run with fewer time units and otherwise the same settings is extended, not restarted.
+    state, seed = resume_state("pure_aloha", run_params, "num_time_units")
+    action = "Extending" if state else "Simulating"
+    start_job("pure_aloha", simulate_pure_aloha, num_nodes, transmission_prob, num_time_units, packet_duration,
+              seed=seed, state=state, label=f"{action} Pure ALOHA", params={**run_params, "seed": seed})
+follow_job("pure_aloha")
+# Stored runs are re-rendered on every rerun, never recomputed; shown with the parameters they were run with.
+result, params = shown_result("pure_aloha", run_params)
+
+if result is not None:
+    time_units_log, transmissions, stats = result
+    num_nodes, transmission_prob = params["num_nodes"], params["p"]
+    num_time_units, packet_duration = params["num_time_units"], params["packet_duration"]
+    record = record_run("pure_aloha", "Pure ALOHA", transmissions, TX_HEADERS, TX_STATES, stats)
     
     # Display statistics
     st.header("Simulation Results")
@@ -265,6 +213,11 @@ if run_simulation:
             "Total Attempts",
             f"{stats['total_transmissions']}"
         )
+    # Per time unit: share with overlapping transmissions, share with any transmission
+    interval_caption(stats['channel'], metrics=("collision_rate", "utilization"))
+    success_rate, half = stats['attempt_success'].interval()
+    if half == half:
+        st.caption(f"Per-attempt success probability {success_rate:.4f} ± {half:.4f} (95% CI)")
     
     st.divider()
     
@@ -272,20 +225,40 @@ if run_simulation:
     st.subheader("Transmission Events Table")
     st.markdown("Detailed log of all transmission attempts showing start time, duration, and outcome")
     
-    # Create DataFrame from transmission events
-    df_transmissions = pd.DataFrame(all_transmissions, 
-                                   columns=['Node', 'Start Time', 'End Time', 'Status'])
-    df_transmissions = df_transmissions.sort_values('Start Time').reset_index(drop=True)
-    
-    # Display table
-    st.dataframe(df_transmissions, use_container_width=True, height=400)
+    # Paged table over the columnar transmission log (already in start-time order)
+    event_table(transmissions, TX_HEADERS, TX_STATES, key="pure_events")
     
     st.divider()
     
     # Timeline diagram showing packet transmission attempts
     st.subheader("Timeline Diagram: Packet Transmission Attempts")
     st.markdown("Gantt chart showing when each node transmitted and whether it was successful or collided")
-    plot_node_timeline(node_transmissions, num_time_units_to_show=min(100, num_time_units))
+    record.add_figure("node_timeline", plot_node_timeline(transmissions, num_nodes,
+                                                           num_time_units_to_show=min(100, num_time_units)))
+
+    st.divider()
+
+    # Whole-run view: aggregated channel status, zoomable down to single time units
+    st.subheader("Full-Run Channel Timeline")
+    st.markdown("Share of time units with a single transmission, a collision or an idle channel across the whole run")
+    pyramid = artifact("pure_aloha", "pyramid", TimelinePyramid, time_units_log["code"], CHANNEL_STATES)
+    timeline_viewer(pyramid, CHANNEL_COLORS, key="pure_aloha_timeline", unit="Time Unit")
+
+    st.divider()
+
+    # Sliding-window rates reveal transients that the whole-run averages hide
+    st.subheader("Rolling-Window Metrics")
+    st.markdown("Successful transmissions (by start time), overlap share and busy share over a sliding window")
+    rolling_metrics(artifact("pure_aloha", "indicators", pure_indicators, time_units_log["code"], transmissions,
+                             num_time_units), key="pure_aloha_rolling", unit="Time Unit")
+
+    st.divider()
+
+    # How the channel was shared among nodes
+    st.subheader("Per-Node Fairness")
+    st.markdown("Successes and collisions per node, with Jain's fairness index over the run and over a sliding window")
+    fairness_panel(transmissions["node"], transmissions["start"], transmissions["code"], num_nodes, num_time_units,
+                   key="pure_aloha_fairness", unit="Time Unit")
     
     st.divider()
     
@@ -315,37 +288,17 @@ if run_simulation:
         """)
     
     with col_b:
-        # Efficiency graph vs offered load
-        fig1, ax1 = plt.subplots(figsize=(8, 6))
-        
-        # Theoretical curve for Pure ALOHA
+        # Efficiency graph vs offered load (interactive, rendered in the browser)
         G_range = np.linspace(0, 5, 100)
-        S_theoretical = get_theoretical_throughput(G_range)
-        ax1.plot(G_range, S_theoretical, 'b-', linewidth=2, label='Theoretical (Pure ALOHA)')
-        
-        # Slotted ALOHA comparison
-        S_slotted = G_range * np.exp(-G_range)
-        ax1.plot(G_range, S_slotted, 'g--', linewidth=2, alpha=0.5, label='Slotted ALOHA (for comparison)')
-        
-        # Simulated point
-        ax1.plot(stats['offered_load'], stats['throughput'], 'ro', 
-                markersize=12, label=f'Simulated (G={stats["offered_load"]:.2f})')
-        
-        # Mark maximum throughput
-        max_G = 0.5
-        max_S = 1/(2*np.e)
-        ax1.plot(max_G, max_S, 'r*', markersize=15, 
-                label=f'Maximum (G=0.5, S={max_S:.3f})')
-        
-        ax1.set_xlabel('Offered Load (G = N × p)', fontsize=12)
-        ax1.set_ylabel('Throughput (S)', fontsize=12)
-        ax1.set_title('Efficiency Graph: Throughput vs Offered Load', fontsize=14, fontweight='bold')
-        ax1.grid(True, alpha=0.3)
-        ax1.legend()
-        ax1.set_xlim(0, 5)
-        ax1.set_ylim(0, 0.4)
-        
-        st.pyplot(fig1)
+        st.altair_chart(record.add_figure("throughput_vs_load", throughput_curves(
+            G_range,
+            {"Theoretical (Pure ALOHA)": get_theoretical_throughput(G_range),
+             "Slotted ALOHA (for comparison)": G_range * np.exp(-G_range)},
+            [(f"Simulated (G={stats['offered_load']:.2f})", stats['offered_load'], stats['throughput']),
+             (f"Maximum (G=0.5, S={1/(2*np.e):.3f})", 0.5, 1 / (2 * np.e))],
+            x_title="Offered Load (G = N × p)",
+            title="Efficiency Graph: Throughput vs Offered Load"
+        )), use_container_width=True)
     
     st.divider()
     
@@ -355,50 +308,23 @@ if run_simulation:
     chart_col1, chart_col2 = st.columns(2)
     
     with chart_col1:
-        # Pie chart
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        
-        sizes = [stats['successful'], stats['collisions']]
-        labels = ['Successful', 'Collisions']
-        colors = ['#2ecc71', '#e74c3c']
-        explode = (0.1, 0)
-        
-        ax2.pie(sizes, explode=explode, labels=labels, colors=colors,
-                autopct='%1.1f%%', shadow=True, startangle=90)
-        ax2.set_title('Transmission Outcome Distribution', fontsize=14, fontweight='bold')
-        
-        st.pyplot(fig2)
+        st.altair_chart(record.add_figure("transmission_outcomes", outcome_donut(
+            {"Successful": stats['successful'], "Collisions": stats['collisions']},
+            {"Successful": '#2ecc71', "Collisions": '#e74c3c'},
+            "Transmission Outcome Distribution"
+        )), use_container_width=True)
     
     with chart_col2:
-        # Time series chart - channel activity
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        
-        # Show first 100 time units
+        # Channel activity for the first 100 time units; zoom and legend toggles run in the browser
         display_units = min(100, num_time_units)
-        time_nums = [t[0] for t in time_units_data[:display_units]]
-        num_active = [t[1] for t in time_units_data[:display_units]]
-        statuses = [t[2] for t in time_units_data[:display_units]]
-        
-        # Color code by status
-        colors_map = {'Idle': '#95a5a6', 'Transmitting': '#2ecc71', 'Collision': '#e74c3c'}
-        bar_colors = [colors_map[status] for status in statuses]
-        
-        ax3.bar(time_nums, num_active, color=bar_colors, alpha=0.7)
-        ax3.set_xlabel('Time Unit', fontsize=12)
-        ax3.set_ylabel('Number of Active Transmissions', fontsize=12)
-        ax3.set_title(f'Channel Activity (First {display_units} time units)', fontsize=14, fontweight='bold')
-        ax3.grid(True, alpha=0.3, axis='y')
-        
-        # Add legend
-        from matplotlib.patches import Patch
-        legend_elements = [
-            Patch(facecolor='#2ecc71', alpha=0.7, label='Single Transmission'),
-            Patch(facecolor='#e74c3c', alpha=0.7, label='Collision'),
-            Patch(facecolor='#95a5a6', alpha=0.7, label='Idle')
-        ]
-        ax3.legend(handles=legend_elements)
-        
-        st.pyplot(fig3)
+        st.altair_chart(record.add_figure("channel_activity", activity_bars(
+            time_units_log["slot"][:display_units],
+            time_units_log["count"][:display_units],
+            status_categorical(time_units_log["code"][:display_units], CHANNEL_STATES),
+            {'Transmitting': '#2ecc71', 'Collision': '#e74c3c', 'Idle': '#95a5a6'},
+            "Time Unit", "Number of Active Transmissions",
+            f"Channel Activity (First {display_units} time units)"
+        )), use_container_width=True)
     
     st.divider()
     
@@ -408,14 +334,9 @@ if run_simulation:
     col_dl1, col_dl2 = st.columns(2)
     
     with col_dl1:
-        # Transmission events CSV
-        csv_events = df_transmissions.to_csv(index=False)
-        st.download_button(
-            label="Download Transmission Events (CSV)",
-            data=csv_events,
-            file_name=f"pure_aloha_events_N{num_nodes}_p{transmission_prob}.csv",
-            mime="text/csv"
-        )
+        # Transmission events, generated only when downloaded
+        export_button(transmissions, TX_HEADERS, TX_STATES, f"pure_aloha_events_N{num_nodes}_p{transmission_prob}",
+                      key="pure_aloha_export", label="Download Transmission Events")
     
     with col_dl2:
         # Statistics CSV
@@ -433,12 +354,12 @@ if run_simulation:
             "Collision Rate (%)": (stats['collisions']/stats['total_transmissions'])*100 if stats['total_transmissions'] > 0 else 0,
             "Efficiency (%)": stats['efficiency']
         }])
-        csv_stats = stats_df.to_csv(index=False)
         st.download_button(
             label="Download Statistics Summary (CSV)",
-            data=csv_stats,
+            data=lambda: stats_df.to_csv(index=False),
             file_name=f"pure_aloha_stats_N{num_nodes}_p{transmission_prob}.csv",
-            mime="text/csv"
+            mime="text/csv",
+            on_click="ignore"
         )
 
 else:
@@ -470,6 +391,8 @@ else:
     For maximum throughput, set transmission probability to: **p = 0.5/N**
     
     This ensures the offered load G = N × (0.5/N) = 0.5, achieving maximum throughput!
+    With packets longer than one time unit the exact optimum is lower; the sidebar's
+    **Use Optimal p** button computes it for the current nodes and packet duration.
     """)
     
     # Comparison table
@@ -492,4 +415,6 @@ st.markdown("""
         Developed for Computer Networks Project | Pure ALOHA Protocol Simulator<br>
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+performance_panel(timer)
@@ -1,14 +1,30 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
 import pandas as pd
 
+from macsim.analytic import slotted_aloha_chain, finite_slotted_throughput
+from macsim.charts import throughput_curves, outcome_donut, activity_bars, distribution_bars, rate_series
+from macsim.engines import simulate_slotted_aloha, simulate_backlogged_aloha, CONTROLLERS
+from macsim.events import status_categorical
+from macsim.fairness import state_events
+from macsim.optimize import optimal_slotted_p
+from macsim.plotting import draw_state_gantt
+from macsim.render import cached_png
+from macsim.stats import channel_indicators, rolling_means
+from macsim.timeline import TimelinePyramid
+from macsim.ui import (start_job, follow_job, record_run, interval_caption, rolling_metrics, fairness_panel,
+                       packet_distributions, timeline_viewer, event_table, export_button, page_timer,
+                       performance_panel, phase, shown_result, artifact, timed_fragment,
+                       resume_state)
+
 # Page configuration
 st.set_page_config(
     page_title="Slotted ALOHA Simulator",
     page_icon="📡",
     layout="wide"
 )
+timer = page_timer("Slotted ALOHA")
 st.sidebar.page_link('Home.py', label='Home')
 #comment out CSMA/CA page like Pure_Aloha.py page for now, we'll display it later
 st.sidebar.page_link('pages/CSMA_CD.py', label='CSMA/CD')
@@ -50,128 +66,130 @@ where time is divided into slots and nodes can only transmit at the beginning of
 # Sidebar for input controls
 st.sidebar.header("Simulation Parameters")
 
-num_nodes = st.sidebar.slider(
-    "Number of Nodes",
-    min_value=2,
-    max_value=50,
-    value=10,
-    help="Number of nodes competing for channel access"
+BACKLOGGED = "Backlogged (retransmissions)"
+# The backlogged engine logs every transmission. Under Fixed q_r an unstable channel ends up with
+# nearly all N nodes backlogged, about N x q_r transmissions a slot, so those runs are capped to this
+# many transmissions; the pseudo-Bayesian controller keeps it near one a slot and is not capped.
+BACKLOG_ATTEMPTS = 20_000_000
+traffic_model = st.sidebar.radio(
+    "Traffic Model",
+    ["Independent slots", BACKLOGGED],
+    help="Independent slots: every node transmits with probability p in every slot. "
+         "Backlogged: nodes hold a packet until it gets through, retransmitting after collisions"
 )
 
-transmission_prob = st.sidebar.slider(
-    "Transmission Probability (p)",
-    min_value=0.01,
-    max_value=1.0,
-    value=0.3,
-    step=0.01,
-    help="Probability that a node will attempt to transmit in a given slot"
-)
+if traffic_model == BACKLOGGED:
+    num_nodes = st.sidebar.number_input(
+        "Number of Nodes",
+        min_value=2,
+        max_value=5000,
+        value=100,
+        help="Number of nodes competing for channel access"
+    )
 
-num_slots = st.sidebar.slider(
-    "Number of Time Slots",
-    min_value=100,
-    max_value=5000,
-    value=1000,
-    step=100,
-    help="Total number of time slots to simulate"
-)
+    arrival_prob = st.sidebar.number_input(
+        "New Packet Probability (q_a)",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.003,
+        step=0.0005,
+        format="%.4f",
+        help="Probability per slot that a node without a packet gets a new one"
+    )
+
+    retransmission_prob = st.sidebar.slider(
+        "Retransmission Probability (q_r)",
+        min_value=0.01,
+        max_value=1.0,
+        value=0.1,
+        step=0.01,
+        help="Probability per slot that a backlogged node retransmits (Fixed q_r control)"
+    )
+
+    controller = st.sidebar.selectbox(
+        "Retransmission Control",
+        CONTROLLERS,
+        help="Pseudo-Bayesian: q_r = 1/(estimated backlog), which keeps the channel stable below 1/e arrivals per slot"
+    )
+
+    max_slots = 1_000_000
+    slots_help = "Total number of time slots to simulate"
+    if controller == "Fixed q_r":
+        max_slots = min(max_slots, int(BACKLOG_ATTEMPTS / (num_nodes * retransmission_prob)))
+        slots_help += (f" (Fixed q_r: at most {BACKLOG_ATTEMPTS:,} / (N × q_r), since an unstable channel "
+                       "logs about N × q_r retransmissions every slot)")
+    num_slots = st.sidebar.number_input(
+        "Number of Time Slots",
+        min_value=1000,
+        max_value=max_slots,
+        value=min(100_000, max_slots),
+        step=10_000,
+        help=slots_help
+    )
+    st.sidebar.caption(f"Offered new traffic ≈ {num_nodes * arrival_prob:.3f} packets/slot (stable below 1/e ≈ 0.368)")
+else:
+    num_nodes = st.sidebar.slider(
+        "Number of Nodes",
+        min_value=2,
+        max_value=50,
+        value=10,
+        help="Number of nodes competing for channel access"
+    )
+
+    st.session_state.setdefault("slotted_p", 0.3)
+    transmission_prob = st.sidebar.slider(
+        "Transmission Probability (p)",
+        min_value=0.01,
+        max_value=1.0,
+        step=0.01,
+        key="slotted_p",
+        help="Probability that a node will attempt to transmit in a given slot"
+    )
+
+    # Throughput-maximizing p, exact for this model
+    optimal_p, optimal_throughput = optimal_slotted_p(num_nodes)
+    st.sidebar.caption(f"Optimal p for N={num_nodes}: {optimal_p:.3f} (S = {optimal_throughput:.4f})")
+    st.sidebar.button("Use Optimal p", on_click=lambda: st.session_state.update(slotted_p=round(optimal_p, 2)),
+                      help="Set p to the throughput-maximizing value, 1/N (rounded to the slider step)")
+
+    num_slots = st.sidebar.slider(
+        "Number of Time Slots",
+        min_value=100,
+        max_value=5000,
+        value=1000,
+        step=100,
+        help="Total number of time slots to simulate"
+    )
 
 # Run simulation button
 run_simulation = st.sidebar.button("Run Simulation", type="primary")
 
-# Slotted ALOHA simulation logic
-def simulate_slotted_aloha(num_nodes, p, num_slots):
-    """
-    Simulate Slotted ALOHA protocol
-    
-    Returns:
-    - slots_data: List of tuples (slot_number, num_transmissions, status)
-    - node_transmissions: Dict tracking which nodes transmitted in each slot
-    - statistics: Dictionary with overall statistics
-    """
-    slots_data = []
-    node_transmissions = {i: [] for i in range(num_nodes)}  # Track per-node attempts
-    successful_transmissions = 0
-    collisions = 0
-    idle_slots = 0
-    
-    for slot in range(num_slots):
-        # Each node decides to transmit with probability p
-        transmitting_nodes = np.random.random(num_nodes) < p
-        num_transmissions = np.sum(transmitting_nodes)
-        
-        # Record which nodes are transmitting
-        transmitting_node_ids = [i for i in range(num_nodes) if transmitting_nodes[i]]
-        
-        if num_transmissions == 0:
-            status = "Idle"
-            idle_slots += 1
-            # All nodes idle
-            for i in range(num_nodes):
-                node_transmissions[i].append((slot, 0))  # 0 = idle
-        elif num_transmissions == 1:
-            status = "Success"
-            successful_transmissions += 1
-            # Mark successful node
-            for i in range(num_nodes):
-                if i in transmitting_node_ids:
-                    node_transmissions[i].append((slot, 1))  # 1 = success
-                else:
-                    node_transmissions[i].append((slot, 0))  # 0 = idle
-        else:
-            status = "Collision"
-            collisions += 1
-            # Mark colliding nodes
-            for i in range(num_nodes):
-                if i in transmitting_node_ids:
-                    node_transmissions[i].append((slot, 2))  # 2 = collision
-                else:
-                    node_transmissions[i].append((slot, 0))  # 0 = idle
-        
-        slots_data.append((slot, num_transmissions, status))
-    
-    # Calculate throughput (successful transmissions per slot)
-    throughput = successful_transmissions / num_slots
-    
-    # Theoretical maximum throughput for Slotted ALOHA is 1/e ≈ 0.368
-    theoretical_max = 1 / np.e
-    
-    # Calculate offered load (G = N * p)
-    offered_load = num_nodes * p
-    
-    statistics = {
-        "successful": successful_transmissions,
-        "collisions": collisions,
-        "idle": idle_slots,
-        "throughput": throughput,
-        "theoretical_max": theoretical_max,
-        "offered_load": offered_load,
-        "efficiency": (throughput / theoretical_max) * 100
-    }
-    
-    return slots_data, node_transmissions, statistics
-
 # Theoretical throughput curve
 def get_theoretical_throughput(G_values):
     """Calculate theoretical throughput: S = G * e^(-G)"""
     return G_values * np.exp(-G_values)
 
-# Plot node-level timeline diagram (Gantt chart)
-def plot_node_timeline(node_transmissions, num_slots_to_show=50):
+# Slot states for the full-run timeline viewer
+SLOT_STATES = ["Success", "Collision", "Idle"]
+SLOT_COLORS = {"Success": '#2ecc71', "Collision": '#e74c3c', "Idle": '#95a5a6'}
+EVENT_HEADERS = {"slot": "Slot", "count": "Num Transmissions", "code": "Status", "node": "Successful Node"}
+ATTEMPT_STATES = ["Success", "Collision"]
+ATTEMPT_HEADERS = {"slot": "Slot", "node": "Node", "code": "Status"}
+# The exact Markov chain is only solved for populations up to this size.
+MAX_CHAIN_NODES = 200
+
+# Draw node-level timeline diagram (Gantt chart) onto a figure
+def draw_node_timeline(fig, states):
     """
-    Create a Gantt-style timeline showing packet transmission attempts per node
+    Draw a Gantt-style timeline showing packet transmission attempts per node
     """
     colors = {0: '#d3d3d3', 1: '#2ecc71', 2: '#e74c3c'}
     labels = {0: 'Idle', 1: 'Success', 2: 'Collision'}
     
-    num_nodes = len(node_transmissions)
-    display_slots = min(num_slots_to_show, len(node_transmissions[0]))
-    
-    fig, ax = plt.subplots(figsize=(14, max(6, num_nodes * 0.4)))
+    num_nodes, display_slots = states.shape
     
-    for node_id, transmissions in node_transmissions.items():
-        for slot, state in transmissions[:display_slots]:
-            ax.barh(node_id, 1, left=slot, color=colors[state], height=0.8, edgecolor='white', linewidth=0.5)
+    ax = fig.subplots()
+    draw_state_gantt(ax, states, colors, height=0.8, edgecolor='white', linewidth=0.5)
     
     ax.set_xlabel('Time Slot', fontsize=12)
     ax.set_ylabel('Node ID', fontsize=12)
@@ -184,17 +202,149 @@ def plot_node_timeline(node_transmissions, num_slots_to_show=50):
     ax.grid(axis='x', alpha=0.3, linestyle='--')
     
     # Legend
-    from matplotlib.patches import Patch
     legend_elements = [Patch(facecolor=colors[k], label=labels[k]) for k in sorted(labels.keys())]
     ax.legend(handles=legend_elements, loc='upper right', frameon=True, fontsize=10)
     
-    plt.tight_layout()
-    st.pyplot(fig)
+    fig.tight_layout()
+
+# Plot node-level timeline diagram (Gantt chart)
+def plot_node_timeline(node_states, num_slots_to_show=50):
+    num_nodes = node_states.shape[0]
+    display_slots = min(num_slots_to_show, node_states.shape[1])
+    states = node_states[:, :display_slots]
+    with phase("matplotlib"):
+        png = cached_png(draw_node_timeline, states, figsize=(14, max(6, num_nodes * 0.4)))
+    st.image(png)
+    return png
+
+# Finite-population Markov model (fragment: changing q_a / q_r only reruns this part)
+@timed_fragment
+def markov_model_panel(num_nodes, p, simulated_throughput):
+    c1, c2 = st.columns(2)
+    q_a = c1.number_input("Arrival probability (q_a)", 0.0, 1.0, float(p), step=0.005, format="%.3f",
+                          key="markov_q_a", help="Chance per slot that an unbacklogged node gets a new packet")
+    q_r = c2.number_input("Retransmission probability (q_r)", 0.0, 1.0, float(p), step=0.005, format="%.3f",
+                          key="markov_q_r", help="Chance per slot that a backlogged node retransmits")
+    chain = slotted_aloha_chain(num_nodes, q_a, q_r)
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Exact Throughput (S)", f"{chain['throughput']:.4f}")
+    m2.metric("Mean Backlog", f"{chain['mean_backlog']:.2f} nodes")
+    m3.metric("Mean Delay", f"{chain['delay']:.1f} slots")
+    if q_a == q_r == p:
+        st.caption(f"With q_a = q_r = p every node transmits with probability p in every slot, which is exactly "
+                   f"the simulated model: simulated S = {simulated_throughput:.4f}, exact S = {chain['throughput']:.4f}.")
+    if not chain['converged']:
+        st.warning(f"Stationary distribution not converged after {chain['iterations']:,} iterations "
+                   f"(residual {chain['residual']:.1e}).")
+    st.altair_chart(distribution_bars(chain['distribution'], "Backlogged Nodes",
+                                      "Stationary Backlog Distribution"), use_container_width=True)
+
+# Results of the backlogged model
+def show_backlog_results(slots_log, attempts, stats, num_nodes, q_a, q_r, num_slots):
+    record = record_run("slotted_aloha_backlog", "Backlogged Slotted ALOHA", slots_log, EVENT_HEADERS, SLOT_STATES,
+                        stats)
+    st.header("Simulation Results")
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Throughput (S)", f"{stats['throughput']:.4f}", help="Successful transmissions per slot")
+    c2.metric("Arrival Rate", f"{stats['arrival_rate']:.4f}", help="New packets per slot")
+    c3.metric("Mean Backlog", f"{stats['mean_backlog']:.1f} nodes")
+    c4.metric("Mean Delay", f"{stats['delay'].mean:.1f} slots", help="Slots from arrival to success, inclusive")
+    c5.metric("Attempts per Packet", f"{stats['attempts_per_packet'].mean:.2f}")
+    interval_caption(stats['channel'])
+    if stats['arrival_rate'] > stats['throughput'] * 1.05:
+        st.warning("Packets arrive faster than they get through: the backlog is growing (unstable channel).")
+
+    # The fixed-q_r model is the one the exact Markov chain describes
+    if stats['controller'] == "Fixed q_r" and num_nodes <= MAX_CHAIN_NODES:
+        chain = slotted_aloha_chain(num_nodes, q_a, q_r)
+        st.caption(f"Exact Markov chain for N={num_nodes}, q_a={q_a}, q_r={q_r}: S = {chain['throughput']:.4f}, "
+                   f"mean backlog {chain['mean_backlog']:.2f}, mean delay {chain['delay']:.1f} slots")
+
+    st.divider()
+
+    st.subheader("Backlog Over Time")
+    st.markdown("Number of backlogged nodes, averaged over short windows across the whole run")
+    ends, means = artifact("slotted_aloha_backlog", "backlog_means", rolling_means, {"Backlog": stats['backlog']},
+                           max(1, num_slots // 2000))
+    st.altair_chart(record.add_figure("backlog", rate_series(
+        ends, means, "Slot", "Backlogged Nodes", y_title="Nodes", domain=None
+    )), use_container_width=True)
+
+    st.divider()
+
+    st.subheader("Full-Run Timeline")
+    st.markdown("Share of successful, collided and idle slots across the whole run; zoom in to see individual slots")
+    timeline_viewer(artifact("slotted_aloha_backlog", "pyramid", TimelinePyramid, slots_log["code"], SLOT_STATES),
+                    SLOT_COLORS, key="backlog_timeline")
+
+    st.divider()
+
+    st.subheader("Rolling-Window Metrics")
+    st.markdown("Throughput, collision rate and utilization over a sliding window across the whole run")
+    rolling_metrics(artifact("slotted_aloha_backlog", "indicators", channel_indicators, slots_log["code"]),
+                    key="backlog_rolling")
+
+    st.divider()
+
+    st.subheader("Per-Node Fairness")
+    st.markdown("Successes and collisions per node, with Jain's fairness index over the run and over a sliding window")
+    fairness_panel(attempts["node"], attempts["slot"], attempts["code"], num_nodes, num_slots, key="backlog_fairness")
+
+    st.divider()
+
+    st.subheader("Packet Delay & Backoff Distributions")
+    st.markdown("Streaming quantile sketches of every delivered packet; the raw samples are never stored")
+    packet_distributions(stats['packets'], key="backlog_packets")
+
+    st.divider()
+
+    st.subheader("Slot-wise Event Table")
+    event_table(slots_log, EVENT_HEADERS, SLOT_STATES, key="backlog_events")
+
+    st.divider()
+
+    st.subheader("Export Results")
+    col_dl1, col_dl2 = st.columns(2)
+    with col_dl1:
+        export_button(slots_log, EVENT_HEADERS, SLOT_STATES, f"backlogged_aloha_slots_N{num_nodes}",
+                      key="backlog_slots_export", label="Download Slot-wise Events")
+    with col_dl2:
+        export_button(attempts, ATTEMPT_HEADERS, ATTEMPT_STATES, f"backlogged_aloha_attempts_N{num_nodes}",
+                      key="backlog_attempts_export", label="Download Transmission Attempts")
 
 # Main simulation
+if traffic_model == BACKLOGGED:
+    run_key = "slotted_aloha_backlog"
+    run_params = {"num_nodes": num_nodes, "q_a": arrival_prob, "q_r": retransmission_prob, "num_slots": num_slots,
+                  "controller": controller}
+else:
+    run_key = "slotted_aloha"
+    run_params = {"num_nodes": num_nodes, "p": transmission_prob, "num_slots": num_slots}
 if run_simulation:
-    with st.spinner("Running simulation..."):
-        slots_data, node_transmissions, stats = simulate_slotted_aloha(num_nodes, transmission_prob, num_slots)
+    # A stored run with fewer slots and otherwise the same settings is extended, not restarted.
+    state, seed = resume_state(run_key, run_params, "num_slots")
+    action = "Extending" if state else "Simulating"
+    if traffic_model == BACKLOGGED:
+        start_job(run_key, simulate_backlogged_aloha, num_nodes, arrival_prob, retransmission_prob,
+                  num_slots, controller, seed=seed, state=state, label=f"{action} backlogged Slotted ALOHA",
+                  params={**run_params, "seed": seed})
+    else:
+        start_job(run_key, simulate_slotted_aloha, num_nodes, transmission_prob, num_slots, seed=seed, state=state,
+                  label=f"{action} Slotted ALOHA", params={**run_params, "seed": seed})
+follow_job("slotted_aloha")
+follow_job("slotted_aloha_backlog")
+# Stored runs are re-rendered on every rerun, never recomputed; shown with the parameters they were run with.
+result, params = shown_result(run_key, run_params)
+
+if result is not None and traffic_model == BACKLOGGED:
+    show_backlog_results(*result, params["num_nodes"], params["q_a"], params["q_r"], params["num_slots"])
+
+elif result is not None:
+    slots_log, node_states, stats = result
+    num_nodes, transmission_prob, num_slots = params["num_nodes"], params["p"], params["num_slots"]
+    record = record_run("slotted_aloha", "Slotted ALOHA", slots_log, EVENT_HEADERS, SLOT_STATES, stats)
     
     # Display statistics
     st.header("Simulation Results")
@@ -225,6 +375,7 @@ if run_simulation:
             "Idle Rate",
             f"{(stats['idle']/num_slots)*100:.1f}%"
         )
+    interval_caption(stats['channel'])
     
     st.divider()
     
@@ -232,18 +383,39 @@ if run_simulation:
     st.subheader("Slot-wise Event Table")
     st.markdown("Event log showing success, collision, or idle status for each time slot")
     
-    # Create DataFrame from slots_data
-    df_events = pd.DataFrame(slots_data, columns=['Slot', 'Num Transmissions', 'Status'])
-    
-    # Display table
-    st.dataframe(df_events, use_container_width=True, height=400)
+    # Paged table over the columnar slot log; only the visible page is sent
+    event_table(slots_log, EVENT_HEADERS, SLOT_STATES, key="slotted_events")
     
     st.divider()
     
     # Timeline diagram showing packet transmission attempts
     st.subheader("Timeline Diagram: Packet Transmission Attempts")
     st.markdown("Gantt chart showing which nodes attempted transmission in each slot")
-    plot_node_timeline(node_transmissions, num_slots_to_show=min(100, num_slots))
+    record.add_figure("node_timeline", plot_node_timeline(node_states, num_slots_to_show=min(100, num_slots)))
+
+    st.divider()
+
+    # Whole-run view: aggregated slot status, zoomable down to single slots
+    st.subheader("Full-Run Timeline")
+    st.markdown("Share of successful, collided and idle slots across the whole run; zoom in to see individual slots")
+    pyramid = artifact("slotted_aloha", "pyramid", TimelinePyramid, slots_log["code"], SLOT_STATES)
+    timeline_viewer(pyramid, SLOT_COLORS, key="slotted_aloha_timeline")
+
+    st.divider()
+
+    # Sliding-window rates reveal transients that the whole-run averages hide
+    st.subheader("Rolling-Window Metrics")
+    st.markdown("Throughput, collision rate and utilization over a sliding window across the whole run")
+    rolling_metrics(artifact("slotted_aloha", "indicators", channel_indicators, slots_log["code"]),
+                    key="slotted_aloha_rolling")
+
+    st.divider()
+
+    # How the channel was shared among nodes
+    st.subheader("Per-Node Fairness")
+    st.markdown("Successes and collisions per node, with Jain's fairness index over the run and over a sliding window")
+    fairness_panel(*artifact("slotted_aloha", "events", state_events, node_states), num_nodes, num_slots,
+                   key="slotted_aloha_fairness")
     
     st.divider()
     
@@ -272,35 +444,27 @@ if run_simulation:
         """)
     
     with col_b:
-        # Efficiency graph vs offered load
-        fig1, ax1 = plt.subplots(figsize=(8, 6))
-        
-        # Theoretical curve
+        # Efficiency graph vs offered load (interactive, rendered in the browser)
         G_range = np.linspace(0, 5, 100)
-        S_theoretical = get_theoretical_throughput(G_range)
-        ax1.plot(G_range, S_theoretical, 'b-', linewidth=2, label='Theoretical')
-        
-        # Simulated point
-        ax1.plot(stats['offered_load'], stats['throughput'], 'ro', 
-                markersize=12, label=f'Simulated (G={stats["offered_load"]:.2f})')
-        
-        # Mark maximum throughput
-        max_G = 1.0
-        max_S = 1/np.e
-        ax1.plot(max_G, max_S, 'g*', markersize=15, 
-                label=f'Maximum (G=1, S={max_S:.3f})')
-        
-        ax1.set_xlabel('Offered Load (G = N × p)', fontsize=12)
-        ax1.set_ylabel('Throughput (S)', fontsize=12)
-        ax1.set_title('Efficiency Graph: Throughput vs Offered Load', fontsize=14, fontweight='bold')
-        ax1.grid(True, alpha=0.3)
-        ax1.legend()
-        ax1.set_xlim(0, 5)
-        ax1.set_ylim(0, 0.4)
-        
-        st.pyplot(fig1)
+        st.altair_chart(record.add_figure("throughput_vs_load", throughput_curves(
+            G_range,
+            {"Theoretical": get_theoretical_throughput(G_range),
+             f"Finite-N exact (N={num_nodes})": finite_slotted_throughput(num_nodes, np.minimum(G_range / num_nodes, 1))},
+            [(f"Simulated (G={stats['offered_load']:.2f})", stats['offered_load'], stats['throughput']),
+             (f"Maximum (G=1, S={1/np.e:.3f})", 1.0, 1 / np.e)],
+            x_title="Offered Load (G = N × p)",
+            title="Efficiency Graph: Throughput vs Offered Load"
+        )), use_container_width=True)
     
     st.divider()
+
+    # Exact finite-population model
+    st.subheader("Finite-Population Markov Model")
+    st.markdown("Exact stationary solution of the backlog Markov chain for N nodes with arrival probability "
+                "q_a and retransmission probability q_r (no simulation needed)")
+    markov_model_panel(num_nodes, transmission_prob, stats['throughput'])
+
+    st.divider()
     
     # Additional visualizations
     st.subheader("Additional Visualizations")
@@ -308,50 +472,23 @@ if run_simulation:
     chart_col1, chart_col2 = st.columns(2)
     
     with chart_col1:
-        # Pie chart
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        
-        sizes = [stats['successful'], stats['collisions'], stats['idle']]
-        labels = ['Successful', 'Collisions', 'Idle']
-        colors = ['#2ecc71', '#e74c3c', '#95a5a6']
-        explode = (0.1, 0, 0)
-        
-        ax2.pie(sizes, explode=explode, labels=labels, colors=colors,
-                autopct='%1.1f%%', shadow=True, startangle=90)
-        ax2.set_title('Slot Status Distribution', fontsize=14, fontweight='bold')
-        
-        st.pyplot(fig2)
+        st.altair_chart(record.add_figure("slot_status", outcome_donut(
+            {"Successful": stats['successful'], "Collisions": stats['collisions'], "Idle": stats['idle']},
+            {"Successful": '#2ecc71', "Collisions": '#e74c3c', "Idle": '#95a5a6'},
+            "Slot Status Distribution"
+        )), use_container_width=True)
     
     with chart_col2:
-        # Time series chart
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        
-        # Show first 100 slots
+        # Show first 100 slots; the browser handles zoom and legend toggles
         display_slots = min(100, num_slots)
-        slot_numbers = [s[0] for s in slots_data[:display_slots]]
-        num_transmissions = [s[1] for s in slots_data[:display_slots]]
-        statuses = [s[2] for s in slots_data[:display_slots]]
-        
-        # Color code by status
-        colors_map = {'Idle': '#95a5a6', 'Success': '#2ecc71', 'Collision': '#e74c3c'}
-        bar_colors = [colors_map[status] for status in statuses]
-        
-        ax3.bar(slot_numbers, num_transmissions, color=bar_colors, alpha=0.7)
-        ax3.set_xlabel('Time Slot', fontsize=12)
-        ax3.set_ylabel('Number of Transmissions', fontsize=12)
-        ax3.set_title(f'Transmission Activity (First {display_slots} slots)', fontsize=14, fontweight='bold')
-        ax3.grid(True, alpha=0.3, axis='y')
-        
-        # Add legend
-        from matplotlib.patches import Patch
-        legend_elements = [
-            Patch(facecolor='#2ecc71', alpha=0.7, label='Success'),
-            Patch(facecolor='#e74c3c', alpha=0.7, label='Collision'),
-            Patch(facecolor='#95a5a6', alpha=0.7, label='Idle')
-        ]
-        ax3.legend(handles=legend_elements)
-        
-        st.pyplot(fig3)
+        st.altair_chart(record.add_figure("transmission_activity", activity_bars(
+            slots_log["slot"][:display_slots],
+            slots_log["count"][:display_slots],
+            status_categorical(slots_log["code"][:display_slots], SLOT_STATES),
+            {'Success': '#2ecc71', 'Collision': '#e74c3c', 'Idle': '#95a5a6'},
+            "Time Slot", "Number of Transmissions",
+            f"Transmission Activity (First {display_slots} slots)"
+        )), use_container_width=True)
     
     st.divider()
     
@@ -361,14 +498,9 @@ if run_simulation:
     col_dl1, col_dl2 = st.columns(2)
     
     with col_dl1:
-        # Event table CSV
-        csv_events = df_events.to_csv(index=False)
-        st.download_button(
-            label="Download Slot-wise Events (CSV)",
-            data=csv_events,
-            file_name=f"slotted_aloha_events_N{num_nodes}_p{transmission_prob}.csv",
-            mime="text/csv"
-        )
+        # Slot-wise events, generated only when downloaded
+        export_button(slots_log, EVENT_HEADERS, SLOT_STATES, f"slotted_aloha_events_N{num_nodes}_p{transmission_prob}",
+                      key="slotted_aloha_export", label="Download Slot-wise Events")
     
     with col_dl2:
         # Statistics CSV
@@ -383,12 +515,12 @@ if run_simulation:
             "Idle Rate (%)": (stats['idle']/num_slots)*100,
             "Efficiency (%)": stats['efficiency']
         }])
-        csv_stats = stats_df.to_csv(index=False)
         st.download_button(
             label="Download Statistics Summary (CSV)",
-            data=csv_stats,
+            data=lambda: stats_df.to_csv(index=False),
             file_name=f"slotted_aloha_stats_N{num_nodes}_p{transmission_prob}.csv",
-            mime="text/csv"
+            mime="text/csv",
+            on_click="ignore"
         )
 
 else:
@@ -413,6 +545,13 @@ else:
     For maximum throughput, set transmission probability to: **p = 1/N**
     
     This ensures the offered load G = N × (1/N) = 1, achieving maximum throughput!
+    The sidebar's **Use Optimal p** button sets it for the current number of nodes.
+    
+    ### Backlogged Mode:
+    Real nodes keep a collided packet and **retransmit** it later. With a fixed retransmission
+    probability q_r the backlog can snowball until almost every slot is a collision; the
+    **pseudo-Bayesian** controller estimates the backlog n and retransmits with probability 1/n,
+    which keeps the channel stable for any arrival rate below 1/e.
     """)
 
 # Footer
@@ -423,4 +562,6 @@ st.markdown("""
         Developed for Computer Networks Project | Slotted ALOHA Protocol Simulator<br>
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+performance_panel(timer)